@@ -0,0 +1,188 @@
+import os
+import io
+import sys
+import glob
+import json
+import time
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, List, Optional
+from encryptor import CIPHER_MODULES
+
+# Batch obfuscation over a process pool.
+#
+# A batch source is a directory (every ELF file below it), a glob pattern, or
+# a manifest file. Manifests list one job per line, either a plain input path
+# or a JSON object with "input" and optional "output", "type", "mode",
+# "exec_mode", "compression", "compression_level", "sections", "lazy",
+# "threads", "loader_profile" and "key_seed" fields that override the batch defaults. Each
+# finished artifact is reported as one JSON line, followed by a summary line
+# with totals and throughput.
+
+ELF_MAGIC = b"\x7fELF"
+
+
+def default_jobs() -> int:
+    """Worker count: the CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _is_elf(path: str) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(4) == ELF_MAGIC
+    except OSError:
+        return False
+
+
+def collect_jobs(source: str, output_dir: str, defaults: dict) -> List[dict]:
+    """Expand a directory, glob or manifest into a list of job dicts."""
+    if os.path.isdir(source):
+        inputs = []
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            inputs.extend(os.path.join(root, name) for name in sorted(files))
+        entries = [{'input': path} for path in inputs if _is_elf(path)]
+        base = source
+    elif os.path.isfile(source):
+        entries = []
+        with open(source) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                entries.append(json.loads(line) if line.startswith('{') else {'input': line})
+        # Relative paths in a manifest are relative to the manifest
+        manifest_dir = os.path.dirname(os.path.abspath(source))
+        for entry in entries:
+            entry['input'] = os.path.join(manifest_dir, entry['input'])
+        base = None
+    else:
+        entries = [{'input': path} for path in sorted(glob.glob(source, recursive=True))
+                   if os.path.isfile(path)]
+        base = None
+
+    jobs = []
+    for entry in entries:
+        job = dict(defaults)
+        job.update(entry)
+        if not job.get('output'):
+            # Mirror the source tree under output_dir so names cannot collide
+            name = (os.path.relpath(job['input'], base) if base
+                    else os.path.basename(job['input']))
+            job['output'] = os.path.join(output_dir, name + "_obfuscated")
+        elif not os.path.isabs(job['output']):
+            job['output'] = os.path.join(output_dir, job['output'])
+        if not job.get('type'):
+            raise ValueError(f"No encryption type for {job['input']} (pass -t or set \"type\")")
+        if job['type'].lower() not in CIPHER_MODULES:
+            raise ValueError(f"Unknown encryption type {job['type']!r} for {job['input']}")
+        jobs.append(job)
+    return jobs
+
+
+def run_job(job: dict) -> dict:
+    """Obfuscate one artifact. Runs inside a pool process."""
+    from obfuscator import Obfuscator
+
+    start = time.perf_counter()
+    log = io.StringIO()
+    report = {'input': job['input'], 'output': job['output']}
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(job['output'])), exist_ok=True)
+        with contextlib.redirect_stdout(log):
+            result = Obfuscator(job['input']).obfuscate(
+                job['type'].lower(), job['output'],
+                mode=job.get('mode', 'stub'),
+                exec_mode=job.get('exec_mode', 'memfd'),
+                key_seed=job.get('key_seed'),
+                use_cache=job.get('cache', True),
+                compression=job.get('compression', 'none'),
+                level=job.get('compression_level'),
+                sections=job.get('sections'),
+                lazy=job.get('lazy', False),
+                threads=job.get('threads', 0),
+                loader_profile=job.get('loader_profile', 'glibc'),
+                manifest=job.get('manifest'))
+        report.update(ok=True, result=result)
+    except SystemExit:
+        report.update(ok=False, error="Obfuscation failed", log=log.getvalue())
+    except Exception as e:
+        report.update(ok=False, error=f"{type(e).__name__}: {e}", log=log.getvalue())
+    report['seconds'] = round(time.perf_counter() - start, 4)
+    return report
+
+
+def _prebuild_stubs(jobs: Iterable[dict]):
+    """Compile each distinct stub once before the pool starts.
+
+    Otherwise every worker that misses the cache at the same moment would
+    run gcc for the same stub.
+    """
+    from obfuscator import compile_c_string
+    from loader import get_stub
+    from cache import get_cache
+
+    variants = {(job['type'].lower(), job.get('exec_mode', 'memfd'), job.get('compression', 'none'),
+                 job.get('loader_profile', 'glibc'))
+                for job in jobs if job.get('mode', 'stub') in ('stub', 'incremental')}
+    for cipher, exec_mode, compression, profile in sorted(variants):
+        try:
+            get_stub(cipher, compile_c_string, get_cache(), exec_mode, compression=compression,
+                     profile=profile)
+        except ValueError:
+            # Reported by the job itself
+            pass
+
+
+def run_batch(jobs: List[dict], workers: Optional[int] = None, out=None) -> dict:
+    """Run jobs over a process pool, writing one JSON line per artifact.
+
+    Returns the summary, which is also written as the final line.
+    """
+    out = out or sys.stdout
+    workers = max(1, min(workers or default_jobs(), len(jobs) or 1))
+    start = time.perf_counter()
+    _prebuild_stubs(jobs)
+
+    ok = failed = 0
+    input_bytes = output_bytes = 0
+    job_seconds = 0.0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_job, job) for job in jobs]
+        for future in as_completed(futures):
+            report = future.result()
+            job_seconds += report['seconds']
+            if report['ok']:
+                ok += 1
+                input_bytes += report['result'].get('original_size', 0)
+                output_bytes += os.path.getsize(report['result']['output_path'])
+            else:
+                failed += 1
+            out.write(json.dumps(report) + "\n")
+            out.flush()
+    # Pool processes exit without running atexit handlers; collect their
+    # scratch directories now that their locks are released
+    from workspace import get_workspace
+    get_workspace().gc()
+
+    wall = time.perf_counter() - start
+    summary = {
+        'event': 'summary',
+        'jobs': len(jobs),
+        'ok': ok,
+        'failed': failed,
+        'workers': workers,
+        'wall_s': round(wall, 3),
+        'job_s': round(job_seconds, 3),
+        'input_bytes': input_bytes,
+        'output_bytes': output_bytes,
+        'artifacts_per_s': round(len(jobs) / wall, 2) if wall else None,
+        'input_mb_per_s': round(input_bytes / (1 << 20) / wall, 2) if wall else None,
+    }
+    out.write(json.dumps(summary) + "\n")
+    out.flush()
+    return summary
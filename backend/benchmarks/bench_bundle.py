@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Multi-binary bundle benchmark: one loader for many programs vs one per program.
+
+Builds --programs small tools, plus one large program of --big-mb MB, three
+ways: a dedicated gcc-built loader per program (-m source), a stub-mode
+binary per program, and a single bundle (obfuscator.obfuscate_bundle). For
+each it reports build time, gcc runs and total size on disk. It then times
+launching a small tool standalone and from the bundle, so the cost of the
+large sibling in the bundle shows up if the loader touches it:
+
+    python3 benchmarks/bench_bundle.py
+    python3 benchmarks/bench_bundle.py --programs 48 --cipher chacha20 --json
+"""
+
+import io
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+from common import hello_elf, make_synthetic_elf, obfuscate_quiet, time_run
+from encryptor import CIPHER_MODULES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-binary bundle benchmark")
+    parser.add_argument("--programs", type=int, default=24, help="Number of small programs")
+    parser.add_argument("--big-mb", type=int, default=32, help="Size of the large program in MB")
+    parser.add_argument("--cipher", default="xor", choices=list(CIPHER_MODULES))
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines")
+    args = parser.parse_args()
+
+    from cache import get_cache
+    from loader import get_stub
+    from obfuscator import compile_c_string, obfuscate_bundle
+    from workspace import get_workspace
+
+    workdir = tempfile.mkdtemp(prefix="bench_bundle_")
+    try:
+        inputs = []
+        for i in range(args.programs):
+            path = os.path.join(workdir, f"tool{i:02d}")
+            shutil.copyfile(hello_elf(), path)
+            os.chmod(path, 0o755)
+            inputs.append(path)
+        inputs.append(make_synthetic_elf(os.path.join(workdir, "big"), args.big_mb << 20))
+        # Stub builds are a one-off per cipher; leave them out of the comparison
+        get_stub(args.cipher, compile_c_string, get_cache())
+
+        rows = []
+        for layout in ("source", "stub", "bundle"):
+            out_dir = os.path.join(workdir, layout)
+            os.makedirs(out_dir)
+            builds = get_workspace().counters["builds"]
+            start = time.perf_counter()
+            if layout == "bundle":
+                with contextlib.redirect_stdout(io.StringIO()):
+                    obfuscate_bundle(inputs, args.cipher, os.path.join(out_dir, "bundle"))
+            else:
+                for path in inputs:
+                    obfuscate_quiet(path, args.cipher,
+                                    os.path.join(out_dir, os.path.basename(path)),
+                                    mode=layout, use_cache=False)
+            seconds = time.perf_counter() - start
+            outputs = [os.path.join(out_dir, name) for name in os.listdir(out_dir)]
+            rows.append({
+                "benchmark": "bundle_build",
+                "layout": layout,
+                "programs": len(inputs),
+                "cipher": args.cipher,
+                "build_ms": round(seconds * 1000, 1),
+                "gcc_runs": get_workspace().counters["builds"] - builds,
+                "files": len(outputs),
+                "total_bytes": sum(os.path.getsize(path) for path in outputs),
+            })
+
+        tool = os.path.join(workdir, "stub", "tool00")
+        bundle = os.path.join(workdir, "bundle", "bundle")
+        time_run([tool], 3)
+        time_run([bundle, "tool00"], 3)
+        standalone = time_run([tool], args.repeat)
+        bundled = time_run([bundle, "tool00"], args.repeat)
+        rows.append({
+            "benchmark": "bundle_launch",
+            "programs": len(inputs),
+            "cipher": args.cipher,
+            "bundle_bytes": os.path.getsize(bundle),
+            "standalone_ms": round(standalone * 1000, 3),
+            "from_bundle_ms": round(bundled * 1000, 3),
+        })
+
+        for row in rows:
+            if args.json:
+                print(json.dumps(row))
+            elif row["benchmark"] == "bundle_build":
+                print(f"{row['layout']:>7}: {row['programs']} programs in {row['build_ms']:>9} ms, "
+                      f"{row['gcc_runs']:>3} gcc runs, {row['files']:>3} files, "
+                      f"{row['total_bytes']:>10} bytes")
+            else:
+                print(f" launch: tool00 standalone {row['standalone_ms']} ms, from a "
+                      f"{row['bundle_bytes']}-byte bundle {row['from_bundle_ms']} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env node
+// Upload handoff benchmark: bytes copied and disk writes per request.
+//
+// Pushes an upload through the request path of server.js without Express,
+// once per handoff:
+//
+//   disk   the previous path: multer.diskStorage-style write to a directory
+//          on disk, then the whole upload read back for the ELF check and
+//          the signature hash
+//   spool  uploadStorage.SpoolStorage: hashed while it is written, spooled
+//          to tmpfs when available, nothing read back
+//
+// Both hand the spooled file to the warm worker pool, which writes the
+// artifact to --out-dir, then stream the artifact out as a download does.
+// Reported per request, from /proc/<pid>/io of this process and of the
+// workers: bytes moved through read()/write() (rchar + wchar) and bytes
+// written towards a disk (write_bytes; cancelled counts dirty pages that
+// were dropped again because the file was deleted before writeback).
+// Receiving the upload from the socket costs the same in both and is left
+// out.
+//
+//   node benchmarks/bench_handoff.js --file test_binary
+//   node benchmarks/bench_handoff.js --file big.elf --type chacha20 --requests 10
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const crypto = require('crypto');
+const { Readable, Writable } = require('stream');
+const { ObfuscatorPool } = require('../workerPool');
+const { SpoolStorage } = require('../uploadStorage');
+
+const CHUNK = 64 * 1024;
+
+function parseArgs(argv) {
+  const args = {
+    file: null,
+    type: 'xor',
+    requests: 5,
+    handoffs: 'disk,spool',
+    outDir: os.tmpdir()
+  };
+  for (let i = 2; i < argv.length; i++) {
+    const key = argv[i].replace(/^--/, '').replace(/-(\w)/g, (_, c) => c.toUpperCase());
+    const value = argv[++i];
+    args[key] = key === 'requests' ? parseInt(value, 10) : value;
+  }
+  if (!args.file) {
+    console.error('usage: bench_handoff.js --file <elf> [--type xor|...] [--requests N] ' +
+                  '[--handoffs disk,spool] [--out-dir DIR]');
+    process.exit(2);
+  }
+  return args;
+}
+
+function procIo(pid) {
+  const io = {};
+  for (const line of fs.readFileSync(`/proc/${pid}/io`, 'utf8').trim().split('\n')) {
+    const [key, value] = line.split(': ');
+    io[key] = parseInt(value, 10);
+  }
+  return io;
+}
+
+// Summed /proc/<pid>/io counters of this process and of the pool workers
+function snapshot(pool) {
+  const total = { server: procIo(process.pid), workers: {} };
+  for (const worker of pool.workers) {
+    for (const [key, value] of Object.entries(procIo(worker.proc.pid))) {
+      total.workers[key] = (total.workers[key] || 0) + value;
+    }
+  }
+  return total;
+}
+
+// A stand-in for the multipart file stream multer hands to storage engines
+function uploadStream(data) {
+  return Readable.from((function* () {
+    for (let i = 0; i < data.length; i += CHUNK) yield data.subarray(i, i + CHUNK);
+  })());
+}
+
+// The previous handoff: write to disk, then read back for the ELF check and hash
+function diskHandoff(data, uploadDir, name) {
+  return new Promise((resolve, reject) => {
+    const filePath = path.join(uploadDir, name);
+    const out = fs.createWriteStream(filePath);
+    uploadStream(data).pipe(out);
+    out.on('error', reject);
+    out.on('finish', () => {
+      const fileBuffer = fs.readFileSync(filePath);
+      const hash = crypto.createHash('sha256').update(fileBuffer).digest();
+      resolve({ path: filePath, header: fileBuffer.subarray(0, 64), sha256: hash });
+    });
+  });
+}
+
+function spoolHandoff(storage, data, name) {
+  return new Promise((resolve, reject) => {
+    storage._handleFile(null, { originalname: name, stream: uploadStream(data) },
+      (error, file) => (error ? reject(error) : resolve(file)));
+  });
+}
+
+function download(filePath) {
+  return new Promise((resolve, reject) => {
+    const sink = new Writable({ write: (chunk, encoding, cb) => cb() });
+    fs.createReadStream(filePath).on('error', reject).pipe(sink).on('finish', resolve);
+  });
+}
+
+async function main() {
+  const args = parseArgs(process.argv);
+  const data = fs.readFileSync(args.file);
+  const name = path.basename(args.file);
+  const uploadDir = fs.mkdtempSync(path.join(os.tmpdir(), 'bench_handoff_uploads_'));
+  const outDir = fs.mkdtempSync(path.join(args.outDir, 'bench_handoff_out_'));
+  const storage = new SpoolStorage({ fallbackDir: uploadDir, maxFileSize: data.length });
+  const pool = new ObfuscatorPool({ size: 1, maxQueue: Infinity });
+
+  const runOne = async (handoff, i) => {
+    const file = handoff === 'disk'
+      ? await diskHandoff(data, uploadDir, `${i}-${name}`)
+      : await spoolHandoff(storage, data, `${i}-${name}`);
+    if (file.header.readUInt32BE(0) !== 0x7F454C46) throw new Error(`${args.file} is not an ELF`);
+    const output = path.join(outDir, `obfuscated_${i}_${name}`);
+    await pool.run({ input: file.path, type: args.type, output });
+    fs.unlinkSync(file.path);
+    await download(output);
+    fs.unlinkSync(output);
+  };
+
+  try {
+    // Leave interpreter start-up and the stub build out of the numbers
+    await runOne('spool', 'warmup');
+    for (const handoff of args.handoffs.split(',')) {
+      const before = snapshot(pool);
+      for (let i = 0; i < args.requests; i++) await runOne(handoff, i);
+      const after = snapshot(pool);
+      const perRequest = (side, key) => Math.round((after[side][key] - before[side][key]) / args.requests);
+      console.log(JSON.stringify({
+        benchmark: 'handoff',
+        handoff,
+        spool: handoff === 'disk' ? 'disk' : (storage.tmpfsDir ? 'tmpfs' : 'disk'),
+        type: args.type,
+        upload_bytes: data.length,
+        server_bytes_copied: perRequest('server', 'rchar') + perRequest('server', 'wchar'),
+        worker_bytes_copied: perRequest('workers', 'rchar') + perRequest('workers', 'wchar'),
+        disk_write_bytes: perRequest('server', 'write_bytes') + perRequest('workers', 'write_bytes'),
+        cancelled_write_bytes: perRequest('server', 'cancelled_write_bytes') +
+          perRequest('workers', 'cancelled_write_bytes')
+      }));
+    }
+  } finally {
+    pool.close();
+    fs.rmSync(uploadDir, { recursive: true, force: true });
+    fs.rmSync(outDir, { recursive: true, force: true });
+  }
+}
+
+main().catch((e) => {
+  console.error(e);
+  process.exit(1);
+});
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Incremental re-obfuscation benchmark: rebuild time and delta size.
+
+Compiles a generated C program, then a second version with one small source
+change: a constant edited in one function (code keeps its layout), or a
+statement added to one function (everything after it moves). Both versions
+are protected three ways: a stub build with fresh random keys, a stub build
+with a key seed (keys fixed per input file), and incremental mode
+(-m incremental, keys fixed per content-defined chunk, the second build
+reusing the first one's manifest). For each it reports the time of the
+second build and the size of a binary delta from the first artifact to the
+second (zstd --patch-from), next to the delta between the two unprotected
+programs:
+
+    python3 benchmarks/bench_incremental.py
+    python3 benchmarks/bench_incremental.py --functions 4000 --cipher aes --json
+"""
+
+import os
+import json
+import time
+import shutil
+import argparse
+import subprocess
+import tempfile
+
+from common import obfuscate_quiet
+from encryptor import CIPHER_MODULES
+
+KEY_SEED = "bench-incremental-project-key"
+
+CHANGES = ("constant", "insert")
+
+
+def program_source(functions: int, change=None) -> str:
+    """C source with `functions` small functions and a lookup table.
+
+    `change` is None for the first version, or one of CHANGES.
+    """
+    parts = ["#include <stdio.h>\n",
+             "static const unsigned table[] = {",
+             ",".join(str((i * 2654435761) & 0xffffffff) for i in range(64 << 10)),
+             "};\n"]
+    for i in range(functions):
+        edited = i == functions // 2
+        extra = "    x ^= x >> 7;\n" if change == "insert" and edited else ""
+        factor = 1001 + i * 2 + (2 if change == "constant" and edited else 0)
+        parts.append(f"__attribute__((noinline)) unsigned f{i}(unsigned x) {{\n"
+                     f"    x = x * {factor}u + table[x % {64 << 10}];\n{extra}"
+                     f"    return x ^ (x >> {i % 13 + 1});\n}}\n")
+    parts.append("int main(int argc, char **argv) {\n    unsigned x = (unsigned)argc;\n")
+    parts.extend(f"    x = f{i}(x);\n" for i in range(functions))
+    parts.append('    if (argc > 1) printf("%u\\n", x);\n    (void)argv;\n    return 0;\n}\n')
+    return "".join(parts)
+
+
+def build_program(workdir: str, name: str, source: str) -> str:
+    src = os.path.join(workdir, name + ".c")
+    with open(src, "w") as f:
+        f.write(source)
+    path = os.path.join(workdir, name)
+    subprocess.run(["gcc", "-O2", "-static", src, "-o", path], check=True)
+    return path
+
+
+def delta_bytes(old: str, new: str, workdir: str):
+    """Size of a zstd delta from `old` to `new`, or None without zstd."""
+    if shutil.which("zstd") is None:
+        return None
+    patch = os.path.join(workdir, "delta.zst")
+    subprocess.run(["zstd", "-q", "-f", "-19", f"--patch-from={old}", new, "-o", patch],
+                   check=True)
+    return os.path.getsize(patch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental re-obfuscation benchmark")
+    parser.add_argument("--functions", type=int, default=2000)
+    parser.add_argument("--cipher", default="chacha20",
+                        choices=[c for c in CIPHER_MODULES if c != "rsa"])
+    parser.add_argument("--changes", default=",".join(CHANGES))
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_incremental_")
+    try:
+        v1 = build_program(workdir, "v1", program_source(args.functions))
+        for change in args.changes.split(","):
+            v2 = build_program(workdir, "v2", program_source(args.functions, change))
+            report(measure(v1, v2, change, args.cipher, workdir), args.json)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def measure(v1: str, v2: str, change: str, cipher: str, workdir: str) -> list:
+    """Rows for rebuilding v1's artifact as v2 under every layout."""
+    rows = [{"benchmark": "incremental", "change": change, "layout": "unprotected",
+             "size": os.path.getsize(v2), "rebuild_ms": None,
+             "delta_bytes": delta_bytes(v1, v2, workdir)}]
+
+    layouts = [
+        ("stub", dict(mode="stub", use_cache=False)),
+        ("stub+key-seed", dict(mode="stub", key_seed=KEY_SEED, use_cache=False)),
+        ("incremental, full", dict(mode="incremental", key_seed=KEY_SEED)),
+        ("incremental", dict(mode="incremental", key_seed=KEY_SEED)),
+    ]
+    for layout, options in layouts:
+        old = os.path.join(workdir, "old.out")
+        new = os.path.join(workdir, "new.out")
+        manifest = os.path.join(workdir, "build.manifest.json")
+        obfuscate_quiet(v1, cipher, old, manifest=manifest, **options)
+        if layout == "incremental, full":
+            # Same output, but rebuilt without the previous manifest
+            os.remove(manifest)
+        start = time.perf_counter()
+        result = obfuscate_quiet(v2, cipher, new, manifest=manifest, **options)
+        seconds = time.perf_counter() - start
+        row = {"benchmark": "incremental", "change": change, "layout": layout, "cipher": cipher,
+               "size": os.path.getsize(new), "rebuild_ms": round(seconds * 1000, 1),
+               "delta_bytes": delta_bytes(old, new, workdir)}
+        if "incremental" in result:
+            row["chunks"] = result["incremental"]["chunks"]
+            row["reused_chunks"] = result["incremental"]["reused_chunks"]
+        subprocess.run([new], check=True)
+        rows.append(row)
+        for path in (old, new, manifest):
+            if os.path.exists(path):
+                os.remove(path)
+    return rows
+
+
+def report(rows: list, as_json: bool):
+    for row in rows:
+        if as_json:
+            print(json.dumps(row))
+            continue
+        reused = (f", {row['reused_chunks']}/{row['chunks']} chunks reused"
+                  if "chunks" in row else "")
+        rebuild = row['rebuild_ms'] if row['rebuild_ms'] is not None else '-'
+        print(f"{row['change']:>8} {row['layout']:>18}: {row['size']:>9} bytes, "
+              f"rebuild {rebuild:>7} ms, delta {row['delta_bytes']} bytes{reused}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env node
+// Burst latency benchmark for the obfuscation backend.
+//
+// Fires a burst of concurrent obfuscation jobs and reports p50/p99 latency
+// and throughput. Either talks to a running server over HTTP, or drives the
+// obfuscator directly (no Express needed) to compare the per-request spawn
+// path against the warm worker pool:
+//
+//   node benchmarks/bench_latency.js --file test_binary --direct spawn
+//   node benchmarks/bench_latency.js --file test_binary --direct pool
+//   node benchmarks/bench_latency.js --file test_binary --url http://localhost:5000
+//
+// For the HTTP "before" numbers start the server with OBFUSCATOR_POOL=0.
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { spawn } = require('child_process');
+const { ObfuscatorPool } = require('../workerPool');
+
+function parseArgs(argv) {
+  const args = {
+    file: null,
+    url: null,
+    direct: null,
+    type: 'xor',
+    requests: 32,
+    concurrency: 16,
+    workers: os.cpus().length
+  };
+  for (let i = 2; i < argv.length; i++) {
+    const key = argv[i].replace(/^--/, '');
+    const value = argv[++i];
+    args[key] = ['requests', 'concurrency', 'workers'].includes(key) ? parseInt(value, 10) : value;
+  }
+  if (!args.file || (!args.url && !args.direct)) {
+    console.error('usage: bench_latency.js --file <elf> (--url <server> | --direct spawn|pool) ' +
+                  '[--type xor|rsa|aes] [--requests N] [--concurrency N] [--workers N]');
+    process.exit(2);
+  }
+  return args;
+}
+
+function percentile(sorted, p) {
+  if (sorted.length === 0) return 0;
+  const index = Math.min(sorted.length - 1, Math.ceil((p / 100) * sorted.length) - 1);
+  return sorted[Math.max(0, index)];
+}
+
+function spawnJob(job) {
+  return new Promise((resolve, reject) => {
+    const proc = spawn('python3', [
+      path.join(__dirname, '..', 'obfuscator.py'), job.input, '-t', job.type, '-o', job.output
+    ], { stdio: 'ignore' });
+    proc.on('error', reject);
+    proc.on('close', (code) => (code === 0 ? resolve() : reject(new Error(`exit ${code}`))));
+  });
+}
+
+async function httpJob(url, file, type) {
+  const form = new FormData();
+  form.append('file', new Blob([fs.readFileSync(file)]), path.basename(file));
+  form.append('encryptionType', type);
+  const response = await fetch(`${url.replace(/\/$/, '')}/api/obfuscate`, { method: 'POST', body: form });
+  await response.arrayBuffer();
+  if (!response.ok) throw new Error(`HTTP ${response.status}`);
+}
+
+async function main() {
+  const args = parseArgs(process.argv);
+  const outDir = fs.mkdtempSync(path.join(os.tmpdir(), 'bench_latency_'));
+  const pool = args.direct === 'pool' ? new ObfuscatorPool({ size: args.workers, maxQueue: Infinity }) : null;
+
+  if (pool) {
+    // Measure steady state, not interpreter warm-up
+    await pool.run({ input: args.file, type: args.type, output: path.join(outDir, 'warmup') });
+  }
+
+  const runOne = (i) => {
+    const job = { input: path.resolve(args.file), type: args.type, output: path.join(outDir, `out_${i}`) };
+    if (args.url) return httpJob(args.url, args.file, args.type);
+    if (pool) return pool.run(job);
+    return spawnJob(job);
+  };
+
+  const latencies = [];
+  let failures = 0;
+  let next = 0;
+  const started = Date.now();
+
+  async function lane() {
+    while (next < args.requests) {
+      const i = next++;
+      const t0 = process.hrtime.bigint();
+      try {
+        await runOne(i);
+        latencies.push(Number(process.hrtime.bigint() - t0) / 1e6);
+      } catch (e) {
+        failures++;
+      }
+    }
+  }
+  await Promise.all(Array.from({ length: args.concurrency }, lane));
+  const wallMs = Date.now() - started;
+
+  if (pool) pool.close();
+  fs.rmSync(outDir, { recursive: true, force: true });
+
+  latencies.sort((a, b) => a - b);
+  const report = {
+    target: args.url || args.direct,
+    type: args.type,
+    requests: args.requests,
+    concurrency: args.concurrency,
+    failures,
+    p50_ms: +percentile(latencies, 50).toFixed(1),
+    p99_ms: +percentile(latencies, 99).toFixed(1),
+    max_ms: +(latencies[latencies.length - 1] || 0).toFixed(1),
+    wall_ms: wallMs,
+    jobs_per_s: +((latencies.length * 1000) / wallMs).toFixed(2)
+  };
+  console.log(JSON.stringify(report));
+}
+
+main().catch((e) => {
+  console.error(e);
+  process.exit(1);
+});
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Loader cold-start benchmark.
+
+For each payload size and cipher, obfuscates a synthetic ELF and measures
+how long the resulting binary takes to decrypt, re-exec and exit, compared
+with running the unprotected program directly:
+
+    python3 benchmarks/bench_loader.py
+    python3 benchmarks/bench_loader.py --sizes 1,16,64 --ciphers aes,rsa --json
+    python3 benchmarks/bench_loader.py --compress zlib --compressible
+"""
+
+import os
+import json
+import shutil
+import argparse
+import tempfile
+
+from common import make_synthetic_elf, obfuscate_quiet, time_run
+from encryptor import CIPHER_MODULES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loader cold-start benchmark")
+    parser.add_argument("--sizes", default="1,16,64", help="Comma-separated payload sizes in MB")
+    parser.add_argument("--ciphers", default=",".join(CIPHER_MODULES))
+    parser.add_argument("--exec", dest="exec_mode", default="memfd", choices=["memfd", "tmpfile"],
+                        help="Loader exec mode to benchmark")
+    parser.add_argument("--compress", dest="compression", default="none",
+                        choices=["none", "zlib", "lzma"], help="Compression stage to benchmark")
+    parser.add_argument("--level", type=int, default=None, help="Compression level 0-9")
+    parser.add_argument("--compressible", action="store_true",
+                        help="Pad inputs with code-like data instead of random bytes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_loader_")
+    try:
+        if not args.json:
+            print(f"{'size':>8} {'cipher':>6} {'output MB':>10} {'plain ms':>10} "
+                  f"{'loader ms':>10} {'overhead ms':>12}")
+        for size_mb in (int(s) for s in args.sizes.split(",")):
+            elf = make_synthetic_elf(os.path.join(workdir, f"in_{size_mb}"), size_mb << 20,
+                                     args.compressible)
+            plain = time_run([elf], args.repeat)
+            for cipher in args.ciphers.split(","):
+                out = os.path.join(workdir, f"out_{size_mb}_{cipher}")
+                obfuscate_quiet(elf, cipher, out, exec_mode=args.exec_mode,
+                                compression=args.compression, level=args.level)
+                loaded = time_run([out], args.repeat)
+                row = {
+                    "benchmark": "loader_cold_start",
+                    "size_mb": size_mb,
+                    "cipher": cipher,
+                    "exec_mode": args.exec_mode,
+                    "compression": args.compression,
+                    "output_mb": round(os.path.getsize(out) / (1 << 20), 2),
+                    "plain_ms": round(plain * 1000, 2),
+                    "loader_ms": round(loaded * 1000, 2),
+                    "overhead_ms": round((loaded - plain) * 1000, 2),
+                }
+                if args.json:
+                    print(json.dumps(row))
+                else:
+                    print(f"{size_mb:>6}MB {cipher:>6} {row['output_mb']:>10} {row['plain_ms']:>10} "
+                          f"{row['loader_ms']:>10} {row['overhead_ms']:>12}")
+                os.remove(out)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
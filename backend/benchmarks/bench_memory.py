@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Peak memory benchmark for the obfuscation pipeline.
+
+Runs obfuscator.py in a child process for synthetic inputs of several sizes
+and reports the child's peak RSS:
+
+    python3 benchmarks/bench_memory.py
+    python3 benchmarks/bench_memory.py --sizes 10,100,1000 --ciphers xor,aes --json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from common import BACKEND_DIR, make_synthetic_elf
+from encryptor import CIPHER_MODULES
+
+
+def peak_rss_run(argv):
+    """Run argv, returning (peak RSS in MB, wall seconds)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(argv, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{argv} exited with {proc.returncode}")
+    # ru_maxrss is in kilobytes on Linux
+    return usage.ru_maxrss / 1024, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Obfuscator peak memory benchmark")
+    parser.add_argument("--sizes", default="10,100", help="Comma-separated input sizes in MB (e.g. 10,100,1000)")
+    parser.add_argument("--ciphers", default=",".join(CIPHER_MODULES))
+    parser.add_argument("--mode", default="stub", choices=["stub", "source"])
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_memory_")
+    script = os.path.join(BACKEND_DIR, "obfuscator.py")
+    try:
+        if not args.json:
+            print(f"{'size':>8} {'cipher':>6} {'peak RSS MB':>12} {'RSS/input':>10} {'wall s':>8}")
+        for size_mb in (int(s) for s in args.sizes.split(",")):
+            elf = make_synthetic_elf(os.path.join(workdir, "input"), size_mb << 20)
+            for cipher in args.ciphers.split(","):
+                out = os.path.join(workdir, "output")
+                rss, wall = peak_rss_run([sys.executable, script, elf, "-t", cipher,
+                                          "-o", out, "-m", args.mode])
+                row = {
+                    "benchmark": "peak_memory",
+                    "mode": args.mode,
+                    "size_mb": size_mb,
+                    "cipher": cipher,
+                    "peak_rss_mb": round(rss, 1),
+                    "wall_s": round(wall, 2),
+                }
+                if args.json:
+                    print(json.dumps(row))
+                else:
+                    print(f"{size_mb:>6}MB {cipher:>6} {row['peak_rss_mb']:>12} "
+                          f"{rss / size_mb:>10.2f} {row['wall_s']:>8}")
+                os.remove(out)
+            os.remove(elf)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
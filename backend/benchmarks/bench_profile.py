@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Loader build profile benchmark: glibc vs nolibc.
+
+For each cipher and loader profile (loader.LOADER_PROFILES), builds the
+precompiled stub and reports its size and the shared libraries it needs,
+then obfuscates a tiny program and synthetic ELFs of the given sizes and
+measures the end-to-end launch time of the result (decrypt, exec, exit)
+next to running the unprotected program directly:
+
+    python3 benchmarks/bench_profile.py
+    python3 benchmarks/bench_profile.py --sizes 0,16 --ciphers xor,chacha20 --repeat 50 --json
+"""
+
+import os
+import json
+import shutil
+import argparse
+import subprocess
+import tempfile
+
+from common import hello_elf, make_synthetic_elf, obfuscate_quiet, time_run
+from encryptor import CIPHER_MODULES
+from loader import LOADER_PROFILES, get_stub
+
+
+def needed_libraries(path: str) -> list:
+    """DT_NEEDED entries of an ELF, via readelf when it is installed."""
+    if shutil.which("readelf") is None:
+        return []
+    out = subprocess.run(["readelf", "-d", path], stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL, text=True).stdout
+    return [line.split("[")[1].rstrip("]") for line in out.splitlines() if "(NEEDED)" in line]
+
+
+def launch_time(argv, repeat: int) -> float:
+    """time_run after a few untimed launches, so page cache and CPU frequency settle."""
+    time_run(argv, 3)
+    return time_run(argv, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loader build profile benchmark")
+    parser.add_argument("--sizes", default="0,16",
+                        help="Comma-separated payload sizes in MB; 0 is the bare test program")
+    parser.add_argument("--ciphers", default=",".join(CIPHER_MODULES))
+    parser.add_argument("--profiles", default=",".join(LOADER_PROFILES))
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines")
+    args = parser.parse_args()
+
+    from cache import get_cache
+    from obfuscator import compile_c_string
+
+    workdir = tempfile.mkdtemp(prefix="bench_profile_")
+    try:
+        if not args.json:
+            print(f"{'size':>8} {'cipher':>8} {'profile':>7} {'stub B':>8} {'libs':>5} "
+                  f"{'plain ms':>9} {'launch ms':>10} {'overhead ms':>12}")
+        for size_mb in (int(s) for s in args.sizes.split(",")):
+            elf = (hello_elf() if size_mb == 0 else
+                   make_synthetic_elf(os.path.join(workdir, f"in_{size_mb}"), size_mb << 20))
+            plain = launch_time([elf], args.repeat)
+            for cipher in args.ciphers.split(","):
+                for profile in args.profiles.split(","):
+                    stub, _ = get_stub(cipher, compile_c_string, get_cache(), profile=profile)
+                    out = os.path.join(workdir, f"out_{size_mb}_{cipher}_{profile}")
+                    obfuscate_quiet(elf, cipher, out, loader_profile=profile)
+                    launched = launch_time([out], args.repeat)
+                    row = {
+                        "benchmark": "loader_profile",
+                        "size_mb": size_mb,
+                        "cipher": cipher,
+                        "profile": profile,
+                        "stub_bytes": os.path.getsize(stub),
+                        "needed": needed_libraries(stub),
+                        "plain_ms": round(plain * 1000, 3),
+                        "launch_ms": round(launched * 1000, 3),
+                        "overhead_ms": round((launched - plain) * 1000, 3),
+                    }
+                    if args.json:
+                        print(json.dumps(row))
+                    else:
+                        print(f"{size_mb:>6}MB {cipher:>8} {profile:>7} {row['stub_bytes']:>8} "
+                              f"{len(row['needed']):>5} {row['plain_ms']:>9} "
+                              f"{row['launch_ms']:>10} {row['overhead_ms']:>12}")
+                    os.remove(out)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
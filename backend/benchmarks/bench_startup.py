@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Interpreter startup and import-time benchmark for obfuscator.py.
+
+Runs `python -X importtime` in fresh interpreters and reports the cumulative
+import time of obfuscator.py, the heaviest modules it pulls in, and for a
+full CLI job per cipher the end-to-end wall time, the time spent importing
+and which heavy optional packages (pycryptodome, lief) were loaded:
+
+    python3 benchmarks/bench_startup.py
+    python3 benchmarks/bench_startup.py --ciphers xor,aes --repeat 10 --json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+from common import BACKEND_DIR, hello_elf
+from encryptor import CIPHER_MODULES
+
+HEAVY_PACKAGES = ("Crypto", "lief", "numpy")
+
+
+def importtime(argv):
+    """Run `python -X importtime argv`; returns (wall s, {module: (depth, cumulative us)})."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=BACKEND_DIR,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{argv} exited with {proc.returncode}:\n{proc.stderr[-2000:]}")
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (depth, int(cumulative))
+    return wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="obfuscator.py startup benchmark")
+    parser.add_argument("--ciphers", default=",".join(CIPHER_MODULES))
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--top", type=int, default=8, help="Heaviest imports to list")
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines")
+    args = parser.parse_args()
+
+    # Startup numbers assume bytecode caches exist, as they do once installed
+    subprocess.run([sys.executable, "-m", "compileall", "-q", BACKEND_DIR],
+                   stdout=subprocess.DEVNULL, check=True)
+
+    rows = []
+    runs = [importtime(["-c", "import obfuscator"]) for _ in range(args.repeat)]
+    modules = runs[-1][1]
+    rows.append({
+        "benchmark": "import",
+        "module": "obfuscator",
+        "import_ms": round(statistics.median(r[1]["obfuscator"][1] for r in runs) / 1000, 2),
+        "heavy": sorted({m.split(".")[0] for m in modules} & set(HEAVY_PACKAGES)),
+        "top": [{"module": name, "ms": round(us / 1000, 2)} for name, (depth, us) in
+                sorted(((n, v) for n, v in modules.items() if v[0] == 1),
+                       key=lambda item: -item[1][1])[:args.top]],
+    })
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        elf = hello_elf()
+        for cipher in args.ciphers.split(","):
+            out = os.path.join(workdir, f"out_{cipher}")
+            argv = [os.path.join(BACKEND_DIR, "obfuscator.py"), elf, "-t", cipher, "-o", out,
+                    "--no-cache"]
+            runs = [importtime(argv) for _ in range(args.repeat)]
+            modules = runs[-1][1]
+            rows.append({
+                "benchmark": "cli_job",
+                "cipher": cipher,
+                "wall_ms": round(statistics.median(r[0] for r in runs) * 1000, 2),
+                "import_ms": round(statistics.median(
+                    sum(us for depth, us in r[1].values() if depth == 0) for r in runs) / 1000, 2),
+                "heavy": sorted({m.split(".")[0] for m in modules} & set(HEAVY_PACKAGES)),
+            })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for row in rows:
+        if args.json:
+            print(json.dumps(row))
+        elif row["benchmark"] == "import":
+            print(f"import obfuscator: {row['import_ms']} ms "
+                  f"(heavy: {', '.join(row['heavy']) or 'none'})")
+            for entry in row["top"]:
+                print(f"  {entry['module']:<20} {entry['ms']:>8} ms")
+        else:
+            print(f"cli job {row['cipher']:>4}: {row['wall_ms']:>8} ms wall, "
+                  f"{row['import_ms']:>7} ms importing "
+                  f"(heavy: {', '.join(row['heavy']) or 'none'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Loader unpack time versus decryption thread count.
+
+Obfuscates one synthetic ELF per cipher with each thread count (0 = one per
+CPU) and reports the loader's overhead over running the program directly:
+
+    python3 benchmarks/bench_threads.py
+    python3 benchmarks/bench_threads.py --size 256 --threads 1,2,4,8,0 --json
+"""
+
+import os
+import json
+import shutil
+import argparse
+import tempfile
+
+from common import make_synthetic_elf, obfuscate_quiet, time_run
+from encryptor import CIPHER_MODULES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loader thread scaling benchmark")
+    parser.add_argument("--size", type=int, default=64, help="Payload size in MB")
+    parser.add_argument("--ciphers", default=",".join(CIPHER_MODULES))
+    parser.add_argument("--threads", default="1,2,4,8,0",
+                        help="Comma-separated thread counts (0 = one per CPU)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_threads_")
+    try:
+        elf = make_synthetic_elf(os.path.join(workdir, "input"), args.size << 20)
+        plain = time_run([elf], args.repeat)
+        if not args.json:
+            print(f"{args.size} MB payload, {len(os.sched_getaffinity(0))} CPUs available")
+            print(f"{'cipher':>6} {'threads':>8} {'loader ms':>10} {'unpack ms':>10} {'speedup':>8}")
+        for cipher in args.ciphers.split(","):
+            baseline = None
+            for threads in (int(t) for t in args.threads.split(",")):
+                out = os.path.join(workdir, f"out_{cipher}_{threads}")
+                obfuscate_quiet(elf, cipher, out, threads=threads)
+                loaded = time_run([out], args.repeat)
+                unpack = loaded - plain
+                baseline = baseline or unpack
+                row = {
+                    "benchmark": "loader_threads",
+                    "size_mb": args.size,
+                    "cipher": cipher,
+                    "threads": threads or "auto",
+                    "loader_ms": round(loaded * 1000, 2),
+                    "unpack_ms": round(unpack * 1000, 2),
+                    "speedup": round(baseline / unpack, 2) if unpack > 0 else None,
+                }
+                if args.json:
+                    print(json.dumps(row))
+                else:
+                    print(f"{cipher:>6} {row['threads']:>8} {row['loader_ms']:>10} "
+                          f"{row['unpack_ms']:>10} {row['speedup']:>8}")
+                os.remove(out)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+XOR encryption throughput benchmark (MB/s) across input sizes.
+
+Compares the legacy per-byte generator with the bulk xor_bytes engine for
+single-byte and multi-byte keys:
+
+    python3 benchmarks/bench_xor.py
+    python3 benchmarks/bench_xor.py --sizes 1,16,64,256 --json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from encryptor import xor_bytes
+
+
+def legacy_xor(data: bytes, key: bytes) -> bytes:
+    return bytes(a ^ key[0] for a in data)
+
+
+def throughput(func, data: bytes, key: bytes, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data, key)
+        best = min(best, time.perf_counter() - start)
+    return len(data) / (1 << 20) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="XOR throughput benchmark")
+    parser.add_argument("--sizes", default="1,16,64,256",
+                        help="Comma-separated input sizes in MB")
+    parser.add_argument("--legacy-max", type=int, default=16,
+                        help="Largest size (MB) to run the slow legacy path on")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines")
+    args = parser.parse_args()
+
+    engines = [
+        ("legacy-1B", legacy_xor, b"\x5a"),
+        ("bulk-1B", xor_bytes, b"\x5a"),
+        ("bulk-8B", xor_bytes, os.urandom(8)),
+        ("bulk-16B", xor_bytes, os.urandom(16)),
+    ]
+
+    if not args.json:
+        print(f"{'size':>8}  " + "  ".join(f"{name:>12}" for name, _, _ in engines) + "   (MB/s)")
+
+    for size_mb in (int(s) for s in args.sizes.split(",")):
+        data = os.urandom(size_mb << 20)
+        row = {}
+        for name, func, key in engines:
+            if func is legacy_xor and size_mb > args.legacy_max:
+                row[name] = None
+                continue
+            repeat = 1 if func is legacy_xor else args.repeat
+            row[name] = round(throughput(func, data, key, repeat), 1)
+
+        if args.json:
+            print(json.dumps({"benchmark": "xor", "size_mb": size_mb, "mb_per_s": row}))
+        else:
+            cells = [f"{'-' if v is None else v:>12}" for v in row.values()]
+            print(f"{size_mb:>6}MB  " + "  ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
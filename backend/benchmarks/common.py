@@ -0,0 +1,84 @@
+"""
+Shared helpers for the benchmark scripts in this directory.
+"""
+
+import os
+import sys
+import time
+import atexit
+import shutil
+import statistics
+import subprocess
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+HELLO_SOURCE = r"""
+#include <stdio.h>
+int main(int argc, char **argv) {
+    (void)argv;
+    if (argc > 1) printf("hello from synthetic ELF\n");
+    return 0;
+}
+"""
+
+_hello_path = None
+
+
+def hello_elf() -> str:
+    """Path to a tiny dynamically linked ELF, compiled once per process."""
+    global _hello_path
+    if _hello_path is None:
+        workdir = tempfile.mkdtemp(prefix="bench_hello_")
+        atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+        src = os.path.join(workdir, "hello.c")
+        with open(src, "w") as f:
+            f.write(HELLO_SOURCE)
+        _hello_path = os.path.join(workdir, "hello")
+        subprocess.run(["gcc", "-O2", src, "-o", _hello_path], check=True)
+    return _hello_path
+
+
+def make_synthetic_elf(path: str, size: int, compressible: bool = False) -> str:
+    """Write a runnable ELF of roughly `size` bytes.
+
+    A tiny program is padded with trailing bytes; the kernel ignores data
+    past the program headers, so the result still runs and exits at once,
+    while the obfuscator and loader have to process the full size. Random
+    padding models already-compressed payloads; `compressible` pads with
+    repetitive, code-like data instead.
+    """
+    shutil.copyfile(hello_elf(), path)
+    remaining = max(0, size - os.path.getsize(path))
+    with open(path, "ab") as f:
+        while remaining > 0:
+            n = min(remaining, 1 << 20)
+            if compressible:
+                block = (b"\x48\x89\xe5\x48\x83\xec\x10\x89\x7d\xfc" * (n // 10 + 1))[:n]
+            else:
+                block = os.urandom(n)
+            f.write(block)
+            remaining -= n
+    os.chmod(path, 0o755)
+    return path
+
+
+def time_run(argv, repeat: int = 5) -> float:
+    """Median wall time in seconds of running argv to completion."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(argv, stdout=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def obfuscate_quiet(input_path: str, cipher: str, output_path: str, **kwargs) -> dict:
+    """Run Obfuscator.obfuscate in-process with its log output suppressed."""
+    import io
+    import contextlib
+    from obfuscator import Obfuscator
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Obfuscator(input_path).obfuscate(cipher, output_path, **kwargs)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark suite for the whole obfuscation pipeline.
+
+For each synthetic input size and cipher it times the raw encryptor
+(encryptor.encrypt), a full Obfuscator.obfuscate run and the loader startup
+of the produced binary. Results are written to a JSON file named after the
+current commit, and can be compared against an earlier run; any metric slower than the baseline by more than --threshold percent is
+reported as a regression and makes the script exit with status 1:
+
+    python3 benchmarks/run.py
+    python3 benchmarks/run.py --sizes 1,16,64,256,500 --repeat 5
+    python3 benchmarks/run.py --baseline benchmarks/results/3f42e55.json --threshold 10
+    python3 benchmarks/run.py --compare old.json new.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+from common import BACKEND_DIR, make_synthetic_elf, obfuscate_quiet, time_run
+from encryptor import CIPHER_MODULES
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Fields that identify a row; everything numeric besides them is a metric
+KEY_FIELDS = ("benchmark", "size_mb", "cipher", "mode")
+
+# Metrics compared against the baseline; higher is worse for all of them
+COMPARED_METRICS = ("encrypt_ms", "obfuscate_ms", "loader_overhead_ms")
+
+
+def git_revision() -> str:
+    """Short commit hash, with a -dirty suffix for uncommitted changes."""
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=BACKEND_DIR, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True).stdout.strip()
+    rev = git("rev-parse", "--short", "HEAD") or "unknown"
+    return rev + ("-dirty" if git("status", "--porcelain", "--untracked-files=no") else "")
+
+
+def median_ms(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def bench_encrypt(data: bytes, cipher: str, repeat: int) -> dict:
+    from encryptor import encrypt
+    encrypt_ms = median_ms(lambda: encrypt(cipher, data), repeat)
+    return {
+        "encrypt_ms": encrypt_ms,
+        "encrypt_mb_s": round(len(data) / (1 << 20) / (encrypt_ms / 1000), 1) if encrypt_ms else None,
+    }
+
+
+def bench_obfuscate(elf: str, cipher: str, mode: str, out: str, repeat: int, plain_s: float,
+                    loader_repeat: int) -> dict:
+    kwargs = dict(mode=mode, use_cache=False)
+    # Warm the stub cache (and the page cache for the input) outside the timing
+    obfuscate_quiet(elf, cipher, out, **kwargs)
+    results = []
+    obfuscate_ms = median_ms(lambda: results.append(obfuscate_quiet(elf, cipher, out, **kwargs)),
+                             repeat)
+    loader_s = time_run([out], loader_repeat)
+    stages = results[-1].get("stages", {})
+    return {
+        "obfuscate_ms": obfuscate_ms,
+        "output_mb": round(os.path.getsize(out) / (1 << 20), 2),
+        "loader_ms": round(loader_s * 1000, 2),
+        "loader_overhead_ms": round((loader_s - plain_s) * 1000, 2),
+        "stages_ms": {name: stats["wall_ms"] for name, stats in stages.items()},
+    }
+
+
+def run_suite(args) -> dict:
+    rows = []
+    workdir = tempfile.mkdtemp(prefix="bench_run_")
+    try:
+        for size_mb in (int(s) for s in args.sizes.split(",")):
+            elf = make_synthetic_elf(os.path.join(workdir, f"in_{size_mb}"), size_mb << 20)
+            with open(elf, "rb") as f:
+                data = f.read()
+            plain_s = time_run([elf], args.loader_repeat)
+            for cipher in args.ciphers.split(","):
+                encrypt = bench_encrypt(data, cipher, args.repeat)
+                for mode in args.modes.split(","):
+                    out = os.path.join(workdir, f"out_{size_mb}_{cipher}_{mode}")
+                    row = {"benchmark": "pipeline", "size_mb": size_mb, "cipher": cipher,
+                           "mode": mode, "plain_ms": round(plain_s * 1000, 2)}
+                    row.update(encrypt)
+                    row.update(bench_obfuscate(elf, cipher, mode, out, args.repeat, plain_s,
+                                               args.loader_repeat))
+                    rows.append(row)
+                    print(f"{size_mb:>6}MB {cipher:>4} {mode:>7} encrypt {row['encrypt_ms']:>9} ms "
+                          f"obfuscate {row['obfuscate_ms']:>9} ms "
+                          f"loader +{row['loader_overhead_ms']:>8} ms", file=sys.stderr)
+                    os.remove(out)
+            del data
+            os.remove(elf)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "host": socket.gethostname(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": len(os.sched_getaffinity(0)),
+            "sizes_mb": args.sizes,
+            "repeat": args.repeat,
+        },
+        "results": rows,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_ms: float) -> list:
+    """Print a comparison table; returns the regressions as dicts."""
+    def key(row):
+        return tuple(row.get(k) for k in KEY_FIELDS)
+
+    old_rows = {key(row): row for row in baseline["results"]}
+    regressions = []
+    print(f"baseline {baseline['meta']['revision']} -> current {current['meta']['revision']} "
+          f"(threshold {threshold:g}%)")
+    print(f"{'size':>8} {'cipher':>6} {'mode':>7} {'metric':>19} {'old':>10} {'new':>10} {'change':>8}")
+    for row in current["results"]:
+        old = old_rows.get(key(row))
+        if old is None:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = old.get(metric), row.get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before * 100 if before > 0 else 0.0
+            regressed = change > threshold and after - before > min_delta_ms
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{row['size_mb']:>6}MB {row['cipher']:>6} {row['mode']:>7} {metric:>19} "
+                  f"{before:>10} {after:>10} {change:>+7.1f}%{flag}")
+            if regressed:
+                regressions.append({"size_mb": row["size_mb"], "cipher": row["cipher"],
+                                    "mode": row["mode"], "metric": metric,
+                                    "baseline": before, "current": after,
+                                    "change_pct": round(change, 1)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Obfuscation pipeline benchmark suite")
+    parser.add_argument("--sizes", default="1,16,64",
+                        help="Comma-separated input sizes in MB (e.g. 1,16,64,256,500)")
+    parser.add_argument("--ciphers", default=",".join(CIPHER_MODULES))
+    parser.add_argument("--modes", default="stub", help="Comma-separated build modes (stub,source)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per encrypt/obfuscate measurement (median)")
+    parser.add_argument("--loader-repeat", type=int, default=5,
+                        help="Runs per loader startup measurement (median)")
+    parser.add_argument("--output", help="Results file (default: results/<revision>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two results files without running anything")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent slowdown reported as a regression (default: %(default)s)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                        help="Ignore slowdowns smaller than this many ms (timer noise)")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+    else:
+        current = run_suite(args)
+        output = args.output or os.path.join(RESULTS_DIR, f"{current['meta']['revision']}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {output}")
+        if not args.baseline:
+            return
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:g}%")
+        sys.exit(1)
+    print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import contextlib
+from typing import Optional
+
+# Content-addressed, size-bounded LRU cache for build artifacts.
+#
+# Entries live in CACHE_DIR/<namespace>/<key><suffix>, where the key is a
+# hash of everything that determines the artifact (e.g. input hash + cipher
+# + stub version). Reads refresh the entry's mtime and eviction removes the
+# least recently used entries until the cache fits in max_bytes. Hit, miss
+# and eviction counters are kept in CACHE_DIR/stats.json so every worker
+# process contributes to the same numbers.
+
+CACHE_DIR = os.environ.get(
+    "SIMPFUSCATOR_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache"),
+)
+CACHE_MAX_BYTES = int(os.environ.get("SIMPFUSCATOR_CACHE_MAX_MB", "2048")) << 20
+
+
+def cache_key(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def file_digest(path: str, chunk_size: int = 4 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ObfuscationCache:
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, namespace: str, key: str, suffix: str = "") -> str:
+        return os.path.join(self.root, namespace, key + suffix)
+
+    def get(self, namespace: str, key: str, suffix: str = "") -> Optional[str]:
+        """Path of a cached entry (refreshing its LRU position), or None."""
+        path = self.path(namespace, key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self._count(namespace, "misses")
+            return None
+        self._count(namespace, "hits")
+        return path
+
+    def put(self, namespace: str, key: str, src_path: str, suffix: str = "",
+            move: bool = False) -> str:
+        """Store a copy of src_path (or move it there) and enforce the size bound."""
+        path = self.path(namespace, key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        if move:
+            shutil.move(src_path, tmp_path)
+        else:
+            shutil.copy2(src_path, tmp_path)
+        # Atomic, so concurrent readers only ever see complete entries
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+        return path
+
+    def put_json(self, namespace: str, key: str, data: dict) -> str:
+        path = self.path(namespace, key, ".json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        return path
+
+    def get_json(self, namespace: str, key: str) -> Optional[dict]:
+        try:
+            with open(self.path(namespace, key, ".json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _entries(self):
+        for namespace in os.listdir(self.root):
+            directory = os.path.join(self.root, namespace)
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield entry.path, st.st_size, st.st_mtime
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Remove least recently used entries until the cache fits. Returns bytes freed."""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+                total -= size
+                freed += size
+                evicted += 1
+        if evicted:
+            self._count("all", "evictions", evicted)
+            self._count("all", "evicted_bytes", freed)
+        return freed
+
+    @contextlib.contextmanager
+    def _locked_stats(self):
+        with open(os.path.join(self.root, "stats.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            path = os.path.join(self.root, "stats.json")
+            try:
+                with open(path) as f:
+                    stats = json.load(f)
+            except (FileNotFoundError, ValueError):
+                stats = {}
+            yield stats
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(stats, f)
+            os.replace(tmp_path, path)
+
+    def _count(self, namespace: str, counter: str, amount: int = 1):
+        with self._locked_stats() as stats:
+            bucket = stats.setdefault(namespace, {})
+            bucket[counter] = bucket.get(counter, 0) + amount
+            bucket["updated"] = time.time()
+
+    def stats(self) -> dict:
+        with self._locked_stats() as stats:
+            counters = dict(stats)
+        entries = list(self._entries())
+        counters["entries"] = len(entries)
+        counters["bytes"] = sum(size for _, size, _ in entries)
+        counters["max_bytes"] = self.max_bytes
+        return counters
+
+
+_default_cache = None
+
+
+def get_cache() -> ObfuscationCache:
+    """Process-wide cache at CACHE_DIR."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ObfuscationCache()
+    return _default_cache
@@ -0,0 +1,365 @@
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+from Crypto.Util.Padding import pad
+
+# AES-128-CBC with PKCS7 padding. The loader uses AES-NI when the CPU has it
+# and T-tables otherwise.
+
+CIPHER_ID = 3
+LABEL = "AES"
+
+# S-box, round constants and key expansion, shared with the AES-CTR
+# decryptor (cipher_aes_ctr.py)
+aes_key_schedule_func = """
+// S-box for AES
+static const unsigned char sbox[256] = {
+    0x63, 0x7c, 0x77, 0x7b, 0xf2, 0x6b, 0x6f, 0xc5, 0x30, 0x01, 0x67, 0x2b, 0xfe, 0xd7, 0xab, 0x76,
+    0xca, 0x82, 0xc9, 0x7d, 0xfa, 0x59, 0x47, 0xf0, 0xad, 0xd4, 0xa2, 0xaf, 0x9c, 0xa4, 0x72, 0xc0,
+    0xb7, 0xfd, 0x93, 0x26, 0x36, 0x3f, 0xf7, 0xcc, 0x34, 0xa5, 0xe5, 0xf1, 0x71, 0xd8, 0x31, 0x15,
+    0x04, 0xc7, 0x23, 0xc3, 0x18, 0x96, 0x05, 0x9a, 0x07, 0x12, 0x80, 0xe2, 0xeb, 0x27, 0xb2, 0x75,
+    0x09, 0x83, 0x2c, 0x1a, 0x1b, 0x6e, 0x5a, 0xa0, 0x52, 0x3b, 0xd6, 0xb3, 0x29, 0xe3, 0x2f, 0x84,
+    0x53, 0xd1, 0x00, 0xed, 0x20, 0xfc, 0xb1, 0x5b, 0x6a, 0xcb, 0xbe, 0x39, 0x4a, 0x4c, 0x58, 0xcf,
+    0xd0, 0xef, 0xaa, 0xfb, 0x43, 0x4d, 0x33, 0x85, 0x45, 0xf9, 0x02, 0x7f, 0x50, 0x3c, 0x9f, 0xa8,
+    0x51, 0xa3, 0x40, 0x8f, 0x92, 0x9d, 0x38, 0xf5, 0xbc, 0xb6, 0xda, 0x21, 0x10, 0xff, 0xf3, 0xd2,
+    0xcd, 0x0c, 0x13, 0xec, 0x5f, 0x97, 0x44, 0x17, 0xc4, 0xa7, 0x7e, 0x3d, 0x64, 0x5d, 0x19, 0x73,
+    0x60, 0x81, 0x4f, 0xdc, 0x22, 0x2a, 0x90, 0x88, 0x46, 0xee, 0xb8, 0x14, 0xde, 0x5e, 0x0b, 0xdb,
+    0xe0, 0x32, 0x3a, 0x0a, 0x49, 0x06, 0x24, 0x5c, 0xc2, 0xd3, 0xac, 0x62, 0x91, 0x95, 0xe4, 0x79,
+    0xe7, 0xc8, 0x37, 0x6d, 0x8d, 0xd5, 0x4e, 0xa9, 0x6c, 0x56, 0xf4, 0xea, 0x65, 0x7a, 0xae, 0x08,
+    0xba, 0x78, 0x25, 0x2e, 0x1c, 0xa6, 0xb4, 0xc6, 0xe8, 0xdd, 0x74, 0x1f, 0x4b, 0xbd, 0x8b, 0x8a,
+    0x70, 0x3e, 0xb5, 0x66, 0x48, 0x03, 0xf6, 0x0e, 0x61, 0x35, 0x57, 0xb9, 0x86, 0xc1, 0x1d, 0x9e,
+    0xe1, 0xf8, 0x98, 0x11, 0x69, 0xd9, 0x8e, 0x94, 0x9b, 0x1e, 0x87, 0xe9, 0xce, 0x55, 0x28, 0xdf,
+    0x8c, 0xa1, 0x89, 0x0d, 0xbf, 0xe6, 0x42, 0x68, 0x41, 0x99, 0x2d, 0x0f, 0xb0, 0x54, 0xbb, 0x16
+};
+
+// Rcon for key expansion
+static const unsigned char Rcon[11] = {
+    0x8d, 0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1b, 0x36
+};
+
+static unsigned char aes_xtime(unsigned char x) {
+    return (unsigned char)((x << 1) ^ (((x >> 7) & 1) * 0x1b));
+}
+
+static inline uint32_t aes_load32(const unsigned char *p) {
+    return ((uint32_t)p[0] << 24) | ((uint32_t)p[1] << 16) | ((uint32_t)p[2] << 8) | p[3];
+}
+
+static inline void aes_store32(unsigned char *p, uint32_t v) {
+    p[0] = (unsigned char)(v >> 24);
+    p[1] = (unsigned char)(v >> 16);
+    p[2] = (unsigned char)(v >> 8);
+    p[3] = (unsigned char)v;
+}
+
+void aes_key_expansion(unsigned char *key, unsigned char *round_keys) {
+    int i, j;
+    unsigned char temp[4], k;
+    
+    // First round key is the key itself
+    for (i = 0; i < 16; i++) {
+        round_keys[i] = key[i];
+    }
+    
+    // Generate other round keys
+    for (i = 1; i <= 10; i++) {
+        // Rotate and substitute
+        for (j = 0; j < 4; j++) {
+            temp[j] = sbox[round_keys[(i-1) * 16 + 12 + ((j+1)%4)]];
+        }
+        temp[0] ^= Rcon[i];
+        
+        // XOR with previous round key
+        for (j = 0; j < 4; j++) {
+            round_keys[i * 16 + j] = round_keys[(i-1) * 16 + j] ^ temp[j];
+        }
+        for (j = 4; j < 16; j++) {
+            round_keys[i * 16 + j] = round_keys[i * 16 + j - 4] ^ round_keys[(i-1) * 16 + j];
+        }
+    }
+}
+"""
+
+aes_dec_func = aes_key_schedule_func + """
+// AES-128 decryption implementation (CBC mode)
+// Inverse S-box
+static const unsigned char inv_sbox[256] = {
+    0x52, 0x09, 0x6a, 0xd5, 0x30, 0x36, 0xa5, 0x38, 0xbf, 0x40, 0xa3, 0x9e, 0x81, 0xf3, 0xd7, 0xfb,
+    0x7c, 0xe3, 0x39, 0x82, 0x9b, 0x2f, 0xff, 0x87, 0x34, 0x8e, 0x43, 0x44, 0xc4, 0xde, 0xe9, 0xcb,
+    0x54, 0x7b, 0x94, 0x32, 0xa6, 0xc2, 0x23, 0x3d, 0xee, 0x4c, 0x95, 0x0b, 0x42, 0xfa, 0xc3, 0x4e,
+    0x08, 0x2e, 0xa1, 0x66, 0x28, 0xd9, 0x24, 0xb2, 0x76, 0x5b, 0xa2, 0x49, 0x6d, 0x8b, 0xd1, 0x25,
+    0x72, 0xf8, 0xf6, 0x64, 0x86, 0x68, 0x98, 0x16, 0xd4, 0xa4, 0x5c, 0xcc, 0x5d, 0x65, 0xb6, 0x92,
+    0x6c, 0x70, 0x48, 0x50, 0xfd, 0xed, 0xb9, 0xda, 0x5e, 0x15, 0x46, 0x57, 0xa7, 0x8d, 0x9d, 0x84,
+    0x90, 0xd8, 0xab, 0x00, 0x8c, 0xbc, 0xd3, 0x0a, 0xf7, 0xe4, 0x58, 0x05, 0xb8, 0xb3, 0x45, 0x06,
+    0xd0, 0x2c, 0x1e, 0x8f, 0xca, 0x3f, 0x0f, 0x02, 0xc1, 0xaf, 0xbd, 0x03, 0x01, 0x13, 0x8a, 0x6b,
+    0x3a, 0x91, 0x11, 0x41, 0x4f, 0x67, 0xdc, 0xea, 0x97, 0xf2, 0xcf, 0xce, 0xf0, 0xb4, 0xe6, 0x73,
+    0x96, 0xac, 0x74, 0x22, 0xe7, 0xad, 0x35, 0x85, 0xe2, 0xf9, 0x37, 0xe8, 0x1c, 0x75, 0xdf, 0x6e,
+    0x47, 0xf1, 0x1a, 0x71, 0x1d, 0x29, 0xc5, 0x89, 0x6f, 0xb7, 0x62, 0x0e, 0xaa, 0x18, 0xbe, 0x1b,
+    0xfc, 0x56, 0x3e, 0x4b, 0xc6, 0xd2, 0x79, 0x20, 0x9a, 0xdb, 0xc0, 0xfe, 0x78, 0xcd, 0x5a, 0xf4,
+    0x1f, 0xdd, 0xa8, 0x33, 0x88, 0x07, 0xc7, 0x31, 0xb1, 0x12, 0x10, 0x59, 0x27, 0x80, 0xec, 0x5f,
+    0x60, 0x51, 0x7f, 0xa9, 0x19, 0xb5, 0x4a, 0x0d, 0x2d, 0xe5, 0x7a, 0x9f, 0x93, 0xc9, 0x9c, 0xef,
+    0xa0, 0xe0, 0x3b, 0x4d, 0xae, 0x2a, 0xf5, 0xb0, 0xc8, 0xeb, 0xbb, 0x3c, 0x83, 0x53, 0x99, 0x61,
+    0x17, 0x2b, 0x04, 0x7e, 0xba, 0x77, 0xd6, 0x26, 0xe1, 0x69, 0x14, 0x63, 0x55, 0x21, 0x0c, 0x7d
+};
+
+// Decryption T-tables (equivalent inverse cipher), built once at startup
+// from inv_sbox. Each round becomes 16 table lookups and XORs on 32-bit
+// columns instead of byte-wise InvShiftRows/InvSubBytes/InvMixColumns.
+static uint32_t Td0[256], Td1[256], Td2[256], Td3[256];
+static int aes_tables_ready;
+
+static unsigned char aes_multiply(unsigned char x, unsigned char y) {
+    unsigned char r = 0;
+    while (y) {
+        if (y & 1) r ^= x;
+        x = aes_xtime(x);
+        y >>= 1;
+    }
+    return r;
+}
+
+static void aes_tables_init(void) {
+    if (aes_tables_ready) return;
+    for (int i = 0; i < 256; i++) {
+        unsigned char s = inv_sbox[i];
+        uint32_t t = ((uint32_t)aes_multiply(s, 0x0e) << 24) |
+                     ((uint32_t)aes_multiply(s, 0x09) << 16) |
+                     ((uint32_t)aes_multiply(s, 0x0d) << 8) |
+                     (uint32_t)aes_multiply(s, 0x0b);
+        Td0[i] = t;
+        Td1[i] = (t >> 8) | (t << 24);
+        Td2[i] = (t >> 16) | (t << 16);
+        Td3[i] = (t >> 24) | (t << 8);
+    }
+    aes_tables_ready = 1;
+}
+
+// Decryption key schedule: encryption round keys in reverse order, with
+// InvMixColumns applied to the middle rounds.
+static void aes_decrypt_key_schedule(unsigned char *round_keys, uint32_t *dk) {
+    for (int round = 0; round <= 10; round++) {
+        for (int c = 0; c < 4; c++) {
+            uint32_t w = aes_load32(round_keys + (10 - round) * 16 + c * 4);
+            if (round != 0 && round != 10) {
+                w = Td0[sbox[w >> 24]] ^ Td1[sbox[(w >> 16) & 0xff]] ^
+                    Td2[sbox[(w >> 8) & 0xff]] ^ Td3[sbox[w & 0xff]];
+            }
+            dk[round * 4 + c] = w;
+        }
+    }
+}
+
+static void aes_decrypt_block(const unsigned char *input, unsigned char *output, const uint32_t *dk) {
+    uint32_t s0 = aes_load32(input) ^ dk[0];
+    uint32_t s1 = aes_load32(input + 4) ^ dk[1];
+    uint32_t s2 = aes_load32(input + 8) ^ dk[2];
+    uint32_t s3 = aes_load32(input + 12) ^ dk[3];
+    uint32_t t0, t1, t2, t3;
+
+    for (int round = 1; round < 10; round++) {
+        const uint32_t *rk = dk + round * 4;
+        t0 = Td0[s0 >> 24] ^ Td1[(s3 >> 16) & 0xff] ^ Td2[(s2 >> 8) & 0xff] ^ Td3[s1 & 0xff] ^ rk[0];
+        t1 = Td0[s1 >> 24] ^ Td1[(s0 >> 16) & 0xff] ^ Td2[(s3 >> 8) & 0xff] ^ Td3[s2 & 0xff] ^ rk[1];
+        t2 = Td0[s2 >> 24] ^ Td1[(s1 >> 16) & 0xff] ^ Td2[(s0 >> 8) & 0xff] ^ Td3[s3 & 0xff] ^ rk[2];
+        t3 = Td0[s3 >> 24] ^ Td1[(s2 >> 16) & 0xff] ^ Td2[(s1 >> 8) & 0xff] ^ Td3[s0 & 0xff] ^ rk[3];
+        s0 = t0; s1 = t1; s2 = t2; s3 = t3;
+    }
+
+    const uint32_t *rk = dk + 40;
+    aes_store32(output, ((uint32_t)inv_sbox[s0 >> 24] << 24) ^ ((uint32_t)inv_sbox[(s3 >> 16) & 0xff] << 16) ^
+                        ((uint32_t)inv_sbox[(s2 >> 8) & 0xff] << 8) ^ inv_sbox[s1 & 0xff] ^ rk[0]);
+    aes_store32(output + 4, ((uint32_t)inv_sbox[s1 >> 24] << 24) ^ ((uint32_t)inv_sbox[(s0 >> 16) & 0xff] << 16) ^
+                            ((uint32_t)inv_sbox[(s3 >> 8) & 0xff] << 8) ^ inv_sbox[s2 & 0xff] ^ rk[1]);
+    aes_store32(output + 8, ((uint32_t)inv_sbox[s2 >> 24] << 24) ^ ((uint32_t)inv_sbox[(s1 >> 16) & 0xff] << 16) ^
+                            ((uint32_t)inv_sbox[(s0 >> 8) & 0xff] << 8) ^ inv_sbox[s3 & 0xff] ^ rk[2]);
+    aes_store32(output + 12, ((uint32_t)inv_sbox[s3 >> 24] << 24) ^ ((uint32_t)inv_sbox[(s2 >> 16) & 0xff] << 16) ^
+                             ((uint32_t)inv_sbox[(s1 >> 8) & 0xff] << 8) ^ inv_sbox[s0 & 0xff] ^ rk[3]);
+}
+
+static void decrypt_aes_ttable(unsigned char *data, size_t len, unsigned char *round_keys, unsigned char *iv) {
+    uint32_t dk[44];
+    aes_tables_init();
+    aes_decrypt_key_schedule(round_keys, dk);
+    
+    unsigned char prev_cipher[16];
+    unsigned char decrypted_block[16];
+    memcpy(prev_cipher, iv, 16);
+    
+    // Decrypt each 16-byte block in CBC mode
+    for (size_t i = 0; i + 16 <= len; i += 16) {
+        unsigned char cipher_backup[16];
+        memcpy(cipher_backup, data + i, 16);
+        
+        aes_decrypt_block(data + i, decrypted_block, dk);
+        
+        // XOR with previous ciphertext (CBC mode)
+        for (int j = 0; j < 16; j++) {
+            data[i + j] = decrypted_block[j] ^ prev_cipher[j];
+        }
+        
+        memcpy(prev_cipher, cipher_backup, 16);
+    }
+}
+
+#if defined(__x86_64__)
+#include <immintrin.h>
+
+// AES-NI path, selected at runtime when the CPU supports it. CBC decryption
+// has no dependency between blocks (only on the previous *ciphertext*), so
+// four blocks are kept in flight to hide the aesdec latency.
+__attribute__((target("aes,sse2")))
+static void decrypt_aes_ni(unsigned char *data, size_t len, unsigned char *round_keys, unsigned char *iv) {
+    __m128i dk[11];
+    dk[0] = _mm_loadu_si128((const __m128i *)(round_keys + 160));
+    for (int round = 1; round < 10; round++) {
+        dk[round] = _mm_aesimc_si128(_mm_loadu_si128((const __m128i *)(round_keys + (10 - round) * 16)));
+    }
+    dk[10] = _mm_loadu_si128((const __m128i *)round_keys);
+
+    __m128i prev = _mm_loadu_si128((const __m128i *)iv);
+    size_t i = 0;
+    for (; i + 64 <= len; i += 64) {
+        __m128i c0 = _mm_loadu_si128((const __m128i *)(data + i));
+        __m128i c1 = _mm_loadu_si128((const __m128i *)(data + i + 16));
+        __m128i c2 = _mm_loadu_si128((const __m128i *)(data + i + 32));
+        __m128i c3 = _mm_loadu_si128((const __m128i *)(data + i + 48));
+        __m128i m0 = _mm_xor_si128(c0, dk[0]);
+        __m128i m1 = _mm_xor_si128(c1, dk[0]);
+        __m128i m2 = _mm_xor_si128(c2, dk[0]);
+        __m128i m3 = _mm_xor_si128(c3, dk[0]);
+        for (int round = 1; round < 10; round++) {
+            m0 = _mm_aesdec_si128(m0, dk[round]);
+            m1 = _mm_aesdec_si128(m1, dk[round]);
+            m2 = _mm_aesdec_si128(m2, dk[round]);
+            m3 = _mm_aesdec_si128(m3, dk[round]);
+        }
+        m0 = _mm_xor_si128(_mm_aesdeclast_si128(m0, dk[10]), prev);
+        m1 = _mm_xor_si128(_mm_aesdeclast_si128(m1, dk[10]), c0);
+        m2 = _mm_xor_si128(_mm_aesdeclast_si128(m2, dk[10]), c1);
+        m3 = _mm_xor_si128(_mm_aesdeclast_si128(m3, dk[10]), c2);
+        _mm_storeu_si128((__m128i *)(data + i), m0);
+        _mm_storeu_si128((__m128i *)(data + i + 16), m1);
+        _mm_storeu_si128((__m128i *)(data + i + 32), m2);
+        _mm_storeu_si128((__m128i *)(data + i + 48), m3);
+        prev = c3;
+    }
+    for (; i + 16 <= len; i += 16) {
+        __m128i c = _mm_loadu_si128((const __m128i *)(data + i));
+        __m128i m = _mm_xor_si128(c, dk[0]);
+        for (int round = 1; round < 10; round++) {
+            m = _mm_aesdec_si128(m, dk[round]);
+        }
+        m = _mm_xor_si128(_mm_aesdeclast_si128(m, dk[10]), prev);
+        _mm_storeu_si128((__m128i *)(data + i), m);
+        prev = c;
+    }
+}
+#endif
+
+#define AES_MIN_BLOCKS_PER_THREAD 32768
+
+struct aes_job {
+    unsigned char *data;
+    unsigned char *round_keys;
+    unsigned char (*ivs)[16];
+};
+
+static void aes_range(void *ctx, int index, size_t begin, size_t end) {
+    struct aes_job *job = ctx;
+    unsigned char *data = job->data + begin * 16;
+    size_t len = (end - begin) * 16;
+
+#if defined(__x86_64__)
+    if (__builtin_cpu_supports("aes")) {
+        decrypt_aes_ni(data, len, job->round_keys, job->ivs[index]);
+        return;
+    }
+#endif
+    decrypt_aes_ttable(data, len, job->round_keys, job->ivs[index]);
+}
+
+void decrypt_aes_parallel(unsigned char *data, size_t len, unsigned char *key, unsigned char *iv,
+                          int threads) {
+    unsigned char round_keys[176]; // 11 round keys of 16 bytes each
+    unsigned char ivs[LOADER_MAX_THREADS][16];
+    size_t num_blocks = len / 16;
+    aes_key_expansion(key, round_keys);
+    // Shared tables are built before any thread reads them
+    aes_tables_init();
+
+    // CBC: each range chains from the ciphertext block just before it,
+    // which the previous range overwrites, so copy those IVs up front
+    threads = loader_threads(threads, num_blocks, AES_MIN_BLOCKS_PER_THREAD);
+    for (int t = 0; t < threads; t++) {
+        size_t begin, end;
+        parallel_range(num_blocks, threads, t, &begin, &end);
+        memcpy(ivs[t], begin ? data + (begin - 1) * 16 : iv, 16);
+    }
+    struct aes_job job = { data, round_keys, ivs };
+    parallel_for(num_blocks, threads, aes_range, &job);
+}
+
+void decrypt_aes(unsigned char *data, size_t len, unsigned char *key, unsigned char *iv) {
+    decrypt_aes_parallel(data, len, key, iv, 1);
+}"""
+
+DECRYPTOR = aes_dec_func
+DECRYPT_CALL = "decrypt_aes_parallel(data, len, key, key + 16, threads);"
+
+class AesStream:
+    def __init__(self, key : bytes = None, iv : bytes = None):
+        # AES-128 encryption with CBC mode
+        self._key = key or get_random_bytes(16)  # 128-bit key
+        self._iv = iv or get_random_bytes(16)    # 128-bit IV
+        self._cipher = AES.new(self._key, AES.MODE_CBC, self._iv)
+        self._pending = b''
+        self._length = 0
+
+    @property
+    def key(self):
+        # (key, iv, original_length)
+        return (self._key, self._iv, self._length)
+
+    def update(self, chunk : bytes) -> bytes:
+        self._length += len(chunk)
+        if self._pending:
+            chunk = self._pending + bytes(chunk)
+        usable = len(chunk) - len(chunk) % AES.block_size
+        self._pending = bytes(chunk[usable:])
+        return self._cipher.encrypt(memoryview(chunk)[:usable]) if usable else b''
+
+    def finalize(self) -> bytes:
+        # Pad data to multiple of 16 bytes (AES block size)
+        tail, self._pending = self._pending, b''
+        return self._cipher.encrypt(pad(tail, AES.block_size))
+
+def encrypt_aes(shellcode : bytes):
+    stream = AesStream()
+    
+    # Encrypt
+    enc = stream.update(shellcode) + stream.finalize()
+    
+    # Return encrypted data and key info: (key, iv, original_length)
+    return enc, stream.key
+
+
+def new_stream(key : tuple = None):
+    return AesStream(*(key[:2] if key else ()))
+
+def pack_key(key : tuple) -> bytes:
+    return key[0] + key[1]
+
+def derive_key(prf) -> tuple:
+    return (prf(b'aes-key', 16), prf(b'aes-iv', 16), 0)
+
+def describe(key : tuple):
+    details = {
+        "algorithm": "AES-128",
+        "key_size": "128-bit",
+        "mode": "CBC (Cipher Block Chaining)",
+        "block_size": "16 bytes",
+        "rounds": 10,
+        "key_value": key[0].hex()[:32] + "...",
+        "iv_value": key[1].hex()[:32] + "...",
+        "padding": "PKCS7"
+    }
+    return details, f"Key: {key[0].hex()[:32]}..., IV: {key[1].hex()[:32]}..."
@@ -0,0 +1,252 @@
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+
+from cipher_aes import aes_key_schedule_func
+
+# AES-128-CTR: a stream mode, so no padding, and the keystream for any block
+# is AES(key, iv + block index). Every loader thread starts its counter at
+# its own range with no setup pass, unlike CBC, which needs the preceding
+# ciphertext block. The loader uses AES-NI with eight blocks in flight when
+# the CPU has it, and forward T-tables otherwise.
+
+CIPHER_ID = 4
+LABEL = "AES-CTR"
+
+aes_ctr_dec_func = aes_key_schedule_func + """
+// Encryption T-tables, built once at startup from sbox
+static uint32_t Te0[256], Te1[256], Te2[256], Te3[256];
+static int aes_ctr_tables_ready;
+
+static void aes_ctr_tables_init(void) {
+    if (aes_ctr_tables_ready) return;
+    for (int i = 0; i < 256; i++) {
+        unsigned char s = sbox[i];
+        unsigned char s2 = aes_xtime(s);
+        uint32_t t = ((uint32_t)s2 << 24) | ((uint32_t)s << 16) | ((uint32_t)s << 8) |
+                     (uint32_t)(s2 ^ s);
+        Te0[i] = t;
+        Te1[i] = (t >> 8) | (t << 24);
+        Te2[i] = (t >> 16) | (t << 16);
+        Te3[i] = (t >> 24) | (t << 8);
+    }
+    aes_ctr_tables_ready = 1;
+}
+
+static void aes_encrypt_block(const unsigned char *input, unsigned char *output, const uint32_t *rk) {
+    uint32_t s0 = aes_load32(input) ^ rk[0];
+    uint32_t s1 = aes_load32(input + 4) ^ rk[1];
+    uint32_t s2 = aes_load32(input + 8) ^ rk[2];
+    uint32_t s3 = aes_load32(input + 12) ^ rk[3];
+    uint32_t t0, t1, t2, t3;
+
+    for (int round = 1; round < 10; round++) {
+        const uint32_t *k = rk + round * 4;
+        t0 = Te0[s0 >> 24] ^ Te1[(s1 >> 16) & 0xff] ^ Te2[(s2 >> 8) & 0xff] ^ Te3[s3 & 0xff] ^ k[0];
+        t1 = Te0[s1 >> 24] ^ Te1[(s2 >> 16) & 0xff] ^ Te2[(s3 >> 8) & 0xff] ^ Te3[s0 & 0xff] ^ k[1];
+        t2 = Te0[s2 >> 24] ^ Te1[(s3 >> 16) & 0xff] ^ Te2[(s0 >> 8) & 0xff] ^ Te3[s1 & 0xff] ^ k[2];
+        t3 = Te0[s3 >> 24] ^ Te1[(s0 >> 16) & 0xff] ^ Te2[(s1 >> 8) & 0xff] ^ Te3[s2 & 0xff] ^ k[3];
+        s0 = t0; s1 = t1; s2 = t2; s3 = t3;
+    }
+
+    const uint32_t *k = rk + 40;
+    aes_store32(output, ((uint32_t)sbox[s0 >> 24] << 24) ^ ((uint32_t)sbox[(s1 >> 16) & 0xff] << 16) ^
+                        ((uint32_t)sbox[(s2 >> 8) & 0xff] << 8) ^ sbox[s3 & 0xff] ^ k[0]);
+    aes_store32(output + 4, ((uint32_t)sbox[s1 >> 24] << 24) ^ ((uint32_t)sbox[(s2 >> 16) & 0xff] << 16) ^
+                            ((uint32_t)sbox[(s3 >> 8) & 0xff] << 8) ^ sbox[s0 & 0xff] ^ k[1]);
+    aes_store32(output + 8, ((uint32_t)sbox[s2 >> 24] << 24) ^ ((uint32_t)sbox[(s3 >> 16) & 0xff] << 16) ^
+                            ((uint32_t)sbox[(s0 >> 8) & 0xff] << 8) ^ sbox[s1 & 0xff] ^ k[2]);
+    aes_store32(output + 12, ((uint32_t)sbox[s3 >> 24] << 24) ^ ((uint32_t)sbox[(s0 >> 16) & 0xff] << 16) ^
+                             ((uint32_t)sbox[(s1 >> 8) & 0xff] << 8) ^ sbox[s2 & 0xff] ^ k[3]);
+}
+
+// The counter block is the IV read as a 128-bit big-endian integer, plus
+// the block index (mod 2^128)
+struct aes_ctr {
+    uint64_t hi, lo;
+};
+
+static inline struct aes_ctr aes_ctr_at(const unsigned char *iv, size_t block) {
+    struct aes_ctr c = { 0, 0 };
+    for (int i = 0; i < 8; i++) {
+        c.hi = (c.hi << 8) | iv[i];
+        c.lo = (c.lo << 8) | iv[8 + i];
+    }
+    uint64_t lo = c.lo + (uint64_t)block;
+    c.hi += lo < c.lo;
+    c.lo = lo;
+    return c;
+}
+
+static inline void aes_ctr_next(struct aes_ctr *c) {
+    if (++c->lo == 0) c->hi++;
+}
+
+static inline void aes_ctr_store(unsigned char *out, const struct aes_ctr *c) {
+    for (int i = 0; i < 8; i++) {
+        out[i] = (unsigned char)(c->hi >> (56 - 8 * i));
+        out[8 + i] = (unsigned char)(c->lo >> (56 - 8 * i));
+    }
+}
+
+// XOR `len` bytes of `data` with the keystream starting at counter `c`
+static void decrypt_aes_ctr_ttable(unsigned char *data, size_t len, const uint32_t *rk,
+                                   struct aes_ctr c) {
+    unsigned char block[16], stream[16];
+    for (size_t i = 0; i < len; i += 16) {
+        aes_ctr_store(block, &c);
+        aes_encrypt_block(block, stream, rk);
+        size_t n = len - i < 16 ? len - i : 16;
+        for (size_t j = 0; j < n; j++) {
+            data[i + j] ^= stream[j];
+        }
+        aes_ctr_next(&c);
+    }
+}
+
+#if defined(__x86_64__)
+#include <immintrin.h>
+
+#define AES_CTR_LANES 8
+
+// Counter block built in registers; storing it bytewise and reloading it as
+// a vector would stall on store forwarding for every block
+static inline __m128i aes_ctr_vector(const struct aes_ctr *c) {
+    return _mm_set_epi64x((long long)__builtin_bswap64(c->lo), (long long)__builtin_bswap64(c->hi));
+}
+
+// AES-NI path, selected at runtime when the CPU supports it. Counter blocks
+// are independent, so eight are encrypted at once to hide the aesenc
+// latency.
+__attribute__((target("aes,sse2")))
+static void decrypt_aes_ctr_ni(unsigned char *data, size_t len, const unsigned char *round_keys,
+                               struct aes_ctr c) {
+    __m128i rk[11];
+    for (int round = 0; round <= 10; round++) {
+        rk[round] = _mm_loadu_si128((const __m128i *)(round_keys + round * 16));
+    }
+
+    size_t i = 0;
+    for (; i + 16 * AES_CTR_LANES <= len; i += 16 * AES_CTR_LANES) {
+        __m128i b[AES_CTR_LANES];
+        for (int l = 0; l < AES_CTR_LANES; l++) {
+            b[l] = _mm_xor_si128(aes_ctr_vector(&c), rk[0]);
+            aes_ctr_next(&c);
+        }
+        for (int round = 1; round < 10; round++) {
+            for (int l = 0; l < AES_CTR_LANES; l++) {
+                b[l] = _mm_aesenc_si128(b[l], rk[round]);
+            }
+        }
+        for (int l = 0; l < AES_CTR_LANES; l++) {
+            __m128i *p = (__m128i *)(data + i + 16 * l);
+            b[l] = _mm_aesenclast_si128(b[l], rk[10]);
+            _mm_storeu_si128(p, _mm_xor_si128(_mm_loadu_si128(p), b[l]));
+        }
+    }
+    for (; i < len; i += 16) {
+        unsigned char stream[16];
+        __m128i b = _mm_xor_si128(aes_ctr_vector(&c), rk[0]);
+        aes_ctr_next(&c);
+        for (int round = 1; round < 10; round++) {
+            b = _mm_aesenc_si128(b, rk[round]);
+        }
+        _mm_storeu_si128((__m128i *)stream, _mm_aesenclast_si128(b, rk[10]));
+        size_t n = len - i < 16 ? len - i : 16;
+        for (size_t j = 0; j < n; j++) {
+            data[i + j] ^= stream[j];
+        }
+    }
+}
+#endif
+
+#define AES_CTR_MIN_BLOCKS_PER_THREAD 65536
+
+struct aes_ctr_job {
+    unsigned char *data;
+    size_t len;
+    unsigned char *round_keys;
+    uint32_t *rk;
+    unsigned char *iv;
+};
+
+static void aes_ctr_range(void *ctx, int index, size_t begin, size_t end) {
+    struct aes_ctr_job *job = ctx;
+    size_t first = begin * 16;
+    size_t last = end * 16 < job->len ? end * 16 : job->len;
+    struct aes_ctr c = aes_ctr_at(job->iv, begin);
+    (void)index;
+
+#if defined(__x86_64__)
+    if (__builtin_cpu_supports("aes")) {
+        decrypt_aes_ctr_ni(job->data + first, last - first, job->round_keys, c);
+        return;
+    }
+#endif
+    decrypt_aes_ctr_ttable(job->data + first, last - first, job->rk, c);
+}
+
+void decrypt_aes_ctr_parallel(unsigned char *data, size_t len, unsigned char *key,
+                              unsigned char *iv, int threads) {
+    unsigned char round_keys[176];
+    uint32_t rk[44];
+    size_t num_blocks = (len + 15) / 16;
+    aes_key_expansion(key, round_keys);
+    for (int i = 0; i < 44; i++) {
+        rk[i] = aes_load32(round_keys + i * 4);
+    }
+    // Shared tables are built before any thread reads them
+    aes_ctr_tables_init();
+
+    struct aes_ctr_job job = { data, len, round_keys, rk, iv };
+    parallel_for(num_blocks, loader_threads(threads, num_blocks, AES_CTR_MIN_BLOCKS_PER_THREAD),
+                 aes_ctr_range, &job);
+}"""
+
+DECRYPTOR = aes_ctr_dec_func
+DECRYPT_CALL = "decrypt_aes_ctr_parallel(data, len, key, key + 16, threads);"
+
+class AesCtrStream:
+    def __init__(self, key : bytes = None, iv : bytes = None):
+        self._key = key or get_random_bytes(16)
+        # Initial counter block; the whole 128 bits count, as in the loader
+        self._iv = iv or get_random_bytes(16)
+        self._cipher = AES.new(self._key, AES.MODE_CTR, nonce=b'', initial_value=self._iv)
+
+    @property
+    def key(self):
+        # (key, iv)
+        return (self._key, self._iv)
+
+    def update(self, chunk : bytes) -> bytes:
+        return self._cipher.encrypt(chunk)
+
+    def finalize(self) -> bytes:
+        return b''
+
+def encrypt_aes_ctr(shellcode : bytes):
+    stream = AesCtrStream()
+    enc = stream.update(shellcode) + stream.finalize()
+    return enc, stream.key
+
+
+def new_stream(key : tuple = None):
+    return AesCtrStream(*(key[:2] if key else ()))
+
+def pack_key(key : tuple) -> bytes:
+    return key[0] + key[1]
+
+def derive_key(prf) -> tuple:
+    return (prf(b'aes-ctr-key', 16), prf(b'aes-ctr-iv', 16))
+
+def describe(key : tuple):
+    details = {
+        "algorithm": "AES-128",
+        "key_size": "128-bit",
+        "mode": "CTR (Counter), random-access decryption",
+        "block_size": "16 bytes",
+        "rounds": 10,
+        "key_value": key[0].hex()[:32] + "...",
+        "iv_value": key[1].hex()[:32] + "...",
+        "padding": "None"
+    }
+    return details, f"Key: {key[0].hex()[:32]}..., IV: {key[1].hex()[:32]}..."
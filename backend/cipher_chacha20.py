@@ -0,0 +1,271 @@
+from Crypto.Cipher import ChaCha20
+from Crypto.Random import get_random_bytes
+
+# ChaCha20 (original variant: 64-bit nonce, 64-bit block counter). A stream
+# cipher built from adds, rotates and XORs only, so it is fast without any
+# AES hardware support, needs no padding, and the keystream of 64-byte block
+# i depends only on (key, nonce, i): every loader thread seeks straight to
+# its range. On x86-64 the loader computes eight blocks at once with AVX2
+# when the CPU has it, and four in SSE2 lanes otherwise.
+
+CIPHER_ID = 5
+LABEL = "CHACHA20"
+
+chacha20_dec_func = """
+#define CHACHA_ROTL(v, n) (((v) << (n)) | ((v) >> (32 - (n))))
+#define CHACHA_QR(a, b, c, d)                                           \\
+    a += b; d = CHACHA_ROTL(d ^ a, 16); c += d; b = CHACHA_ROTL(b ^ c, 12); \\
+    a += b; d = CHACHA_ROTL(d ^ a, 8);  c += d; b = CHACHA_ROTL(b ^ c, 7);
+
+static inline uint32_t chacha_load32(const unsigned char *p) {
+    return (uint32_t)p[0] | ((uint32_t)p[1] << 8) | ((uint32_t)p[2] << 16) | ((uint32_t)p[3] << 24);
+}
+
+// Initial state for a 32-byte key and 8-byte nonce; words 12-13 hold the
+// block counter and are filled in per block
+static void chacha20_setup(uint32_t *state, const unsigned char *key, const unsigned char *nonce) {
+    state[0] = 0x61707865;
+    state[1] = 0x3320646e;
+    state[2] = 0x79622d32;
+    state[3] = 0x6b206574;
+    for (int i = 0; i < 8; i++) {
+        state[4 + i] = chacha_load32(key + 4 * i);
+    }
+    state[12] = state[13] = 0;
+    state[14] = chacha_load32(nonce);
+    state[15] = chacha_load32(nonce + 4);
+}
+
+static void chacha20_block(const uint32_t *state, uint64_t counter, unsigned char *out) {
+    uint32_t in[16], x[16];
+    memcpy(in, state, sizeof(in));
+    in[12] = (uint32_t)counter;
+    in[13] = (uint32_t)(counter >> 32);
+    memcpy(x, in, sizeof(x));
+    for (int round = 0; round < 10; round++) {
+        CHACHA_QR(x[0], x[4], x[8], x[12]);
+        CHACHA_QR(x[1], x[5], x[9], x[13]);
+        CHACHA_QR(x[2], x[6], x[10], x[14]);
+        CHACHA_QR(x[3], x[7], x[11], x[15]);
+        CHACHA_QR(x[0], x[5], x[10], x[15]);
+        CHACHA_QR(x[1], x[6], x[11], x[12]);
+        CHACHA_QR(x[2], x[7], x[8], x[13]);
+        CHACHA_QR(x[3], x[4], x[9], x[14]);
+    }
+    for (int i = 0; i < 16; i++) {
+        uint32_t v = x[i] + in[i];
+        out[4 * i] = (unsigned char)v;
+        out[4 * i + 1] = (unsigned char)(v >> 8);
+        out[4 * i + 2] = (unsigned char)(v >> 16);
+        out[4 * i + 3] = (unsigned char)(v >> 24);
+    }
+}
+
+#if defined(__x86_64__)
+#include <emmintrin.h>
+
+#define CHACHA_ROTV(v, n) _mm_or_si128(_mm_slli_epi32(v, n), _mm_srli_epi32(v, 32 - (n)))
+#define CHACHA_QRV(a, b, c, d)                                                  \\
+    a = _mm_add_epi32(a, b); d = CHACHA_ROTV(_mm_xor_si128(d, a), 16);         \\
+    c = _mm_add_epi32(c, d); b = CHACHA_ROTV(_mm_xor_si128(b, c), 12);         \\
+    a = _mm_add_epi32(a, b); d = CHACHA_ROTV(_mm_xor_si128(d, a), 8);          \\
+    c = _mm_add_epi32(c, d); b = CHACHA_ROTV(_mm_xor_si128(b, c), 7);
+
+// XOR four consecutive blocks (256 bytes) starting at block `counter`.
+// Lane j of x[i] is word i of block counter + j; SSE2 is part of the
+// x86-64 baseline, so no runtime check is needed.
+static void chacha20_xor4(unsigned char *data, const uint32_t *state, uint64_t counter) {
+    __m128i x[16], in[16];
+    for (int i = 0; i < 16; i++) {
+        in[i] = _mm_set1_epi32((int)state[i]);
+    }
+    uint64_t c0 = counter, c1 = counter + 1, c2 = counter + 2, c3 = counter + 3;
+    in[12] = _mm_set_epi32((int)(uint32_t)c3, (int)(uint32_t)c2, (int)(uint32_t)c1, (int)(uint32_t)c0);
+    in[13] = _mm_set_epi32((int)(uint32_t)(c3 >> 32), (int)(uint32_t)(c2 >> 32),
+                           (int)(uint32_t)(c1 >> 32), (int)(uint32_t)(c0 >> 32));
+    for (int i = 0; i < 16; i++) {
+        x[i] = in[i];
+    }
+    for (int round = 0; round < 10; round++) {
+        CHACHA_QRV(x[0], x[4], x[8], x[12]);
+        CHACHA_QRV(x[1], x[5], x[9], x[13]);
+        CHACHA_QRV(x[2], x[6], x[10], x[14]);
+        CHACHA_QRV(x[3], x[7], x[11], x[15]);
+        CHACHA_QRV(x[0], x[5], x[10], x[15]);
+        CHACHA_QRV(x[1], x[6], x[11], x[12]);
+        CHACHA_QRV(x[2], x[7], x[8], x[13]);
+        CHACHA_QRV(x[3], x[4], x[9], x[14]);
+    }
+    // Transpose each group of four words back into per-block order
+    for (int g = 0; g < 4; g++) {
+        __m128i a = _mm_add_epi32(x[4 * g], in[4 * g]);
+        __m128i b = _mm_add_epi32(x[4 * g + 1], in[4 * g + 1]);
+        __m128i c = _mm_add_epi32(x[4 * g + 2], in[4 * g + 2]);
+        __m128i d = _mm_add_epi32(x[4 * g + 3], in[4 * g + 3]);
+        __m128i ab_lo = _mm_unpacklo_epi32(a, b), cd_lo = _mm_unpacklo_epi32(c, d);
+        __m128i ab_hi = _mm_unpackhi_epi32(a, b), cd_hi = _mm_unpackhi_epi32(c, d);
+        __m128i blocks[4] = {
+            _mm_unpacklo_epi64(ab_lo, cd_lo), _mm_unpackhi_epi64(ab_lo, cd_lo),
+            _mm_unpacklo_epi64(ab_hi, cd_hi), _mm_unpackhi_epi64(ab_hi, cd_hi),
+        };
+        for (int j = 0; j < 4; j++) {
+            __m128i *p = (__m128i *)(data + 64 * j + 16 * g);
+            _mm_storeu_si128(p, _mm_xor_si128(_mm_loadu_si128(p), blocks[j]));
+        }
+    }
+}
+
+#include <immintrin.h>
+
+#define CHACHA_ROTV8(v, n) _mm256_or_si256(_mm256_slli_epi32(v, n), _mm256_srli_epi32(v, 32 - (n)))
+#define CHACHA_QRV8(a, b, c, d)                                                       \\
+    a = _mm256_add_epi32(a, b); d = CHACHA_ROTV8(_mm256_xor_si256(d, a), 16);        \\
+    c = _mm256_add_epi32(c, d); b = CHACHA_ROTV8(_mm256_xor_si256(b, c), 12);        \\
+    a = _mm256_add_epi32(a, b); d = CHACHA_ROTV8(_mm256_xor_si256(d, a), 8);         \\
+    c = _mm256_add_epi32(c, d); b = CHACHA_ROTV8(_mm256_xor_si256(b, c), 7);
+
+// AVX2 form of chacha20_xor4 for eight blocks (512 bytes), selected at
+// runtime. The unpacks work within each 128-bit half, so the low half ends
+// up holding blocks 0-3 and the high half blocks 4-7.
+__attribute__((target("avx2")))
+static void chacha20_xor8(unsigned char *data, const uint32_t *state, uint64_t counter) {
+    __m256i x[16], in[16];
+    for (int i = 0; i < 16; i++) {
+        in[i] = _mm256_set1_epi32((int)state[i]);
+    }
+    uint32_t lo[8], hi[8];
+    for (int j = 0; j < 8; j++) {
+        lo[j] = (uint32_t)(counter + j);
+        hi[j] = (uint32_t)((counter + j) >> 32);
+    }
+    in[12] = _mm256_loadu_si256((const __m256i *)lo);
+    in[13] = _mm256_loadu_si256((const __m256i *)hi);
+    for (int i = 0; i < 16; i++) {
+        x[i] = in[i];
+    }
+    for (int round = 0; round < 10; round++) {
+        CHACHA_QRV8(x[0], x[4], x[8], x[12]);
+        CHACHA_QRV8(x[1], x[5], x[9], x[13]);
+        CHACHA_QRV8(x[2], x[6], x[10], x[14]);
+        CHACHA_QRV8(x[3], x[7], x[11], x[15]);
+        CHACHA_QRV8(x[0], x[5], x[10], x[15]);
+        CHACHA_QRV8(x[1], x[6], x[11], x[12]);
+        CHACHA_QRV8(x[2], x[7], x[8], x[13]);
+        CHACHA_QRV8(x[3], x[4], x[9], x[14]);
+    }
+    for (int g = 0; g < 4; g++) {
+        __m256i a = _mm256_add_epi32(x[4 * g], in[4 * g]);
+        __m256i b = _mm256_add_epi32(x[4 * g + 1], in[4 * g + 1]);
+        __m256i c = _mm256_add_epi32(x[4 * g + 2], in[4 * g + 2]);
+        __m256i d = _mm256_add_epi32(x[4 * g + 3], in[4 * g + 3]);
+        __m256i ab_lo = _mm256_unpacklo_epi32(a, b), cd_lo = _mm256_unpacklo_epi32(c, d);
+        __m256i ab_hi = _mm256_unpackhi_epi32(a, b), cd_hi = _mm256_unpackhi_epi32(c, d);
+        __m256i blocks[4] = {
+            _mm256_unpacklo_epi64(ab_lo, cd_lo), _mm256_unpackhi_epi64(ab_lo, cd_lo),
+            _mm256_unpacklo_epi64(ab_hi, cd_hi), _mm256_unpackhi_epi64(ab_hi, cd_hi),
+        };
+        for (int j = 0; j < 4; j++) {
+            __m128i *p = (__m128i *)(data + 64 * j + 16 * g);
+            __m128i *q = (__m128i *)(data + 64 * (j + 4) + 16 * g);
+            _mm_storeu_si128(p, _mm_xor_si128(_mm_loadu_si128(p), _mm256_castsi256_si128(blocks[j])));
+            _mm_storeu_si128(q, _mm_xor_si128(_mm_loadu_si128(q), _mm256_extracti128_si256(blocks[j], 1)));
+        }
+    }
+}
+#endif
+
+// XOR `len` bytes of `data` with the keystream starting at block `counter`
+static void chacha20_xor(unsigned char *data, size_t len, const uint32_t *state, uint64_t counter) {
+    size_t i = 0;
+#if defined(__x86_64__)
+    if (__builtin_cpu_supports("avx2")) {
+        for (; i + 512 <= len; i += 512, counter += 8) {
+            chacha20_xor8(data + i, state, counter);
+        }
+    }
+    for (; i + 256 <= len; i += 256, counter += 4) {
+        chacha20_xor4(data + i, state, counter);
+    }
+#endif
+    unsigned char stream[64];
+    for (; i < len; i += 64, counter++) {
+        chacha20_block(state, counter, stream);
+        size_t n = len - i < 64 ? len - i : 64;
+        for (size_t j = 0; j < n; j++) {
+            data[i + j] ^= stream[j];
+        }
+    }
+}
+
+#define CHACHA20_MIN_BLOCKS_PER_THREAD 16384
+
+struct chacha20_job {
+    unsigned char *data;
+    size_t len;
+    uint32_t state[16];
+};
+
+static void chacha20_range(void *ctx, int index, size_t begin, size_t end) {
+    struct chacha20_job *job = ctx;
+    size_t first = begin * 64;
+    size_t last = end * 64 < job->len ? end * 64 : job->len;
+    (void)index;
+    chacha20_xor(job->data + first, last - first, job->state, begin);
+}
+
+void decrypt_chacha20_parallel(unsigned char *data, size_t len, unsigned char *key,
+                               unsigned char *nonce, int threads) {
+    struct chacha20_job job = { data, len, { 0 } };
+    size_t num_blocks = (len + 63) / 64;
+    chacha20_setup(job.state, key, nonce);
+    parallel_for(num_blocks, loader_threads(threads, num_blocks, CHACHA20_MIN_BLOCKS_PER_THREAD),
+                 chacha20_range, &job);
+}"""
+
+DECRYPTOR = chacha20_dec_func
+DECRYPT_CALL = "decrypt_chacha20_parallel(data, len, key, key + 32, threads);"
+
+class ChaCha20Stream:
+    def __init__(self, key : bytes = None, nonce : bytes = None):
+        self._key = key or get_random_bytes(32)   # 256-bit key
+        self._nonce = nonce or get_random_bytes(8)
+        self._cipher = ChaCha20.new(key=self._key, nonce=self._nonce)
+
+    @property
+    def key(self):
+        # (key, nonce)
+        return (self._key, self._nonce)
+
+    def update(self, chunk : bytes) -> bytes:
+        return self._cipher.encrypt(chunk)
+
+    def finalize(self) -> bytes:
+        return b''
+
+def encrypt_chacha20(shellcode : bytes):
+    stream = ChaCha20Stream()
+    enc = stream.update(shellcode) + stream.finalize()
+    return enc, stream.key
+
+
+def new_stream(key : tuple = None):
+    return ChaCha20Stream(*(key[:2] if key else ()))
+
+def pack_key(key : tuple) -> bytes:
+    return key[0] + key[1]
+
+def derive_key(prf) -> tuple:
+    return (prf(b'chacha20-key', 32), prf(b'chacha20-nonce', 8))
+
+def describe(key : tuple):
+    details = {
+        "algorithm": "ChaCha20",
+        "key_size": "256-bit",
+        "mode": "Stream cipher (64-bit nonce and block counter), random-access decryption",
+        "block_size": "64 bytes",
+        "rounds": 20,
+        "key_value": key[0].hex()[:32] + "...",
+        "nonce_value": key[1].hex(),
+        "padding": "None"
+    }
+    return details, f"Key: {key[0].hex()[:32]}..., Nonce: {key[1].hex()}"
@@ -0,0 +1,284 @@
+import sys
+import struct
+import functools
+from array import array
+from Crypto.Util.number import getPrime, inverse
+
+# Block RSA with a ~24-bit modulus: 2-byte plaintext blocks become 4-byte
+# big-endian ciphertext blocks. The loader decrypts through a lookup table
+# built once from the public exponent.
+
+CIPHER_ID = 2
+LABEL = "RSA"
+
+RSA_BLOCK_SIZE = 2         # plaintext bytes per block
+RSA_CIPHER_BLOCK_SIZE = 4  # ciphertext bytes per block (big-endian)
+RSA_PUBLIC_EXPONENT = 65537
+
+rsa_dec_func = """
+uint64_t pow_mod(uint64_t base, uint64_t exp, uint64_t mod) {
+    // n is ~24 bits, so every product fits comfortably in 64 bits
+    uint64_t res = 1;
+    base %= mod;
+    while (exp > 0) {
+        if (exp & 1) res = (res * base) % mod;
+        base = (base * base) % mod;
+        exp >>= 1;
+    }
+    return res;
+}
+
+#define RSA_PUBLIC_EXPONENT """ + str(RSA_PUBLIC_EXPONENT) + """
+// Above this many blocks it is cheaper to build the inverse table once
+#define RSA_TABLE_MIN_BLOCKS 32768
+#define RSA_TABLE_BITS 17
+
+// Decrypt-side lookup: with 2-byte blocks there are only 65,536 plaintexts,
+// so map every possible ciphertext back to its plaintext through an
+// open-addressed hash (c -> m) built with the cheap public exponent,
+// instead of one pow_mod with the ~24-bit private exponent per block.
+static uint32_t *rsa_table_keys;
+static uint16_t *rsa_table_vals;
+
+static inline uint32_t rsa_table_slot(uint32_t c) {
+    return (uint32_t)((c * 2654435761u) >> (32 - RSA_TABLE_BITS));
+}
+
+static int rsa_table_build(uint64_t n) {
+    size_t slots = (size_t)1 << RSA_TABLE_BITS;
+    rsa_table_keys = calloc(slots, sizeof(uint32_t));
+    rsa_table_vals = malloc(slots * sizeof(uint16_t));
+    if (!rsa_table_keys || !rsa_table_vals) return -1;
+    for (uint32_t m = 0; m < 65536; m++) {
+        uint32_t c = (uint32_t)pow_mod(m, RSA_PUBLIC_EXPONENT, n);
+        uint32_t slot = rsa_table_slot(c);
+        while (rsa_table_keys[slot]) slot = (slot + 1) & (slots - 1);
+        rsa_table_keys[slot] = c + 1;  // 0 marks an empty slot
+        rsa_table_vals[slot] = (uint16_t)m;
+    }
+    return 0;
+}
+
+static inline int rsa_table_lookup(uint32_t c, uint64_t *m) {
+    uint32_t slot = rsa_table_slot(c);
+    while (rsa_table_keys[slot]) {
+        if (rsa_table_keys[slot] == c + 1) {
+            *m = rsa_table_vals[slot];
+            return 1;
+        }
+        slot = (slot + 1) & (((uint32_t)1 << RSA_TABLE_BITS) - 1);
+    }
+    return 0;
+}
+
+// Decrypt `num_blocks` 4-byte blocks from `in` to `out`. `out` may equal
+// `in`: block i is written at i * plaintext_block_size, never past the
+// ciphertext still to be read at i * 4.
+static void rsa_decrypt_blocks(const unsigned char *in, unsigned char *out, size_t num_blocks,
+                               long long d, long long n, int plaintext_block_size, int use_table) {
+    // Each encrypted block is 4 bytes (ciphertext_block_size)
+    const int ciphertext_block_size = 4;
+
+    for (size_t i = 0; i < num_blocks; i++) {
+        // Read 4-byte ciphertext block
+        const unsigned char *c = in + i * ciphertext_block_size;
+        uint32_t ciphertext = ((uint32_t)c[0] << 24) | ((uint32_t)c[1] << 16) |
+                              ((uint32_t)c[2] << 8) | c[3];
+        
+        // Decrypt: m = c^d mod n
+        uint64_t plaintext;
+        if (!use_table || !rsa_table_lookup(ciphertext, &plaintext)) {
+            plaintext = pow_mod(ciphertext, (uint64_t)d, (uint64_t)n);
+        }
+        
+        // Write plaintext block (2 bytes for block_size=2)
+        for (int j = plaintext_block_size - 1; j >= 0; j--) {
+            out[i * plaintext_block_size + j] = (unsigned char)(plaintext & 0xFF);
+            plaintext >>= 8;
+        }
+    }
+}
+
+#define RSA_MIN_BLOCKS_PER_THREAD 65536
+
+struct rsa_job {
+    unsigned char *data;
+    long long d, n;
+    int plaintext_block_size, use_table;
+};
+
+// Blocks are independent, but in-place compaction is not: a thread writing
+// plaintext at i * 2 would overwrite another range's unread ciphertext. So
+// each thread compacts into the start of its own ciphertext range, and the
+// ranges are moved together once all threads are done.
+static void rsa_range(void *ctx, int index, size_t begin, size_t end) {
+    struct rsa_job *job = ctx;
+    unsigned char *base = job->data + begin * 4;
+    (void)index;
+    rsa_decrypt_blocks(base, base, end - begin, job->d, job->n,
+                       job->plaintext_block_size, job->use_table);
+}
+
+void decrypt_rsa_parallel(unsigned char *data, size_t len, long long d, long long n,
+                          int plaintext_block_size, int threads) {
+    size_t num_blocks = len / 4;
+    int use_table = plaintext_block_size == 2 && num_blocks >= RSA_TABLE_MIN_BLOCKS &&
+                    rsa_table_build((uint64_t)n) == 0;
+    struct rsa_job job = { data, d, n, plaintext_block_size, use_table };
+
+    threads = loader_threads(threads, num_blocks, RSA_MIN_BLOCKS_PER_THREAD);
+    parallel_for(num_blocks, threads, rsa_range, &job);
+    for (int t = 1; t < threads; t++) {
+        size_t begin, end;
+        parallel_range(num_blocks, threads, t, &begin, &end);
+        memmove(data + begin * plaintext_block_size, data + begin * 4,
+                (end - begin) * plaintext_block_size);
+    }
+
+    if (use_table) {
+        free(rsa_table_keys);
+        free(rsa_table_vals);
+    }
+}
+
+void decrypt_rsa(unsigned char *data, size_t len, long long d, long long n, int plaintext_block_size) {
+    decrypt_rsa_parallel(data, len, d, n, plaintext_block_size, 1);
+}"""
+
+DECRYPTOR = rsa_dec_func
+DECRYPT_CALL = """int64_t d, n;
+    int32_t block_size;
+    memcpy(&d, key, 8);
+    memcpy(&n, key + 8, 8);
+    memcpy(&block_size, key + 16, 4);
+    decrypt_rsa_parallel(data, len, d, n, block_size, threads);"""
+
+@functools.lru_cache(maxsize=4)
+def rsa_block_table(e : int, n : int) -> array:
+    """Ciphertext for every possible 2-byte plaintext block under (e, n).
+
+    With RSA_BLOCK_SIZE = 2 there are only 65,536 distinct blocks, so it is
+    far cheaper to run pow() once per possible block than once per block of
+    input. The table is indexed by the block read as a *native* uint16 and
+    its entries are stored so that their native bytes are the big-endian
+    ciphertext; encrypting is then a pure gather with no byte swapping.
+    """
+    assert array('H').itemsize == 2 and array('I').itemsize == 4
+    table = array('I', bytes(4 << 16))
+    little = sys.byteorder == 'little'
+    for m in range(1 << 16):
+        c = pow(m, e, n)
+        if little:
+            index = ((m & 0xff) << 8) | (m >> 8)
+            c = int.from_bytes(c.to_bytes(4, 'big'), 'little')
+        else:
+            index = m
+        table[index] = c
+    return table
+
+def rsa_encrypt_blocks(data : bytes, table : array) -> bytes:
+    """Map `data` through a rsa_block_table in bulk (4 bytes out per 2 in)."""
+    if len(data) % RSA_BLOCK_SIZE:
+        data = bytes(data) + b'\x00' * (RSA_BLOCK_SIZE - len(data) % RSA_BLOCK_SIZE)
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is not None:
+        blocks = np.frombuffer(data, dtype=np.uint16)
+        return np.frombuffer(table, dtype=np.uint32)[blocks].tobytes()
+    blocks = memoryview(data).cast('H')
+    return array('I', map(table.__getitem__, blocks)).tobytes()
+
+def generate_rsa_key(randfunc=None):
+    # Use larger primes for block-based RSA
+    # Block size of 2 bytes = 16 bits, so we need n > 65536
+    BLOCK_SIZE = RSA_BLOCK_SIZE  # 2 bytes per block
+    
+    while True:
+        try:
+            # Use 12-bit primes, giving us n with ~24 bits
+            # This ensures n > 65536 (2^16) for 2-byte blocks
+            p, q = getPrime(12, randfunc), getPrime(12, randfunc)
+            n = p * q
+            
+            # Ensure n is large enough for our block size
+            max_block_value = (1 << (BLOCK_SIZE * 8)) - 1  # 2^16 - 1 = 65535
+            assert n > max_block_value, f"n={n} must be > {max_block_value}"
+            
+            # Choose public exponent
+            e = RSA_PUBLIC_EXPONENT  # Standard RSA public exponent
+            phi = (p - 1) * (q - 1)
+            
+            # Ensure e and phi are coprime
+            from math import gcd
+            if gcd(e, phi) != 1:
+                continue
+            
+            # Calculate private exponent
+            d = inverse(e, phi)
+            break
+        except Exception as ex:
+            continue
+    
+    # (d, n, block_size)
+    return (d, n, BLOCK_SIZE)
+
+class RsaStream:
+    def __init__(self, key : tuple = None):
+        self.key = key or generate_rsa_key()
+        self._table = rsa_block_table(RSA_PUBLIC_EXPONENT, self.key[1])
+        self._pending = b''
+
+    def update(self, chunk : bytes) -> bytes:
+        # Only whole 2-byte blocks are encrypted; an odd byte waits for the
+        # next chunk
+        if self._pending:
+            chunk = self._pending + bytes(chunk)
+        usable = len(chunk) - len(chunk) % RSA_BLOCK_SIZE
+        self._pending = bytes(chunk[usable:])
+        return rsa_encrypt_blocks(memoryview(chunk)[:usable], self._table)
+
+    def finalize(self) -> bytes:
+        # The last block is zero-padded; each ciphertext block is 4 bytes,
+        # big-endian
+        tail, self._pending = self._pending, b''
+        return rsa_encrypt_blocks(tail, self._table) if tail else b''
+
+def encrypt_rsa(shellcode : bytes):
+    stream = RsaStream()
+    
+    # Encrypt every block through the precomputed table
+    enc = stream.update(shellcode) + stream.finalize()
+    
+    # Return encrypted data and keys: (d, n, block_size)
+    return enc, stream.key
+
+
+def new_stream(key : tuple = None):
+    return RsaStream(key)
+
+def pack_key(key : tuple) -> bytes:
+    return struct.pack("<qqi", key[0], key[1], key[2])
+
+def derive_key(prf) -> tuple:
+    drbg = {'counter': 0}
+    def randfunc(n):
+        drbg['counter'] += 1
+        return prf(b'rsa-%d' % drbg['counter'], n)
+    return generate_rsa_key(randfunc)
+
+def describe(key : tuple):
+    block_size = key[2] if len(key) > 2 else 1
+    n_bits = key[1].bit_length()
+    details = {
+        "algorithm": "RSA (Block-based)",
+        "key_size": f"{n_bits}-bit modulus",
+        "public_exponent": str(RSA_PUBLIC_EXPONENT),
+        "private_exponent": str(key[0])[:50] + "..." if len(str(key[0])) > 50 else str(key[0]),
+        "modulus": str(key[1])[:50] + "..." if len(str(key[1])) > 50 else str(key[1]),
+        "block_size": f"{block_size} bytes",
+        "rounds": 1,
+        "mode": f"Block encryption ({block_size * 8}-bit blocks)"
+    }
+    return details, f"d={str(key[0])[:20]}..., n={str(key[1])[:20]}..., block_size={block_size}"
@@ -0,0 +1,140 @@
+import math
+import random
+
+# Single-byte XOR: the loader decrypts it at memory bandwidth, split across
+# threads for large payloads.
+
+CIPHER_ID = 1
+LABEL = "XOR"
+
+xor_dec_func = """
+void decrypt_xor(unsigned char *data, size_t len, unsigned char key) {
+    for (size_t i = 0; i < len; i++) {
+        data[i] = data[i] ^ key;
+    }
+}
+
+// XOR runs at memory bandwidth; smaller shares are not worth a thread
+#define XOR_MIN_BYTES_PER_THREAD (8u << 20)
+
+struct xor_job {
+    unsigned char *data;
+    unsigned char key;
+};
+
+static void xor_range(void *ctx, int index, size_t begin, size_t end) {
+    struct xor_job *job = ctx;
+    (void)index;
+    decrypt_xor(job->data + begin, end - begin, job->key);
+}
+
+void decrypt_xor_parallel(unsigned char *data, size_t len, unsigned char key, int threads) {
+    struct xor_job job = { data, key };
+    parallel_for(len, loader_threads(threads, len, XOR_MIN_BYTES_PER_THREAD), xor_range, &job);
+}"""
+
+DECRYPTOR = xor_dec_func
+DECRYPT_CALL = "decrypt_xor_parallel(data, len, key[0], threads);"
+
+# Without numpy, multi-byte keys are XORed as big integers over chunks of
+# about this size, rounded down to a whole number of key repetitions.
+XOR_CHUNK_SIZE = 1 << 20
+
+# With numpy, the key is tiled to a block of about this many bytes (a whole
+# number of key repetitions and of 8-byte words), and the buffer is XORed
+# with it one 64-bit word at a time in a single pass.
+XOR_BLOCK_SIZE = 64 << 10
+
+def _xor_chunks(data, key : bytes) -> bytes:
+    if len(key) == 1:
+        table = bytes(i ^ key[0] for i in range(256))
+        return bytes(data).translate(table)
+
+    chunk_size = max(len(key), XOR_CHUNK_SIZE - XOR_CHUNK_SIZE % len(key))
+    keystream = key * (chunk_size // len(key))
+
+    out = bytearray(len(data))
+    view = memoryview(data)
+    for start in range(0, len(data), chunk_size):
+        chunk = view[start:start + chunk_size]
+        n = len(chunk)
+        value = int.from_bytes(chunk, 'little') ^ int.from_bytes(keystream[:n], 'little')
+        out[start:start + n] = value.to_bytes(n, 'little')
+    return bytes(out)
+
+def _xor_numpy(np, data, key : bytes) -> bytes:
+    period = len(key) * 8 // math.gcd(len(key), 8)
+    block = period * max(1, XOR_BLOCK_SIZE // period)
+    whole = len(data) // block * block
+    keystream = np.frombuffer(key * (block // len(key)), dtype=np.uint64)
+    out = np.empty(len(data), dtype=np.uint8)
+    words = np.frombuffer(data, dtype=np.uint64, count=whole // 8).reshape(-1, block // 8)
+    np.bitwise_xor(words, keystream, out=out[:whole].view(np.uint64).reshape(words.shape))
+    # The tail starts at a whole number of key repetitions, like data[0]
+    out[whole:] = np.frombuffer(_xor_chunks(memoryview(data)[whole:], key), dtype=np.uint8)
+    return out.tobytes()
+
+def xor_bytes(data : bytes, key : bytes, offset : int = 0) -> bytes:
+    """XOR a whole buffer with a repeating key.
+
+    `offset` is the key position of data[0], so a stream can be processed in
+    pieces (rolling key) and still match a single call over the full input.
+    With numpy, buffers of at least XOR_BLOCK_SIZE are XORed in 64-bit words
+    against a tiled key, at the same speed for any key length. Otherwise
+    single-byte keys go through bytes.translate with a 256-entry table and
+    longer keys use int.from_bytes-wide XOR per chunk.
+    """
+    if len(key) == 0:
+        raise ValueError("XOR key must not be empty")
+    shift = offset % len(key)
+    key = key[shift:] + key[:shift]
+    if len(data) >= XOR_BLOCK_SIZE:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        if np is not None:
+            return _xor_numpy(np, data, key)
+    return _xor_chunks(data, key)
+
+class XorStream:
+    def __init__(self, key_value : int = None):
+        if key_value is None:
+            key_value = random.randint(0x1, 0xff)
+        self.key = (key_value,)
+        self._key_bytes = bytes([key_value])
+        self._offset = 0
+
+    def update(self, chunk : bytes) -> bytes:
+        out = xor_bytes(chunk, self._key_bytes, self._offset)
+        self._offset += len(chunk)
+        return out
+
+    def finalize(self) -> bytes:
+        return b''
+
+def encrypt_xor(shellcode : bytes):
+    stream = XorStream()
+    enc = stream.update(shellcode) + stream.finalize()
+    return enc, stream.key  # Return as tuple for consistency
+
+
+def new_stream(key : tuple = None):
+    return XorStream(key[0] if key else None)
+
+def pack_key(key : tuple) -> bytes:
+    return bytes([key[0]])
+
+def derive_key(prf) -> tuple:
+    return (prf(b'xor', 1)[0] or 1,)
+
+def describe(key : tuple):
+    details = {
+        "algorithm": "XOR Cipher",
+        "key_size": "8-bit",
+        "key_value": f"0x{key[0]:02x}",
+        "rounds": 1,
+        "mode": "Stream Cipher",
+        "block_size": "1 byte"
+    }
+    return details, f"Key: 0x{key[0]:02x}"
@@ -0,0 +1,183 @@
+import os
+import lzma
+import time
+import zlib
+from typing import Iterable, Iterator, Optional
+
+# Optional compression stage applied to the ELF before encryption.
+#
+# The input is compressed as it streams through the pipeline, and the
+# generated loader decrypts the payload and then decompresses it into the
+# image buffer. Both sides use the same libraries (zlib / liblzma), statically
+# linked into the loader so obfuscated binaries stay self-contained.
+
+COMPRESSION_IDS = {'none': 0, 'zlib': 1, 'lzma': 2}
+
+DEFAULT_LEVELS = {'zlib': 6, 'lzma': 6}
+
+# Set to 1 to decompress every payload again at build time (see
+# CompressionStage); off by default, as it costs a second full pass
+VERIFY_ENV = "SIMPFUSCATOR_VERIFY_COMPRESSION"
+
+# Extra gcc flags for a loader that links the decompressor
+COMPRESSION_LINK_FLAGS = {
+    'none': [],
+    'zlib': ['-Wl,-Bstatic', '-lz', '-Wl,-Bdynamic'],
+    'lzma': ['-Wl,-Bstatic', '-llzma', '-Wl,-Bdynamic'],
+}
+
+# Each defines LOADER_COMPRESSED and, when set,
+#     int decompress_image(const unsigned char *src, size_t src_len,
+#                          unsigned char *dst, size_t dst_len)
+# which returns 0 only if src decodes to exactly dst_len bytes.
+decompress_funcs = {
+    'none': """
+#define LOADER_COMPRESSED 0
+""",
+    'zlib': """
+#define LOADER_COMPRESSED 1
+#include <zlib.h>
+
+static int decompress_image(const unsigned char *src, size_t src_len,
+                            unsigned char *dst, size_t dst_len) {
+    /* avail_in/avail_out are 32-bit, so feed images larger than 4 GB in steps */
+    const size_t step = (size_t)1 << 30;
+    z_stream zs;
+    memset(&zs, 0, sizeof(zs));
+    if (inflateInit(&zs) != Z_OK) return -1;
+    zs.next_in = (Bytef *)src;
+    zs.next_out = dst;
+    int rc;
+    do {
+        size_t in_left = src_len - (size_t)(zs.next_in - src);
+        size_t out_left = dst_len - (size_t)(zs.next_out - dst);
+        zs.avail_in = (uInt)(in_left > step ? step : in_left);
+        zs.avail_out = (uInt)(out_left > step ? step : out_left);
+        rc = inflate(&zs, Z_NO_FLUSH);
+    } while (rc == Z_OK);
+    size_t produced = (size_t)(zs.next_out - dst);
+    inflateEnd(&zs);
+    return rc == Z_STREAM_END && produced == dst_len ? 0 : -1;
+}
+""",
+    'lzma': """
+#define LOADER_COMPRESSED 1
+#include <lzma.h>
+
+static int decompress_image(const unsigned char *src, size_t src_len,
+                            unsigned char *dst, size_t dst_len) {
+    uint64_t memlimit = UINT64_MAX;
+    size_t in_pos = 0, out_pos = 0;
+    lzma_ret rc = lzma_stream_buffer_decode(&memlimit, 0, NULL, src, &in_pos, src_len,
+                                            dst, &out_pos, dst_len);
+    return rc == LZMA_OK && out_pos == dst_len ? 0 : -1;
+}
+""",
+}
+
+
+def check_compression(method: str, level: Optional[int] = None) -> int:
+    """Validate a method/level pair and return the effective level."""
+    if method not in COMPRESSION_IDS:
+        raise ValueError(f"Unknown compression method: {method}")
+    if method == 'none':
+        return 0
+    if level is None:
+        return DEFAULT_LEVELS[method]
+    if not 0 <= level <= 9:
+        raise ValueError(f"Compression level must be 0-9, got {level}")
+    return level
+
+
+class CompressionStage:
+    """Compress a stream of plaintext chunks on the way to the encryptor.
+
+    With `verify` (default: the SIMPFUSCATOR_VERIFY_COMPRESSION environment
+    variable), every compressed chunk is also fed through a decompressor as
+    it is produced, which checks that the stream round-trips without holding
+    the output in memory. That is Python's zlib/lzma on the build host, not
+    the loader; benchmarks/bench_loader.py --compress measures the loader.
+    Sizes and timings are available once the stream is consumed.
+    """
+
+    # Bound on decompressed bytes materialised per step while verifying
+    VERIFY_STEP = 4 << 20
+
+    def __init__(self, method: str, level: Optional[int] = None, verify: Optional[bool] = None):
+        self.method = method
+        self.level = check_compression(method, level)
+        self.verify = os.environ.get(VERIFY_ENV) == "1" if verify is None else verify
+        self.input_size = 0
+        self.compressed_size = 0
+        self.compress_seconds = 0.0
+        self.verify_seconds = 0.0
+        self._verified_size = 0
+        if method == 'zlib':
+            self._compressor = zlib.compressobj(self.level)
+            self._decompressor = zlib.decompressobj()
+        else:
+            self._compressor = lzma.LZMACompressor(
+                format=lzma.FORMAT_XZ, check=lzma.CHECK_CRC32, preset=self.level)
+            self._decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+
+    def _verify(self, data: bytes):
+        if not self.verify:
+            return
+        start = time.perf_counter()
+        d = self._decompressor
+        if self.method == 'zlib':
+            out = d.decompress(data, self.VERIFY_STEP)
+            self._verified_size += len(out)
+            while d.unconsumed_tail:
+                out = d.decompress(d.unconsumed_tail, self.VERIFY_STEP)
+                self._verified_size += len(out)
+        else:
+            out = d.decompress(data, self.VERIFY_STEP)
+            self._verified_size += len(out)
+            while not d.eof and not d.needs_input:
+                out = d.decompress(b"", self.VERIFY_STEP)
+                self._verified_size += len(out)
+        self.verify_seconds += time.perf_counter() - start
+
+    def process(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Yield compressed chunks for the plaintext `chunks`."""
+        for chunk in chunks:
+            self.input_size += len(chunk)
+            start = time.perf_counter()
+            out = self._compressor.compress(chunk)
+            self.compress_seconds += time.perf_counter() - start
+            if out:
+                self.compressed_size += len(out)
+                self._verify(out)
+                yield out
+        start = time.perf_counter()
+        out = self._compressor.flush()
+        self.compress_seconds += time.perf_counter() - start
+        self.compressed_size += len(out)
+        self._verify(out)
+        if self.verify and self._verified_size != self.input_size:
+            raise RuntimeError(
+                f"{self.method} round-trip produced {self._verified_size} bytes, "
+                f"expected {self.input_size}")
+        yield out
+
+    def info(self) -> dict:
+        info = {
+            "method": self.method,
+            "level": self.level,
+            "input_size": self.input_size,
+            "compressed_size": self.compressed_size,
+            "compression_ratio": (f"{self.compressed_size / self.input_size * 100:.2f}%"
+                                  if self.input_size else "0.00%"),
+            "compress_ms": round(self.compress_seconds * 1000, 2),
+        }
+        if self.verify:
+            info["verify_decompress_ms"] = round(self.verify_seconds * 1000, 2)
+        return info
+
+
+def compress_bytes(data: bytes, method: str, level: Optional[int] = None,
+                   verify: Optional[bool] = None):
+    """Compress an in-memory buffer; returns (compressed, CompressionStage)."""
+    stage = CompressionStage(method, level, verify)
+    return b"".join(stage.process([data])), stage
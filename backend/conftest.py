@@ -0,0 +1,39 @@
+"""
+Helpers shared by the test scripts: building small C programs, protecting
+them and running the result
+"""
+
+import io
+import os
+import shutil
+import contextlib
+import subprocess
+import pytest
+from obfuscator import Obfuscator
+
+HELLO_SOURCE = '#include <stdio.h>\nint main(void) { puts("hello"); return 7; }\n'
+
+def build_c(workdir, name, source, flags=()):
+    """Compile `source` to workdir/name with gcc, skipping the test without gcc."""
+    if shutil.which("gcc") is None:
+        pytest.skip("gcc is needed to build test programs and loader stubs")
+    src = os.path.join(workdir, name + ".c")
+    path = os.path.join(workdir, name)
+    with open(src, "w") as f:
+        f.write(source)
+    subprocess.run(["gcc", "-O2", *flags, src, "-o", path], check=True)
+    return path
+
+def protect(path, output, cipher, **options):
+    """Obfuscator(path).obfuscate(...) with its progress output silenced."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Obfuscator(path).obfuscate(cipher, output, **options)
+
+def run(path):
+    result = subprocess.run([path], stdout=subprocess.PIPE, timeout=30)
+    return result.returncode, result.stdout
+
+@pytest.fixture(scope="session")
+def hello_elf(tmp_path_factory):
+    """A dynamically linked program that prints "hello" and exits with 7."""
+    return build_c(str(tmp_path_factory.mktemp("hello")), "hello", HELLO_SOURCE)
@@ -0,0 +1,105 @@
+import os
+import mmap
+import struct
+from typing import NamedTuple
+
+# Fast ELF validation straight from the file header.
+#
+# Stub and source builds only need to know that the input is an executable
+# ELF; they treat it as opaque bytes otherwise. Reading the ELF header and
+# program headers from an mmap touches one or two pages, where a full LIEF
+# parse reads every table in the file (and importing lief alone takes about
+# 0.4 s), so LIEF is left to the features that rewrite the binary.
+
+ELF_MAGIC = b"\x7fELF"
+
+ELFCLASS32, ELFCLASS64 = 1, 2
+ELFDATA2LSB, ELFDATA2MSB = 1, 2
+ET_EXEC, ET_DYN = 2, 3
+PT_LOAD, PT_INTERP = 1, 3
+
+FILE_TYPES = {ET_EXEC: "EXEC", ET_DYN: "DYN"}
+
+# e_ident[16], then e_type .. e_shstrndx; the three address-sized fields
+# (e_entry, e_phoff, e_shoff) are 4 or 8 bytes wide depending on the class
+_HEADER_FORMATS = {ELFCLASS32: "HHIIIIIHHHHHH", ELFCLASS64: "HHIQQQIHHHHHH"}
+# p_type, then the class-specific layout of the remaining fields; only
+# p_type, p_offset and p_filesz are needed here
+_PHDR_FORMATS = {ELFCLASS32: "IIIIIIII", ELFCLASS64: "IIQQQQQQ"}
+
+
+class ElfInfo(NamedTuple):
+    elf_class: int      # 32 or 64
+    little_endian: bool
+    file_type: str      # EXEC or DYN
+    machine: int        # e_machine (62 = x86-64)
+    entry: int
+    load_segments: int
+    interpreter: bool   # has PT_INTERP, i.e. is dynamically linked
+    size: int
+
+
+def check_elf(path: str) -> ElfInfo:
+    """Validate that `path` is a loadable ELF executable.
+
+    Raises ValueError describing the first problem found, or OSError if the
+    file cannot be read.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < 16:
+            raise ValueError("File is too small to be an ELF binary")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _check(mm, size)
+
+
+def _check(mm, size: int) -> ElfInfo:
+    if mm[:4] != ELF_MAGIC:
+        raise ValueError(f"Not an ELF file (starts with {mm[:4].hex()})")
+    elf_class, data, version = mm[4], mm[5], mm[6]
+    if elf_class not in _HEADER_FORMATS:
+        raise ValueError(f"Invalid ELF class {elf_class}")
+    if data not in (ELFDATA2LSB, ELFDATA2MSB):
+        raise ValueError(f"Invalid ELF data encoding {data}")
+    if version != 1:
+        raise ValueError(f"Unsupported ELF version {version}")
+    order = "<" if data == ELFDATA2LSB else ">"
+
+    header_format = order + _HEADER_FORMATS[elf_class]
+    if size < 16 + struct.calcsize(header_format):
+        raise ValueError("Truncated ELF header")
+    (e_type, e_machine, _, e_entry, e_phoff, _, _, _,
+     e_phentsize, e_phnum, _, _, _) = struct.unpack_from(header_format, mm, 16)
+    if e_type not in FILE_TYPES:
+        raise ValueError(f"ELF type {e_type} is not an executable or shared object")
+
+    phdr_format = order + _PHDR_FORMATS[elf_class]
+    if e_phnum == 0:
+        raise ValueError("ELF has no program headers")
+    if e_phentsize != struct.calcsize(phdr_format):
+        raise ValueError(f"Unexpected program header size {e_phentsize}")
+    if e_phoff + e_phnum * e_phentsize > size:
+        raise ValueError("Program headers extend past the end of the file")
+
+    loads = 0
+    interpreter = False
+    for i in range(e_phnum):
+        fields = struct.unpack_from(phdr_format, mm, e_phoff + i * e_phentsize)
+        p_type = fields[0]
+        # Elf64_Phdr: type, flags, offset, vaddr, paddr, filesz, ...
+        # Elf32_Phdr: type, offset, vaddr, paddr, filesz, ...
+        if elf_class == ELFCLASS64:
+            p_offset, p_filesz = fields[2], fields[5]
+        else:
+            p_offset, p_filesz = fields[1], fields[4]
+        if p_type == PT_LOAD:
+            loads += 1
+            if p_offset + p_filesz > size:
+                raise ValueError(f"Loadable segment {i} extends past the end of the file")
+        elif p_type == PT_INTERP:
+            interpreter = True
+    if loads == 0:
+        raise ValueError("ELF has no loadable segments")
+
+    return ElfInfo(64 if elf_class == ELFCLASS64 else 32, data == ELFDATA2LSB,
+                   FILE_TYPES[e_type], e_machine, e_entry, loads, interpreter, size)
@@ -0,0 +1,242 @@
+import os
+import hmac
+import json
+import mmap
+import struct
+import hashlib
+from bisect import bisect_left
+from typing import Iterator, List, Optional
+from encryptor import derive_key, new_stream
+from loader import CHUNK_FORMAT, pack_key
+
+# Incremental, delta-friendly builds.
+#
+# A stub build encrypts the whole input under one fresh key, so a one-byte
+# change in the input changes every byte of the output and a delta-update
+# channel has to ship the full artifact each release. Incremental mode
+# instead splits the input into content-defined chunks and encrypts each one
+# under a key derived from the project key (the persistent --key-seed) and
+# the chunk's contents:
+#
+#     digest = HMAC-SHA256(project key, chunk)
+#     key    = derive_key(cipher, project key, "chunk" + digest)
+#
+# Chunk boundaries depend only on the bytes around them (a gear hash over
+# the last 16 bytes), so an edit moves at most the boundaries next to it;
+# every other chunk encrypts to the same ciphertext as in the previous build,
+# wherever it now sits in the file. The loader decrypts chunks through the
+# per-chunk key table written after the payload (loader.ENTRY_CHUNKED).
+#
+# Every build writes a manifest: chunk digests, sizes and their offsets in
+# the artifact. A rebuild given the previous manifest copies the ciphertext
+# of unchanged chunks from the previous artifact and only encrypts the rest.
+#
+# Equal chunks under the same project key encrypt identically, which is what
+# makes deltas small, and which also reveals where two builds share content.
+
+# Chunk size bounds; a boundary follows a byte whose gear hash has zero bits
+# under CHUNK_MASK, which happens every 2**13 bytes on average
+CHUNK_MIN = 2 << 10
+CHUNK_MAX = 64 << 10
+CHUNK_MASK = 0xfff8
+
+# Bump when chunk boundaries, digests or key derivation change: manifests
+# of another version are ignored
+MANIFEST_VERSION = 1
+
+# Boundaries are searched in windows of this many bytes at a time
+SCAN_BLOCK = 4 << 20
+
+# 16-bit gear hash: h = ((h << 1) + GEAR[byte]) & 0xffff, so h only depends
+# on the last 16 bytes
+GEAR = [int.from_bytes(hashlib.sha256(b"simpfuscator-gear-%d" % i).digest()[:2], "little")
+        for i in range(256)]
+GEAR_WINDOW = 16
+
+
+def _candidates_numpy(np, view, start: int, end: int) -> List[int]:
+    """Offsets in [start, end) whose gear hash is zero under CHUNK_MASK."""
+    lead = min(start, GEAR_WINDOW - 1)
+    data = np.frombuffer(view[start - lead:end], dtype=np.uint8)
+    gear = np.asarray(GEAR, dtype=np.uint16)[data]
+    # h[i] = sum of gear[i - k] << k for k < 16, built by doubling the
+    # window: four shifted additions instead of fifteen
+    h = gear
+    span = 1
+    while span < GEAR_WINDOW:
+        h[span:] += h[:-span] << np.uint16(span)
+        span *= 2
+    hits = np.flatnonzero((h[lead:] & np.uint16(CHUNK_MASK)) == 0)
+    return (hits + start).tolist()
+
+
+def _candidates_python(view, start: int, end: int) -> List[int]:
+    h = 0
+    for i in range(max(0, start - GEAR_WINDOW + 1), start):
+        h = ((h << 1) + GEAR[view[i]]) & 0xffff
+    hits = []
+    for i in range(start, end):
+        h = ((h << 1) + GEAR[view[i]]) & 0xffff
+        if not h & CHUNK_MASK:
+            hits.append(i)
+    return hits
+
+
+def chunk_boundaries(data) -> List[int]:
+    """End offsets of the content-defined chunks of `data` (any buffer).
+
+    Uses numpy when it is installed; the pure-Python scan finds the same
+    boundaries, only slower.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    view = memoryview(data)
+    size = len(view)
+    candidates = []
+    for start in range(0, size, SCAN_BLOCK):
+        end = min(size, start + SCAN_BLOCK)
+        candidates.extend(_candidates_numpy(np, view, start, end) if np is not None
+                          else _candidates_python(view, start, end))
+
+    ends = []
+    last = 0
+    while size - last > CHUNK_MIN:
+        # Cut after the first candidate that makes a chunk of at least CHUNK_MIN
+        i = bisect_left(candidates, last + CHUNK_MIN - 1)
+        if i < len(candidates) and candidates[i] < last + CHUNK_MAX:
+            last = candidates[i] + 1
+        elif size - last > CHUNK_MAX:
+            last += CHUNK_MAX
+        else:
+            break
+        ends.append(last)
+    if last < size or not ends:
+        ends.append(size)
+    return ends
+
+
+def chunk_digest(project_key: bytes, chunk) -> bytes:
+    return hmac.new(project_key, chunk, hashlib.sha256).digest()
+
+
+def key_id(project_key: bytes) -> str:
+    """Identifies the project key in manifests without revealing it."""
+    return hmac.new(project_key, b"manifest", hashlib.sha256).hexdigest()[:16]
+
+
+class PreviousBuild:
+    """Ciphertext of a previous incremental build, looked up by chunk digest.
+
+    Only used when its manifest matches this build (version, cipher, project
+    key) and the artifact it describes is still unchanged on disk.
+    """
+
+    def __init__(self, manifest_path: str, cipher: str, project_key: bytes):
+        self.chunks = {}
+        self._file = None
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if (manifest.get("version") != MANIFEST_VERSION or manifest.get("cipher") != cipher
+                    or manifest.get("key_id") != key_id(project_key)):
+                return
+            artifact = manifest["output"]
+            st = os.stat(artifact)
+            if st.st_size != manifest["output_size"] or st.st_mtime_ns != manifest["output_mtime_ns"]:
+                return
+            self._file = open(artifact, "rb")
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        for chunk in manifest["chunks"]:
+            self.chunks[chunk["digest"]] = (chunk["offset"], chunk["size"])
+
+    def read(self, digest: bytes) -> Optional[bytes]:
+        """Ciphertext of the chunk with `digest`, or None if it is new."""
+        found = self.chunks.get(digest.hex())
+        if found is None or self._file is None:
+            return None
+        offset, size = found
+        self._file.seek(offset)
+        data = self._file.read(size)
+        return data if len(data) == size else None
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def chunked_entry(path: str, cipher: str, project_key: bytes, previous: Optional[PreviousBuild],
+                  progress, threads: int = 0, name: Optional[str] = None) -> dict:
+    """Index entry for write_stub_binary that encrypts `path` chunk by chunk.
+
+    While it is written, the entry's payload fills entry['chunks'] (the
+    chunk table) and entry['manifest'] (one record per chunk: digest, sizes,
+    offset in the payload), and counts chunks and bytes taken from
+    `previous` in entry['reused'].
+    """
+    entry = {
+        'name': name or os.path.basename(path),
+        'cipher': cipher,
+        'plain_size': os.path.getsize(path),
+        'key': None,
+        'compression': 'none',
+        'threads': threads,
+        'chunks': [],
+        'manifest': [],
+        'reused': {"chunks": 0, "bytes": 0},
+    }
+
+    def payload() -> Iterator[bytes]:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with progress.stage("chunk", bytes_total=entry['plain_size']) as report:
+                ends = chunk_boundaries(mm)
+                report.update(bytes_done=entry['plain_size'], chunks=len(ends))
+            progress.start("encrypt", bytes_total=entry['plain_size'])
+            start = offset = 0
+            for end in ends:
+                chunk = mm[start:end]
+                digest = chunk_digest(project_key, chunk)
+                key = derive_key(cipher, project_key, b"chunk" + digest)
+                enc = previous.read(digest) if previous else None
+                if enc is None:
+                    stream = new_stream(cipher, key)
+                    enc = stream.update(chunk) + stream.finalize()
+                else:
+                    entry['reused']["chunks"] += 1
+                    entry['reused']["bytes"] += len(chunk)
+                entry['chunks'].append(struct.pack(CHUNK_FORMAT, len(enc), len(chunk),
+                                                   pack_key(cipher, key)))
+                entry['manifest'].append({"digest": digest.hex(), "offset": offset,
+                                          "size": len(enc), "plain_size": len(chunk)})
+                progress.update("encrypt", end, entry['plain_size'])
+                offset += len(enc)
+                start = end
+                yield enc
+            progress.end("encrypt", bytes_done=entry['plain_size'])
+
+    entry['payload'] = payload()
+    return entry
+
+
+def write_manifest(manifest_path: str, entry: dict, input_path: str, output_path: str,
+                   cipher: str, project_key: bytes):
+    """Record the chunks of a written entry for the next incremental rebuild."""
+    st = os.stat(output_path)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "cipher": cipher,
+        "key_id": key_id(project_key),
+        "input": os.path.abspath(input_path),
+        "output": os.path.abspath(output_path),
+        "output_size": st.st_size,
+        "output_mtime_ns": st.st_mtime_ns,
+        "chunks": [dict(chunk, offset=entry['offset'] + chunk["offset"])
+                   for chunk in entry['manifest']],
+    }
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
@@ -0,0 +1,138 @@
+const crypto = require('crypto');
+const { EventEmitter } = require('events');
+
+// In-memory registry of asynchronous obfuscation jobs.
+//
+// POST /api/jobs creates a job and answers at once with its id; the job then
+// moves queued -> running -> done | failed while the obfuscator's progress
+// events are appended to it. Clients poll GET /api/jobs/:id or follow
+// GET /api/jobs/:id/events (server-sent events), which replays the events
+// seen so far before streaming new ones. Finished jobs are dropped after
+// ttlMs together with a callback to clean up their files.
+
+const TERMINAL = new Set(['done', 'failed']);
+
+class JobStore extends EventEmitter {
+  constructor(options = {}) {
+    super();
+    this.ttlMs = options.ttlMs || 60 * 60 * 1000;
+    this.maxEvents = options.maxEvents || 500;
+    this.onExpire = options.onExpire || (() => {});
+    this.jobs = new Map();
+    this.setMaxListeners(0);
+  }
+
+  create(meta = {}) {
+    const job = {
+      id: crypto.randomUUID(),
+      status: 'queued',
+      createdAt: Date.now(),
+      startedAt: null,
+      finishedAt: null,
+      progress: null,
+      events: [],
+      nextSeq: 0,
+      result: null,
+      error: null,
+      meta
+    };
+    this.jobs.set(job.id, job);
+    this._push(job, { event: 'status', status: job.status });
+    return job;
+  }
+
+  get(id) {
+    return this.jobs.get(id);
+  }
+
+  start(id) {
+    const job = this.jobs.get(id);
+    if (!job || job.status !== 'queued') return;
+    job.status = 'running';
+    job.startedAt = Date.now();
+    this._push(job, { event: 'status', status: job.status });
+  }
+
+  progress(id, event) {
+    const job = this.jobs.get(id);
+    if (!job || TERMINAL.has(job.status)) return;
+    if (job.status === 'queued') this.start(id);
+    const { id: _workerJobId, ...fields } = event;
+    job.progress = fields;
+    this._push(job, fields);
+  }
+
+  finish(id, result) {
+    this._settle(id, 'done', { result });
+  }
+
+  fail(id, error) {
+    this._settle(id, 'failed', { error });
+  }
+
+  _settle(id, status, fields) {
+    const job = this.jobs.get(id);
+    if (!job || TERMINAL.has(job.status)) return;
+    Object.assign(job, fields, { status, finishedAt: Date.now() });
+    this._push(job, { event: 'status', status, ...fields });
+    setTimeout(() => this._expire(id), this.ttlMs).unref();
+  }
+
+  _expire(id) {
+    const job = this.jobs.get(id);
+    if (!job) return;
+    this.jobs.delete(id);
+    this.onExpire(job);
+  }
+
+  _push(job, event) {
+    const entry = { seq: job.nextSeq++, time: Date.now(), ...event };
+    job.events.push(entry);
+    if (job.events.length > this.maxEvents) {
+      // Keep status changes; drop the oldest progress updates
+      const index = job.events.findIndex(e => e.status === 'update');
+      job.events.splice(index === -1 ? 0 : index, 1);
+    }
+    this.emit(job.id, entry);
+  }
+
+  // Calls listener(entry) for every event after `afterSeq`, then for new
+  // ones until the job finishes. Returns an unsubscribe function.
+  subscribe(id, listener, afterSeq = -1) {
+    const job = this.jobs.get(id);
+    if (!job) return () => {};
+    for (const entry of job.events) {
+      if (entry.seq > afterSeq) listener(entry);
+    }
+    if (TERMINAL.has(job.status)) return () => {};
+    const handler = (entry) => listener(entry);
+    this.on(id, handler);
+    return () => this.off(id, handler);
+  }
+
+  isFinished(id) {
+    const job = this.jobs.get(id);
+    return !job || TERMINAL.has(job.status);
+  }
+
+  toJSON(job) {
+    return {
+      id: job.id,
+      status: job.status,
+      createdAt: new Date(job.createdAt).toISOString(),
+      startedAt: job.startedAt && new Date(job.startedAt).toISOString(),
+      finishedAt: job.finishedAt && new Date(job.finishedAt).toISOString(),
+      progress: job.progress,
+      result: job.result,
+      error: job.error
+    };
+  }
+
+  status() {
+    const counts = { queued: 0, running: 0, done: 0, failed: 0 };
+    for (const job of this.jobs.values()) counts[job.status]++;
+    return counts;
+  }
+}
+
+module.exports = { JobStore };
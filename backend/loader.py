@@ -0,0 +1,693 @@
+import os
+import struct
+import shutil
+from typing import Callable, List, Optional, Tuple
+from encryptor import cipher_id, cipher_module, decryptor_source
+from compressor import COMPRESSION_IDS, COMPRESSION_LINK_FLAGS, decompress_funcs
+from cache import ObfuscationCache, cache_key
+from nolibc import NOLIBC_FLAGS, check_nolibc, nolibc_runtime
+
+# Precompiled loader stubs.
+#
+# Instead of rendering the ciphertext into a C array and running gcc for
+# every job, a small decryptor stub is compiled once per cipher and cached
+# in the artifact cache (see cache.py). Each obfuscated binary is then just:
+#
+#     [ stub ELF ][ ciphertext ... ][ entry index ][ trailer ]
+#
+# At runtime the stub opens /proc/self/exe, reads the trailer from the end
+# of the file, locates its payload through the entry index, decrypts it,
+# decompresses it if the entry is compressed, and executes it. A bundle is
+# the same file with one entry per program, all sharing the stub: the stub
+# picks the entry named by argv[0] or argv[1] and reads and decrypts only
+# that program's payload.
+
+# Bump whenever the trailer layout or the stub's runtime contract changes.
+STUB_VERSION = 3
+
+TRAILER_MAGIC = b"SIMPFUSC"
+
+# struct payload_entry / struct payload_trailer in stub_main_func
+ENTRY_FORMAT = "<32sIIQQQQ64s"
+TRAILER_FORMAT = "<QII8s"
+ENTRY_SIZE = struct.calcsize(ENTRY_FORMAT)
+TRAILER_SIZE = struct.calcsize(TRAILER_FORMAT)
+
+# Entries built by incremental mode (incremental.py) encrypt each
+# content-defined chunk under its own key. Their payload is followed by a
+# table with one struct payload_chunk per chunk (ciphertext length, plain
+# length, packed key), and the entry's key field holds the table's offset
+# and chunk count instead of a key.
+ENTRY_CHUNKED = 1 << 16
+CHUNK_FORMAT = "<QQ64s"
+CHUNK_TABLE_FORMAT = "<QQ"
+
+# How the loader starts the decrypted program
+EXEC_MODES = {
+    'memfd': "memfd + fexecve",   # falls back to tmpfile if memfd is unavailable
+    'tmpfile': "tmpfs + execv",
+}
+
+# How the loader itself is built and linked. Both profiles compile the same
+# loader source; nolibc swaps the libc headers for the freestanding runtime
+# in nolibc.py.
+LOADER_PROFILES = {
+    'glibc': "dynamic, glibc",
+    'nolibc': "static, libc-free (raw syscalls)",
+}
+
+STUB_FLAGS = ['-O3', '-s', '-pthread']
+
+# Must match LOADER_MAX_THREADS in parallel_func
+LOADER_MAX_THREADS = 64
+
+# Executes a decrypted ELF image. Shared by the stub and the legacy
+# source-embedding build so both loaders behave identically at runtime.
+#
+# With LOADER_EXEC_MEMFD the image lives in an anonymous memfd and is
+# fexecve'd in place: no fork, no fsync, nothing written to the filesystem.
+# The stub even decrypts straight into the memfd mapping (image_alloc), so
+# the image is never copied. The /tmp file + fork/execv path is only used
+# when memfd_create or fexecve is unavailable.
+exec_func = """
+static int run_elf_tmpfile(unsigned char *image, size_t image_len, char **argv) {
+    char tmpl[] = "/tmp/genelfXXXXXX";
+    int fd = mkstemp(tmpl);
+    if (fd < 0) {
+        perror("mkstemp");
+        return 4;
+    }
+    size_t written = 0;
+    while (written < image_len) {
+        ssize_t w = write(fd, image + written, image_len - written);
+        if (w < 0) {
+            if (errno == EINTR) continue;
+            perror("write");
+            close(fd);
+            unlink(tmpl);
+            return 5;
+        }
+        written += (size_t)w;
+    }
+
+    /* flush & close */
+    if (fsync(fd) == -1) {
+        /* not fatal, but warn */
+        perror("fsync");
+    }
+    if (close(fd) == -1) {
+        perror("close");
+        unlink(tmpl);
+        return 6;
+    }
+
+    /* make executable for owner only */
+    if (chmod(tmpl, S_IRWXU) == -1) {
+        perror("chmod");
+        unlink(tmpl);
+        return 7;
+    }
+
+    /* fork and exec */
+    pid_t pid = fork();
+    if (pid < 0) {
+        perror("fork");
+        unlink(tmpl);
+        return 8;
+    }
+
+    if (pid == 0) {
+        /* Child: exec the newly created file.
+           Use absolute path in argv[0] to be safe. */
+        argv[0] = tmpl;
+        execv(tmpl, argv);
+        /* If execv returns, it failed */
+        perror("execv");
+        _exit(127);
+    }
+
+    /* Parent: wait for child */
+    int status = 0;
+    if (waitpid(pid, &status, 0) == -1) {
+        perror("waitpid");
+        /* attempt cleanup */
+        if (unlink(tmpl) == -1) perror("unlink");
+        return 9;
+    }
+
+    /* remove the file */
+    if (unlink(tmpl) == -1) {
+        perror("unlink");
+        return 10;
+    }
+    return 0;
+}
+
+#ifndef MFD_CLOEXEC
+#define MFD_CLOEXEC 0x0001U
+#endif
+
+static int image_memfd(void) {
+#if LOADER_EXEC_MEMFD && defined(SYS_memfd_create)
+    return (int)syscall(SYS_memfd_create, "simpfuscator", MFD_CLOEXEC);
+#else
+    return -1;
+#endif
+}
+
+/* Buffer for a payload of up to `cap` bytes. When possible this is a shared
+   mapping of a fresh memfd (returned in *memfd) so run_image can exec it
+   without copying; otherwise plain heap memory and *memfd = -1. */
+unsigned char *image_alloc(size_t cap, int *memfd) {
+    *memfd = -1;
+    if (cap == 0) cap = 1;
+    int fd = image_memfd();
+    if (fd >= 0) {
+        if (ftruncate(fd, (off_t)cap) == 0) {
+            void *p = mmap(NULL, cap, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+            if (p != MAP_FAILED) {
+                *memfd = fd;
+                return p;
+            }
+        }
+        close(fd);
+    }
+    return malloc(cap);
+}
+
+/* Execute `image`. Only returns if the program could not be started in
+   place (exit status of the tmpfile fallback otherwise). */
+int run_image(unsigned char *image, size_t image_len, int memfd, char **argv) {
+    if (memfd < 0) {
+        memfd = image_memfd();
+        size_t written = 0;
+        while (memfd >= 0 && written < image_len) {
+            ssize_t w = write(memfd, image + written, image_len - written);
+            if (w < 0) {
+                if (errno == EINTR) continue;
+                close(memfd);
+                memfd = -1;
+                break;
+            }
+            written += (size_t)w;
+        }
+    }
+    if (memfd >= 0) {
+        if (ftruncate(memfd, (off_t)image_len) == 0) {
+            fexecve(memfd, argv, environ);
+        }
+        /* e.g. ENOSYS or a noexec policy on memfds: the image is still
+           mapped or in memory, so fall back to the tmpfile path */
+        close(memfd);
+    }
+    return run_elf_tmpfile(image, image_len, argv);
+}
+
+"""
+
+loader_headers = """#define _GNU_SOURCE
+#include <stdio.h>
+#include <stdlib.h>
+#include <unistd.h>
+#include <fcntl.h>
+#include <sys/stat.h>
+#include <sys/wait.h>
+#include <string.h>
+#include <errno.h>
+#include <stdint.h>
+#include <stddef.h>
+#include <sys/mman.h>
+#include <sys/syscall.h>
+#include <pthread.h>
+#include <sched.h>
+
+extern char **environ;
+"""
+
+# Splits decryption across threads. The cipher decryptors (cipher_*.py) call
+# parallel_for with a per-cipher minimum share, so small payloads never pay
+# for thread creation. `requested` <= 0 means one thread per usable CPU.
+parallel_func = """
+#define LOADER_MAX_THREADS 64
+
+static int loader_threads(int requested, size_t units, size_t min_units_per_thread) {
+    int n = requested;
+    if (n <= 0) {
+        cpu_set_t set;
+        n = sched_getaffinity(0, sizeof(set), &set) == 0 ? CPU_COUNT(&set)
+                                                        : (int)sysconf(_SC_NPROCESSORS_ONLN);
+    }
+    if (n > LOADER_MAX_THREADS) n = LOADER_MAX_THREADS;
+    size_t cap = units / (min_units_per_thread ? min_units_per_thread : 1);
+    if ((size_t)n > cap) n = (int)cap;
+    return n < 1 ? 1 : n;
+}
+
+/* Range [begin, end) of `units` handled by thread `index` of `threads` */
+static void parallel_range(size_t units, int threads, int index, size_t *begin, size_t *end) {
+    *begin = (size_t)((unsigned __int128)units * index / threads);
+    *end = (size_t)((unsigned __int128)units * (index + 1) / threads);
+}
+
+struct parallel_task {
+    void (*fn)(void *ctx, int index, size_t begin, size_t end);
+    void *ctx;
+    int index;
+    size_t begin, end;
+};
+
+static void *parallel_worker(void *arg) {
+    struct parallel_task *task = arg;
+    task->fn(task->ctx, task->index, task->begin, task->end);
+    return NULL;
+}
+
+/* Run fn over `threads` contiguous ranges of [0, units) and wait for all.
+   The calling thread takes range 0; a range whose thread cannot be created
+   runs inline. */
+static void parallel_for(size_t units, int threads,
+                         void (*fn)(void *ctx, int index, size_t begin, size_t end), void *ctx) {
+    struct parallel_task tasks[LOADER_MAX_THREADS];
+    pthread_t tids[LOADER_MAX_THREADS];
+    int started[LOADER_MAX_THREADS];
+    if (threads < 1) threads = 1;
+    if (threads > LOADER_MAX_THREADS) threads = LOADER_MAX_THREADS;
+
+    for (int t = 0; t < threads; t++) {
+        tasks[t].fn = fn;
+        tasks[t].ctx = ctx;
+        tasks[t].index = t;
+        parallel_range(units, threads, t, &tasks[t].begin, &tasks[t].end);
+        started[t] = t > 0 && pthread_create(&tids[t], NULL, parallel_worker, &tasks[t]) == 0;
+    }
+    for (int t = 0; t < threads; t++) {
+        if (!started[t]) parallel_worker(&tasks[t]);
+    }
+    for (int t = 1; t < threads; t++) {
+        if (started[t]) pthread_join(tids[t], NULL);
+    }
+}
+"""
+
+stub_main_func = """
+#define TRAILER_MAGIC "SIMPFUSC"
+#define STUB_VERSION %(version)d
+#define ENTRY_COMPRESSION_MASK 0xffu
+/* Decryption threads requested at build time, 0 = one per CPU */
+#define ENTRY_THREADS(e) ((int)(((e)->flags >> 8) & 0xffu))
+#define ENTRY_CHUNKED %(entry_chunked)du
+
+struct payload_entry {
+    char name[32];
+    uint32_t cipher;
+    uint32_t flags;
+    uint64_t offset;
+    uint64_t size;          /* ciphertext bytes in the file */
+    uint64_t packed_size;   /* decrypted bytes (compressed stream, if any) */
+    uint64_t plain_size;    /* bytes of the final ELF image */
+    unsigned char key[64];
+} __attribute__((packed));
+
+struct payload_trailer {
+    uint64_t index_offset;
+    uint32_t entry_count;
+    uint32_t version;
+    char magic[8];
+} __attribute__((packed));
+
+static int read_full(int fd, void *buf, size_t len, off_t off) {
+    unsigned char *p = buf;
+    while (len > 0) {
+        ssize_t r = pread(fd, p, len, off);
+        if (r < 0) {
+            if (errno == EINTR) continue;
+            return -1;
+        }
+        if (r == 0) return -1;
+        p += r;
+        off += r;
+        len -= (size_t)r;
+    }
+    return 0;
+}
+
+static void decrypt_entry(unsigned char *data, const struct payload_entry *e) {
+    decrypt_payload(data, e->size, (unsigned char *)e->key, ENTRY_THREADS(e));
+}
+
+#if !LOADER_COMPRESSED
+struct payload_chunk {
+    uint64_t size;          /* ciphertext bytes */
+    uint64_t plain_size;
+    unsigned char key[64];
+} __attribute__((packed));
+
+/* Chunks of a thread's share are small, so each is decrypted on one thread */
+#define CHUNK_MIN_BYTES_PER_THREAD (1u << 20)
+
+struct chunk_job {
+    unsigned char *data;
+    struct payload_chunk *chunks;
+    uint64_t *offsets;
+};
+
+static void chunk_range(void *ctx, int index, size_t begin, size_t end) {
+    struct chunk_job *job = ctx;
+    (void)index;
+    for (size_t i = begin; i < end; i++) {
+        decrypt_payload(job->data + job->offsets[i], job->chunks[i].size, job->chunks[i].key, 1);
+    }
+}
+
+/* Decrypt a chunked entry (incremental builds) in place: every chunk under
+   its own key from the chunk table, chunks spread across threads, then
+   packed together where the cipher padded them. */
+static int decrypt_chunks(int fd, unsigned char *data, const struct payload_entry *e) {
+    uint64_t table_offset, count;
+    memcpy(&table_offset, e->key, 8);
+    memcpy(&count, e->key + 8, 8);
+    if (count == 0 || count > e->size) return -1;
+    struct payload_chunk *chunks = malloc(count * sizeof(*chunks));
+    uint64_t *offsets = malloc(count * sizeof(*offsets));
+    if (!chunks || !offsets || read_full(fd, chunks, count * sizeof(*chunks), table_offset) != 0) {
+        return -1;
+    }
+    uint64_t size = 0, plain_size = 0;
+    for (uint64_t i = 0; i < count; i++) {
+        if (chunks[i].plain_size > chunks[i].size) return -1;
+        offsets[i] = size;
+        size += chunks[i].size;
+        plain_size += chunks[i].plain_size;
+    }
+    if (size != e->size || plain_size != e->plain_size) return -1;
+
+    struct chunk_job job = { data, chunks, offsets };
+    parallel_for(count, loader_threads(ENTRY_THREADS(e), e->size, CHUNK_MIN_BYTES_PER_THREAD),
+                 chunk_range, &job);
+    uint64_t packed = 0;
+    for (uint64_t i = 0; i < count; i++) {
+        if (offsets[i] != packed) memmove(data + packed, data + offsets[i], chunks[i].plain_size);
+        packed += chunks[i].plain_size;
+    }
+    free(offsets);
+    free(chunks);
+    return 0;
+}
+#endif
+
+static const char *base_name(const char *path) {
+    const char *base = path;
+    for (; *path; path++) {
+        if (*path == '/') base = path + 1;
+    }
+    return base;
+}
+
+/* Entry names are NUL-padded and at most sizeof(name) - 1 bytes */
+static int entry_is(const struct payload_entry *e, const char *name) {
+    size_t n = strlen(name);
+    return n < sizeof(e->name) && memcmp(e->name, name, n) == 0 && e->name[n] == '\\0';
+}
+
+/* Bundles hold several programs (busybox-style): run the one named by
+   argv[0], as when the bundle is started through a symlink, or else the one
+   named by argv[1], which is then dropped from argv. Returns the entry's
+   position in the index, or -1. */
+static int select_entry(const struct payload_entry *index, uint32_t count,
+                        int *argc, char ***argv) {
+    if (count == 1) return 0;
+    const char *self = base_name((*argv)[0] ? (*argv)[0] : "");
+    for (uint32_t i = 0; i < count; i++) {
+        if (entry_is(&index[i], self)) return (int)i;
+    }
+    if (*argc > 1) {
+        for (uint32_t i = 0; i < count; i++) {
+            if (entry_is(&index[i], (*argv)[1])) {
+                (*argc)--;
+                (*argv)++;
+                return (int)i;
+            }
+        }
+    }
+    return -1;
+}
+
+static void bundle_usage(const struct payload_entry *index, uint32_t count) {
+    fprintf(stderr, "usage: <bundle> <program> [args...], or run it through a symlink "
+                    "named after the program\\nprograms:\\n");
+    for (uint32_t i = 0; i < count; i++) {
+        size_t n = 0;
+        while (n < sizeof(index[i].name) && index[i].name[n]) n++;
+        write(2, "  ", 2);
+        write(2, index[i].name, n);
+        write(2, "\\n", 1);
+    }
+}
+
+int main(int argc, char **argv) {
+    int fd = open("/proc/self/exe", O_RDONLY | O_CLOEXEC);
+    if (fd < 0) {
+        perror("open");
+        return 2;
+    }
+    struct stat st;
+    if (fstat(fd, &st) == -1 || (size_t)st.st_size < sizeof(struct payload_trailer)) {
+        fprintf(stderr, "loader: missing payload\\n");
+        return 3;
+    }
+
+    struct payload_trailer t;
+    if (read_full(fd, &t, sizeof(t), st.st_size - sizeof(t)) != 0 ||
+        memcmp(t.magic, TRAILER_MAGIC, 8) != 0 ||
+        t.version != STUB_VERSION || t.entry_count == 0) {
+        fprintf(stderr, "loader: corrupt payload trailer\\n");
+        return 3;
+    }
+
+    /* Only the index and the selected program's payload are read */
+    size_t index_size = (size_t)t.entry_count * sizeof(struct payload_entry);
+    struct payload_entry *index = malloc(index_size);
+    if (!index || read_full(fd, index, index_size, t.index_offset) != 0) {
+        fprintf(stderr, "loader: corrupt payload index\\n");
+        return 3;
+    }
+    int selected = select_entry(index, t.entry_count, &argc, &argv);
+    if (selected < 0) {
+        bundle_usage(index, t.entry_count);
+        return 2;
+    }
+    struct payload_entry e = index[selected];
+    free(index);
+    if (e.cipher != %(cipher_id)d || (e.flags & ENTRY_COMPRESSION_MASK) != %(compression_id)d) {
+        fprintf(stderr, "loader: corrupt payload index\\n");
+        return 3;
+    }
+
+#if LOADER_COMPRESSED
+    /* Decrypt in a scratch buffer, then inflate straight into the image */
+    unsigned char *packed = malloc(e.size ? e.size : 1);
+    if (!packed) {
+        perror("malloc");
+        return 3;
+    }
+    if (read_full(fd, packed, e.size, e.offset) != 0) {
+        fprintf(stderr, "loader: truncated payload\\n");
+        return 3;
+    }
+    close(fd);
+    decrypt_entry(packed, &e);
+
+    int memfd;
+    unsigned char *data = image_alloc(e.plain_size, &memfd);
+    if (!data) {
+        perror("malloc");
+        return 3;
+    }
+    if (decompress_image(packed, e.packed_size, data, e.plain_size) != 0) {
+        fprintf(stderr, "loader: corrupt compressed payload\\n");
+        return 3;
+    }
+    free(packed);
+#else
+
+    size_t cap = e.size > e.plain_size ? e.size : e.plain_size;
+    int memfd;
+    unsigned char *data = image_alloc(cap, &memfd);
+    if (!data) {
+        perror("malloc");
+        return 3;
+    }
+    if (read_full(fd, data, e.size, e.offset) != 0) {
+        fprintf(stderr, "loader: truncated payload\\n");
+        return 3;
+    }
+    if (e.flags & ENTRY_CHUNKED) {
+        if (decrypt_chunks(fd, data, &e) != 0) {
+            fprintf(stderr, "loader: corrupt chunk table\\n");
+            return 3;
+        }
+    } else {
+        decrypt_entry(data, &e);
+    }
+    close(fd);
+#endif
+
+    int mapped = memfd >= 0;
+    int rc = run_image(data, e.plain_size, memfd, argv);
+    if (!mapped) free(data);
+    return rc;
+}
+"""
+
+# Both loader builds decrypt through this wrapper around the cipher's
+# DECRYPT_CALL (see encryptor.py); `key` points at the 64-byte key field
+# filled by pack_key().
+def decrypt_payload_func(cipher: str) -> str:
+    return ("static void decrypt_payload(unsigned char *data, size_t len, unsigned char *key, "
+            f"int threads) {{\n    {cipher_module(cipher).DECRYPT_CALL}\n}}\n")
+
+
+def pack_key(cipher: str, key: tuple) -> bytes:
+    """Serialize the key tuple returned by encrypt_* into the entry key field."""
+    raw = cipher_module(cipher).pack_key(key)
+    if len(raw) > 64:
+        raise ValueError(f"{cipher} key does not fit the 64-byte entry key field")
+    return raw.ljust(64, b"\x00")
+
+
+def check_profile(profile: str, compression: str = 'none') -> None:
+    if profile not in LOADER_PROFILES:
+        raise ValueError(f"Unknown loader profile: {profile}")
+    if profile == 'nolibc':
+        check_nolibc(compression)
+
+
+def loader_prelude(exec_mode: str = 'memfd', profile: str = 'glibc') -> str:
+    """Headers and build switches shared by every generated loader."""
+    if exec_mode not in EXEC_MODES:
+        raise ValueError(f"Unknown exec mode: {exec_mode}")
+    check_profile(profile)
+    headers = nolibc_runtime if profile == 'nolibc' else loader_headers
+    return f"{headers}\n#define LOADER_EXEC_MEMFD {int(exec_mode == 'memfd')}\n"
+
+
+def stub_source(cipher: str, exec_mode: str = 'memfd', compression: str = 'none',
+                profile: str = 'glibc') -> str:
+    return "\n".join([
+        loader_prelude(exec_mode, profile),
+        decompress_funcs[compression],
+        parallel_func,
+        decryptor_source(cipher),
+        decrypt_payload_func(cipher),
+        exec_func,
+        stub_main_func % {
+            'version': STUB_VERSION,
+            'cipher_id': cipher_id(cipher),
+            'compression_id': COMPRESSION_IDS[compression],
+            'entry_chunked': ENTRY_CHUNKED,
+        },
+    ])
+
+
+def stub_flags(compression: str = 'none', profile: str = 'glibc') -> List[str]:
+    """gcc flags for a loader; also used by the source-embedding build."""
+    check_profile(profile, compression)
+    if profile == 'nolibc':
+        return list(NOLIBC_FLAGS)
+    return STUB_FLAGS + COMPRESSION_LINK_FLAGS[compression]
+
+
+def stub_digest(cipher: str, exec_mode: str = 'memfd', compiler: str = "gcc",
+                flags: Optional[List[str]] = None, compression: str = 'none',
+                profile: str = 'glibc') -> str:
+    """Cache key of a stub: hash of its full source and build flags."""
+    return f"{cipher}-" + cache_key(stub_source(cipher, exec_mode, compression, profile),
+                                    compiler,
+                                    *(flags or stub_flags(compression, profile)))[:16]
+
+
+def get_stub(cipher: str, compile_fn: Callable, cache: ObfuscationCache,
+             exec_mode: str = 'memfd', compiler: str = "gcc",
+             flags: Optional[List[str]] = None,
+             compression: str = 'none', profile: str = 'glibc') -> Tuple[str, bool]:
+    """Return (path, cached) for the compiled stub of `cipher`, building it once.
+
+    `compile_fn` has the signature of obfuscator.compile_c_string. Stubs are
+    keyed by a hash of their source and build flags, so editing the
+    decryptors or bumping STUB_VERSION never picks up a stale binary.
+    """
+    flags = flags or stub_flags(compression, profile)
+    key = stub_digest(cipher, exec_mode, compiler, flags, compression, profile)
+    path = cache.get("stubs", key, ".elf")
+    if path:
+        return path, True
+
+    build_dir = os.path.join(cache.root, "stubs")
+    os.makedirs(build_dir, exist_ok=True)
+    tmp_path = os.path.join(build_dir, f"{key}.{os.getpid()}.build.tmp")
+    success, _, stderr, _ = compile_fn(stub_source(cipher, exec_mode, compression, profile),
+                                       tmp_path, compiler, flags)
+    if not success:
+        raise RuntimeError(f"Failed to build {cipher} loader stub:\n{stderr}")
+    return cache.put("stubs", key, tmp_path, ".elf", move=True), False
+
+
+def write_stub_binary(stub, output_path: str, entries: List[dict]) -> int:
+    """Copy the stub to output_path and append payloads, index and trailer.
+
+    `stub` is the stub's path or a binary file object open on it.
+
+    Each entry is a dict with name, cipher, payload, plain_size and key,
+    plus optional compression, packed_size (the compressed length, read
+    once the payload has been written) and threads (loader decryption
+    threads, 0 for one per CPU). `payload` is either bytes or an
+    iterable of byte chunks, which is written as it is produced; the offset
+    and number of payload bytes written are stored back into entry['offset']
+    and entry['size']. An entry
+    whose payload fills entry['chunks'] with packed CHUNK_FORMAT records
+    (incremental builds) gets its chunk table written after the payload
+    instead of a key. Returns the size of the written file.
+    """
+    if isinstance(stub, str):
+        shutil.copyfile(stub, output_path)
+    else:
+        with open(output_path, "wb") as out:
+            shutil.copyfileobj(stub, out)
+    with open(output_path, "r+b") as out:
+        out.seek(0, os.SEEK_END)
+        index = []
+        for entry in entries:
+            offset = out.tell()
+            payload = entry['payload']
+            if isinstance(payload, (bytes, bytearray, memoryview)):
+                payload = [payload]
+            for chunk in payload:
+                out.write(chunk)
+            entry['offset'] = offset
+            entry['size'] = out.tell() - offset
+            flags = COMPRESSION_IDS[entry.get('compression', 'none')] | (entry.get('threads', 0) << 8)
+            chunks = entry.get('chunks')
+            if chunks is not None:
+                flags |= ENTRY_CHUNKED
+                key_field = struct.pack(CHUNK_TABLE_FORMAT, out.tell(), len(chunks)).ljust(64, b"\x00")
+                out.write(b"".join(chunks))
+            else:
+                key_field = pack_key(entry['cipher'], entry['key'])
+            index.append(struct.pack(
+                ENTRY_FORMAT,
+                entry['name'].encode()[:31],
+                cipher_id(entry['cipher']),
+                flags,
+                offset,
+                entry['size'],
+                entry.get('packed_size', entry['plain_size']),
+                entry['plain_size'],
+                key_field,
+            ))
+        index_offset = out.tell()
+        out.write(b"".join(index))
+        out.write(struct.pack(TRAILER_FORMAT, index_offset, len(entries),
+                              STUB_VERSION, TRAILER_MAGIC))
+        size = out.tell()
+    os.chmod(output_path, 0o755)
+    return size
@@ -0,0 +1,137 @@
+import os
+import resource
+import tempfile
+from typing import Optional
+
+# Prometheus metrics for a long-lived obfuscator worker.
+#
+# The worker folds each job's per-stage measurements (progress.py) into
+# cumulative counters and a duration histogram, and rewrites them in the
+# Prometheus text exposition format after every job. The file goes to
+# $SIMPFUSCATOR_METRICS_DIR/worker-<pid>.prom, so it can be scraped by
+# node_exporter's textfile collector or merged by server.js at /api/metrics.
+# When given the build workspace (workspace.py), its space use and cleanup
+# counters are exported as well.
+
+METRICS_DIR_ENV = "SIMPFUSCATOR_METRICS_DIR"
+
+# Upper bounds in seconds of the stage duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class WorkerMetrics:
+    """Cumulative job and stage metrics for one worker process."""
+
+    def __init__(self, worker: Optional[str] = None, workspace=None):
+        self.worker = worker or str(os.getpid())
+        self.workspace = workspace
+        self.jobs = {}
+        self.stages = {}
+
+    def observe(self, status: str, stages: Optional[dict] = None):
+        """Record one finished job and its stage measurements."""
+        self.jobs[status] = self.jobs.get(status, 0) + 1
+        for name, stats in (stages or {}).items():
+            total = self.stages.setdefault(name, {
+                "seconds": 0.0, "cpu_seconds": 0.0, "child_cpu_seconds": 0.0,
+                "bytes": 0, "runs": 0, "buckets": [0] * len(DURATION_BUCKETS),
+            })
+            seconds = stats["wall_ms"] / 1000
+            total["seconds"] += seconds
+            total["cpu_seconds"] += stats["cpu_ms"] / 1000
+            total["child_cpu_seconds"] += stats["child_cpu_ms"] / 1000
+            total["bytes"] += stats["bytes"]
+            total["runs"] += 1
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    total["buckets"][i] += 1
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        w = self.worker
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("simpfuscator_jobs_total", "counter", "Obfuscation jobs handled, by outcome.")
+        for status, count in sorted(self.jobs.items()):
+            lines.append(f"simpfuscator_jobs_total{_labels(worker=w, status=status)} {count}")
+
+        family("simpfuscator_stage_duration_seconds", "histogram",
+               "Wall time of pipeline stages.")
+        for name, total in sorted(self.stages.items()):
+            for bound, count in zip(DURATION_BUCKETS, total["buckets"]):
+                lines.append("simpfuscator_stage_duration_seconds_bucket"
+                             f"{_labels(worker=w, stage=name, le=bound)} {count}")
+            lines.append("simpfuscator_stage_duration_seconds_bucket"
+                         f"{_labels(worker=w, stage=name, le='+Inf')} {total['runs']}")
+            lines.append("simpfuscator_stage_duration_seconds_sum"
+                         f"{_labels(worker=w, stage=name)} {total['seconds']:.6f}")
+            lines.append("simpfuscator_stage_duration_seconds_count"
+                         f"{_labels(worker=w, stage=name)} {total['runs']}")
+
+        for metric, key, help_text in (
+            ("simpfuscator_stage_cpu_seconds_total", "cpu_seconds",
+             "CPU time spent by the worker in pipeline stages."),
+            ("simpfuscator_stage_child_cpu_seconds_total", "child_cpu_seconds",
+             "CPU time of child processes (gcc) in pipeline stages."),
+            ("simpfuscator_stage_bytes_total", "bytes",
+             "Bytes processed by pipeline stages."),
+        ):
+            family(metric, "counter", help_text)
+            for name, total in sorted(self.stages.items()):
+                value = total[key]
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                lines.append(f"{metric}{_labels(worker=w, stage=name)} {value}")
+
+        family("simpfuscator_worker_peak_rss_bytes", "gauge",
+               "Peak resident set size of the worker process.")
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        lines.append(f"simpfuscator_worker_peak_rss_bytes{_labels(worker=w)} {peak}")
+
+        if self.workspace is not None:
+            stats = self.workspace.stats()
+            for metric, kind, value, help_text in (
+                ("simpfuscator_workspace_used_bytes", "gauge", stats["bytes"],
+                 "Bytes currently in the build workspace (all workers)."),
+                ("simpfuscator_workspace_quota_bytes", "gauge", stats["max_bytes"],
+                 "Soft quota of the build workspace."),
+                ("simpfuscator_workspace_tmpfs", "gauge", int(stats["tmpfs"]),
+                 "1 if the build workspace is on tmpfs."),
+                ("simpfuscator_workspace_builds_total", "counter", stats["builds"],
+                 "Compiler runs in the build workspace."),
+                ("simpfuscator_workspace_peak_build_bytes", "gauge", stats["peak_build_bytes"],
+                 "Largest space used by a single build."),
+                ("simpfuscator_workspace_quota_rejections_total", "counter",
+                 stats["quota_rejections"], "Builds refused because of the workspace quota."),
+            ):
+                family(metric, kind, help_text)
+                lines.append(f"{metric}{_labels(worker=w)} {value}")
+            family("simpfuscator_workspace_reclaimed_bytes_total", "counter",
+                   "Bytes removed from the build workspace, after builds or from dead workers.")
+            for source, key in (("build", "reclaimed_bytes"), ("stale", "stale_bytes_reclaimed")):
+                lines.append("simpfuscator_workspace_reclaimed_bytes_total"
+                             f"{_labels(worker=w, source=source)} {stats[key]}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: str) -> str:
+        """Atomically replace worker-<id>.prom in `directory`; returns its path."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"worker-{self.worker}.prom")
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".worker-", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+        return path
@@ -0,0 +1,398 @@
+import platform
+
+# Freestanding runtime for the libc-free loader profile.
+#
+# The default loaders are dynamically linked against glibc, so every
+# protected binary pays for ld.so (mapping libc, relocations, symbol
+# binding, libc init) before it starts decrypting, on top of the start-up of
+# the program it finally execs. The nolibc profile links the same loader
+# source statically against this runtime instead: a `_start` that calls
+# main directly, and raw-syscall versions of exactly the libc subset the
+# loader, exec and thread code use (see loader.py). The shared C code is
+# compiled unchanged; only the prelude and the build flags differ.
+#
+# Limitations, by design: x86_64 Linux only; fprintf prints its format
+# string verbatim (the loader only reports fixed messages); perror prints
+# the errno number rather than its text; no compression stage, since zlib
+# and liblzma need a real libc.
+
+NOLIBC_ARCHES = ("x86_64",)
+
+# -ffreestanding keeps gcc from assuming hosted libc headers and functions;
+# gcc still emits calls to memcpy/memset/memmove/memcmp for struct copies
+# and large builtins, so the runtime defines those as real symbols, and the
+# loop-pattern pass is disabled so their bodies are not turned back into
+# calls to themselves. libgcc provides __cpu_model for
+# __builtin_cpu_supports and the 128-bit division used by parallel_range.
+# There is no dynamic linker to apply RELRO or to need page-separated code,
+# so the image is packed into as few pages as possible.
+NOLIBC_FLAGS = [
+    '-O3', '-s', '-static', '-nostdlib', '-ffreestanding', '-fno-pie', '-no-pie',
+    '-fno-stack-protector', '-fno-asynchronous-unwind-tables',
+    '-fno-tree-loop-distribute-patterns', '-ffunction-sections', '-fdata-sections',
+    '-Wl,--gc-sections', '-Wl,--build-id=none', '-Wl,-z,noseparate-code', '-Wl,-z,norelro',
+    '-lgcc',
+]
+
+nolibc_runtime = """#define _GNU_SOURCE
+#if !defined(__x86_64__) || !defined(__linux__)
+#error "the nolibc loader profile supports x86_64 Linux only"
+#endif
+#include <stdarg.h>
+#include <stddef.h>
+#include <stdint.h>
+#include <asm/unistd.h>
+#include <asm/stat.h>
+#include <linux/mman.h>
+#include <linux/fcntl.h>
+#include <linux/futex.h>
+#include <linux/sched.h>
+
+#define LOADER_NOLIBC 1
+
+/* The SIMD intrinsics headers pull in <stdlib.h> for _mm_malloc, which the
+   loader never uses; claim its include guard so no libc header is read */
+#define _MM_MALLOC_H_INCLUDED
+
+/* Which helpers a loader uses depends on its cipher and exec mode */
+#define NOLIBC_FN static __attribute__((unused))
+
+typedef long ssize_t;
+typedef long off_t;
+typedef int pid_t;
+
+char **environ;
+static int errno;
+
+#define EINTR 4
+#define EEXIST 17
+#define SIGCHLD 17
+#define S_IRWXU 0700
+#define MAP_FAILED ((void *)-1)
+#define SYS_memfd_create __NR_memfd_create
+
+/* ---- system calls ---- */
+
+static inline long nolibc_syscall6(long n, long a, long b, long c, long d, long e, long f) {
+    register long r10 __asm__("r10") = d;
+    register long r8 __asm__("r8") = e;
+    register long r9 __asm__("r9") = f;
+    long ret;
+    __asm__ volatile ("syscall"
+                      : "=a"(ret)
+                      : "a"(n), "D"(a), "S"(b), "d"(c), "r"(r10), "r"(r8), "r"(r9)
+                      : "rcx", "r11", "memory");
+    return ret;
+}
+
+#define nolibc_syscall(n, a, b, c) nolibc_syscall6((n), (long)(a), (long)(b), (long)(c), 0, 0, 0)
+
+/* Kernel results in [-4095, -1] are -errno; libc returns -1 and sets errno */
+static long nolibc_ret(long ret) {
+    if ((unsigned long)ret > -4096UL) {
+        errno = (int)-ret;
+        return -1;
+    }
+    return ret;
+}
+
+NOLIBC_FN long syscall(long n, ...) {
+    va_list ap;
+    long a[6];
+    va_start(ap, n);
+    for (int i = 0; i < 6; i++) a[i] = va_arg(ap, long);
+    va_end(ap);
+    return nolibc_ret(nolibc_syscall6(n, a[0], a[1], a[2], a[3], a[4], a[5]));
+}
+
+NOLIBC_FN __attribute__((noreturn)) void _exit(int status) {
+    for (;;) nolibc_syscall(__NR_exit_group, status, 0, 0);
+}
+
+NOLIBC_FN int open(const char *path, int flags, ...) {
+    return (int)nolibc_ret(nolibc_syscall(__NR_open, path, flags, 0600));
+}
+
+NOLIBC_FN int close(int fd) { return (int)nolibc_ret(nolibc_syscall(__NR_close, fd, 0, 0)); }
+
+NOLIBC_FN ssize_t write(int fd, const void *buf, size_t len) {
+    return nolibc_ret(nolibc_syscall(__NR_write, fd, buf, len));
+}
+
+NOLIBC_FN ssize_t pread(int fd, void *buf, size_t len, off_t off) {
+    return nolibc_ret(nolibc_syscall6(__NR_pread64, fd, (long)buf, (long)len, off, 0, 0));
+}
+
+NOLIBC_FN int fstat(int fd, struct stat *st) {
+    return (int)nolibc_ret(nolibc_syscall(__NR_fstat, fd, st, 0));
+}
+
+NOLIBC_FN int ftruncate(int fd, off_t len) {
+    return (int)nolibc_ret(nolibc_syscall(__NR_ftruncate, fd, len, 0));
+}
+
+NOLIBC_FN int fsync(int fd) { return (int)nolibc_ret(nolibc_syscall(__NR_fsync, fd, 0, 0)); }
+
+NOLIBC_FN int chmod(const char *path, int mode) {
+    return (int)nolibc_ret(nolibc_syscall(__NR_chmod, path, mode, 0));
+}
+
+NOLIBC_FN int unlink(const char *path) {
+    return (int)nolibc_ret(nolibc_syscall(__NR_unlink, path, 0, 0));
+}
+
+NOLIBC_FN void *mmap(void *addr, size_t len, int prot, int flags, int fd, off_t off) {
+    long ret = nolibc_syscall6(__NR_mmap, (long)addr, (long)len, prot, flags, fd, off);
+    return nolibc_ret(ret) == -1 ? MAP_FAILED : (void *)ret;
+}
+
+NOLIBC_FN int munmap(void *addr, size_t len) {
+    return (int)nolibc_ret(nolibc_syscall(__NR_munmap, addr, len, 0));
+}
+
+NOLIBC_FN pid_t fork(void) {
+    return (pid_t)nolibc_ret(nolibc_syscall6(__NR_clone, SIGCHLD, 0, 0, 0, 0, 0));
+}
+
+NOLIBC_FN pid_t waitpid(pid_t pid, int *status, int options) {
+    return (pid_t)nolibc_ret(nolibc_syscall6(__NR_wait4, pid, (long)status, options, 0, 0, 0));
+}
+
+NOLIBC_FN int execv(const char *path, char **argv) {
+    return (int)nolibc_ret(nolibc_syscall(__NR_execve, path, argv, environ));
+}
+
+NOLIBC_FN int fexecve(int fd, char **argv, char **envp) {
+    return (int)nolibc_ret(nolibc_syscall6(__NR_execveat, fd, (long)"", (long)argv, (long)envp,
+                                           AT_EMPTY_PATH, 0));
+}
+
+/* ---- memory and strings ---- */
+
+void *memcpy(void *dst, const void *src, size_t n) {
+    unsigned char *d = dst;
+    const unsigned char *s = src;
+    while (n--) *d++ = *s++;
+    return dst;
+}
+
+void *memmove(void *dst, const void *src, size_t n) {
+    unsigned char *d = dst;
+    const unsigned char *s = src;
+    if (d < s) {
+        while (n--) *d++ = *s++;
+    } else {
+        while (n--) d[n] = s[n];
+    }
+    return dst;
+}
+
+void *memset(void *dst, int c, size_t n) {
+    unsigned char *d = dst;
+    while (n--) *d++ = (unsigned char)c;
+    return dst;
+}
+
+int memcmp(const void *a, const void *b, size_t n) {
+    const unsigned char *x = a, *y = b;
+    for (; n; n--, x++, y++) {
+        if (*x != *y) return *x - *y;
+    }
+    return 0;
+}
+
+#define memcpy __builtin_memcpy
+#define memset __builtin_memset
+#define memcmp __builtin_memcmp
+
+NOLIBC_FN size_t strlen(const char *s) {
+    size_t n = 0;
+    while (s[n]) n++;
+    return n;
+}
+
+/* Every allocation is its own anonymous mapping, with its length stored in
+   a 16-byte header; the loader makes a handful of large allocations */
+NOLIBC_FN void *malloc(size_t n) {
+    size_t len = n + 16;
+    unsigned char *p = mmap(NULL, len, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+    if (p == MAP_FAILED) return NULL;
+    *(size_t *)p = len;
+    return p + 16;
+}
+
+/* Fresh anonymous mappings are already zeroed */
+NOLIBC_FN void *calloc(size_t count, size_t size) {
+    if (size && count > (size_t)-1 / size) return NULL;
+    return malloc(count * size);
+}
+
+NOLIBC_FN void free(void *ptr) {
+    if (!ptr) return;
+    unsigned char *p = (unsigned char *)ptr - 16;
+    munmap(p, *(size_t *)p);
+}
+
+/* ---- diagnostics ---- */
+
+typedef struct nolibc_file FILE;
+#define stderr ((FILE *)2)
+
+/* Prints `fmt` itself: the loader only reports fixed messages */
+NOLIBC_FN int fprintf(FILE *stream, const char *fmt, ...) {
+    return (int)write((int)(long)stream, fmt, strlen(fmt));
+}
+
+NOLIBC_FN void perror(const char *what) {
+    char buf[16];
+    int i = sizeof(buf);
+    unsigned int value = (unsigned int)errno;
+    buf[--i] = '\\n';
+    do {
+        buf[--i] = (char)('0' + value % 10);
+        value /= 10;
+    } while (value && i > 0);
+    write(2, what, strlen(what));
+    write(2, ": errno ", 8);
+    write(2, buf + i, sizeof(buf) - i);
+}
+
+NOLIBC_FN int mkstemp(char *tmpl) {
+    static const char chars[] = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789";
+    char *suffix = tmpl + strlen(tmpl) - 6;
+    for (int attempt = 0; attempt < 100; attempt++) {
+        unsigned char rnd[6];
+        if (nolibc_syscall(__NR_getrandom, rnd, sizeof(rnd), 0) != sizeof(rnd)) return -1;
+        for (int i = 0; i < 6; i++) suffix[i] = chars[rnd[i] % (sizeof(chars) - 1)];
+        int fd = open(tmpl, O_RDWR | O_CREAT | O_EXCL | O_CLOEXEC);
+        if (fd >= 0 || errno != EEXIST) return fd;
+    }
+    return -1;
+}
+
+/* ---- CPUs and threads ---- */
+
+#define _SC_NPROCESSORS_ONLN 84
+
+typedef struct { unsigned long bits[16]; } cpu_set_t;
+
+NOLIBC_FN int sched_getaffinity(pid_t pid, size_t size, cpu_set_t *set) {
+    memset(set, 0, size);
+    return nolibc_ret(nolibc_syscall(__NR_sched_getaffinity, pid, size, set)) < 0 ? -1 : 0;
+}
+
+NOLIBC_FN int nolibc_cpu_count(const cpu_set_t *set) {
+    int n = 0;
+    for (size_t i = 0; i < sizeof(set->bits) / sizeof(set->bits[0]); i++) {
+        n += __builtin_popcountl(set->bits[i]);
+    }
+    return n;
+}
+
+#define CPU_COUNT(set) nolibc_cpu_count(set)
+
+NOLIBC_FN long sysconf(int name) {
+    (void)name;
+    return 1;
+}
+
+/* A thread is a raw clone() sharing the address space, running on its own
+   mmap'd stack with the control block at the stack's base. The kernel
+   clears `tid` and wakes its futex once the thread has exited
+   (CLONE_CHILD_CLEARTID), which is all pthread_join needs. */
+#define NOLIBC_STACK_SIZE (256 << 10)
+
+struct nolibc_thread {
+    volatile int tid;
+};
+
+typedef struct nolibc_thread *pthread_t;
+
+/* nolibc_clone(flags, stack, ctid, fn, arg): fn(arg) runs on `stack` in the
+   child, which then exits; the parent gets the child's tid or -errno */
+long nolibc_clone(unsigned long flags, void *stack, volatile int *ctid,
+                  void *(*fn)(void *), void *arg);
+__asm__(
+    ".text\\n"
+    ".type nolibc_clone, @function\\n"
+    "nolibc_clone:\\n"
+    "    and $-16, %rsi\\n"
+    "    sub $16, %rsi\\n"
+    "    mov %rcx, (%rsi)\\n"
+    "    mov %r8, 8(%rsi)\\n"
+    "    mov %rdx, %r10\\n"
+    "    xor %edx, %edx\\n"
+    "    xor %r8d, %r8d\\n"
+    "    mov $56, %eax\\n"          /* __NR_clone */
+    "    syscall\\n"
+    "    test %rax, %rax\\n"
+    "    jnz 1f\\n"
+    "    xor %ebp, %ebp\\n"
+    "    pop %rax\\n"
+    "    pop %rdi\\n"
+    "    call *%rax\\n"
+    "    mov $60, %eax\\n"          /* __NR_exit: this thread only */
+    "    xor %edi, %edi\\n"
+    "    syscall\\n"
+    "    hlt\\n"
+    "1:  ret\\n");
+
+NOLIBC_FN int pthread_create(pthread_t *thread, const void *attr, void *(*fn)(void *), void *arg) {
+    (void)attr;
+    unsigned char *stack = mmap(NULL, NOLIBC_STACK_SIZE, PROT_READ | PROT_WRITE,
+                                MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+    if (stack == MAP_FAILED) return errno;
+    struct nolibc_thread *t = (struct nolibc_thread *)stack;
+    t->tid = 1;
+    long ret = nolibc_clone(CLONE_VM | CLONE_FS | CLONE_FILES | CLONE_SIGHAND | CLONE_THREAD |
+                            CLONE_SYSVSEM | CLONE_CHILD_CLEARTID,
+                            stack + NOLIBC_STACK_SIZE, &t->tid, fn, arg);
+    if (ret < 0) {
+        munmap(stack, NOLIBC_STACK_SIZE);
+        return (int)-ret;
+    }
+    *thread = t;
+    return 0;
+}
+
+NOLIBC_FN int pthread_join(pthread_t thread, void **result) {
+    int tid;
+    while ((tid = thread->tid) != 0) {
+        nolibc_syscall6(__NR_futex, (long)&thread->tid, FUTEX_WAIT, tid, 0, 0, 0);
+    }
+    if (result) *result = NULL;
+    munmap(thread, NOLIBC_STACK_SIZE);
+    return 0;
+}
+
+/* ---- entry point ---- */
+
+int main(int argc, char **argv);
+
+__attribute__((used, noreturn)) static void nolibc_start(long *sp) {
+    int argc = (int)sp[0];
+    char **argv = (char **)(sp + 1);
+    environ = argv + argc + 1;
+    /* No constructors run without libc; this fills __cpu_model */
+    __builtin_cpu_init();
+    _exit(main(argc, argv));
+}
+
+__asm__(
+    ".text\\n"
+    ".global _start\\n"
+    "_start:\\n"
+    "    xor %ebp, %ebp\\n"
+    "    mov %rsp, %rdi\\n"
+    "    and $-16, %rsp\\n"
+    "    call nolibc_start\\n"
+    "    hlt\\n");
+"""
+
+
+def check_nolibc(compression: str = 'none') -> None:
+    """Raise ValueError if the nolibc profile cannot build this loader here."""
+    if platform.machine() not in NOLIBC_ARCHES:
+        raise ValueError(f"The nolibc loader profile supports {', '.join(NOLIBC_ARCHES)} only")
+    if compression != 'none':
+        raise ValueError("The nolibc loader profile has no decompressor; use -z none")
@@ -1,26 +1,34 @@
 import sys
-import lief
 import tempfile
 import subprocess
 import shutil
 import os
-from encryptor import *
+import mmap
+from encryptor import CIPHER_MODULES, cipher_module, decryptor_source, derive_key, describe, encrypt, new_stream
+from loader import STUB_VERSION, EXEC_MODES, LOADER_MAX_THREADS, LOADER_PROFILES, check_profile, get_stub, stub_digest, stub_flags, write_stub_binary, exec_func, loader_prelude, parallel_func, decrypt_payload_func, pack_key
+from cache import get_cache, cache_key, file_digest
+from sections import DEFAULT_SECTIONS, SECTION_KEY_SIZE, encrypt_sections, get_section_decryptor
+from compressor import COMPRESSION_IDS, VERIFY_ENV, CompressionStage, check_compression, compress_bytes, decompress_funcs
+from progress import Progress
+from elfcheck import check_elf
+from workspace import WorkspaceFull, get_workspace
+from incremental import PreviousBuild, chunked_entry, write_manifest
 from typing import List, Tuple, Optional
 
 # Note: This script must run in a Linux environment (native Linux, WSL, or Docker)
 # It generates ELF binaries and requires Linux headers and GCC
 
-# DIET_LIBC_PATH = os.environ.get("DIET_LIBC_PATH")
-# if not DIET_LIBC_PATH:
-#     print("Error: DIET_LIBC_PATH environment variable not set.")
-#     print("Please set it to the root of your dietlibc installation.")
-#     sys.exit(1)
-
 LOADER_DIR = os.path.join(os.path.dirname(__file__), "loader")
 LOADER_BINARY = os.path.join(LOADER_DIR, "loader.elf")
 
 PAGE_SIZE = 0x1000
 
+# Ciphertext file pulled into source-mode loaders with .incbin
+PAYLOAD_FILENAME = "payload.bin"
+
+# Plaintext read per step when streaming the input into a stub build
+STREAM_CHUNK_SIZE = 4 << 20
+
 def compile_c_string(
     c_source: str,
     output_path: Optional[str] = None,
@@ -28,47 +36,82 @@ def compile_c_string(
     flags: Optional[List[str]] = None,
     extra_env: Optional[dict] = None,
     workdir: Optional[str] = None,
+    extra_files: Optional[dict] = None,
 ) -> Tuple[bool, str, str, Optional[str]]:
-    """Returns (success, stdout, stderr, output_path)."""
+    """Returns (success, stdout, stderr, output_path).
+
+    `extra_files` maps file names to bytes written next to the source before
+    compiling, e.g. a payload the source pulls in with `.incbin`. Unless a
+    `workdir` is given, the build runs in this process's scratch directory
+    of the managed workspace (workspace.py), which is emptied afterwards;
+    without an `output_path` the binary is written to a new temporary file
+    that the caller owns.
+    """
     if shutil.which(compiler) is None:
         return False, "", f"Compiler {compiler} not found in PATH", None
 
-    flags = flags or []
-    cleanup_dir = False
-    if workdir is None:
-        tmpdir = tempfile.mkdtemp(prefix="ccompile_")
-        cleanup_dir = True
-    else:
-        tmpdir = workdir
-        os.makedirs(tmpdir, exist_ok=True)
+    if output_path is None:
+        fd, output_path = tempfile.mkstemp(prefix="ccompile_", suffix=".out")
+        os.close(fd)
+    if workdir is not None:
+        os.makedirs(workdir, exist_ok=True)
+        return _compile_in(workdir, c_source, output_path, compiler, flags, extra_env,
+                           extra_files)
 
-    src_path = os.path.join(tmpdir, "gen.c")
+    # gen.c and the extra files, plus about as much again for gcc's objects
+    reserve = 2 * (len(c_source) + sum(len(data) for data in (extra_files or {}).values()))
     try:
-        with open(src_path, "w", encoding="utf-8") as f:
-            f.write(c_source)
+        with get_workspace().build_dir(reserve) as tmpdir:
+            return _compile_in(tmpdir, c_source, output_path, compiler, flags, extra_env,
+                               extra_files)
+    except WorkspaceFull as e:
+        return False, "", str(e), None
 
-        if output_path is None:
-            output_path = os.path.join(tmpdir, "a.out")
 
-        cmd = [compiler, src_path, "-o", output_path] + flags
+def _compile_in(tmpdir, c_source, output_path, compiler, flags, extra_env, extra_files):
+    src_path = os.path.join(tmpdir, "gen.c")
+    with open(src_path, "w", encoding="utf-8") as f:
+        f.write(c_source)
+    for name, data in (extra_files or {}).items():
+        with open(os.path.join(tmpdir, name), "wb") as f:
+            f.write(data)
+
+    cmd = [compiler, src_path, "-o", output_path] + (flags or [])
+
+    env = os.environ.copy()
+    # gcc's intermediate files (the objects holding an .incbin payload) go
+    # to the build directory too, rather than an unmanaged /tmp
+    env["TMPDIR"] = tmpdir
+    if extra_env:
+        env.update(extra_env)
+
+    proc = subprocess.run(cmd, cwd=tmpdir, env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
 
-        env = os.environ.copy()
-        if extra_env:
-            env.update(extra_env)
+    success = proc.returncode == 0
 
-        proc = subprocess.run(cmd, cwd=tmpdir, env=env,
-                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if success and os.path.exists(output_path):
+        os.chmod(output_path, 0o755)
 
-        success = proc.returncode == 0
+    return success, proc.stdout, proc.stderr, (output_path if success else None)
 
-        if success and os.path.exists(output_path):
-            os.chmod(output_path, 0o755)
 
-        return success, proc.stdout, proc.stderr, (output_path if success else None)
+def iter_file_chunks(path: str, chunk_size: int = STREAM_CHUNK_SIZE):
+    """Yield the contents of `path` as bytes chunks read from an mmap.
 
-    finally:
-        if cleanup_dir:
-            pass  
+    Pages are dropped from the mapping once consumed, so resident memory
+    stays at about one chunk however large the file is.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start in range(0, size, chunk_size):
+                chunk = mm[start:start + chunk_size]
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_DONTNEED, start, len(chunk))
+                yield chunk
 
 def bytes_to_c_array(b: bytes, per_line: int = 12) -> str:
     parts = []
@@ -78,23 +121,73 @@ def bytes_to_c_array(b: bytes, per_line: int = 12) -> str:
     inner = ",\n    ".join(parts) if parts else ""
     return "{\n    " + inner + "\n}"
 
-symbols = ['xor', 'rsa', 'aes']
+def incbin_array(name: str, filename: str, align: int = 64) -> str:
+    """C declaration of a writable byte array assembled from `filename`.
+
+    The assembler copies the file into .data verbatim, so the compiler never
+    parses the payload and build time does not depend on its size. The path
+    is resolved relative to the compiler's working directory.
+    """
+    return (
+        f'__asm__(".section .data.{name},\\"aw\\",@progbits\\n"\n'
+        f'        ".balign {align}\\n"\n'
+        f'        ".globl {name}\\n"\n'
+        f'        ".hidden {name}\\n"\n'
+        f'        "{name}:\\n"\n'
+        f'        ".incbin \\"{filename}\\"\\n"\n'
+        f'        ".previous\\n");\n'
+        f'extern unsigned char {name}[] __attribute__((visibility("hidden")));'
+    )
+
+# Cipher names; obfuscate() still accepts their 1-based positions (option numbers)
+symbols = list(CIPHER_MODULES)
 class Obfuscator:
 
-    def __init__(self, filename):
+    def __init__(self, filename, progress=None):
         self.filename = filename
         self.output_filename = os.path.basename(filename) + "_obfuscated"
+        self.progress = progress or Progress()
+        self._binary = None
         try:
-            self.binary = lief.ELF.parse(self.filename)
-            if not self.binary:
-                raise lief.bad_file(f"LIEF could not parse {filename}")
-        except lief.bad_file as e:
+            with self.progress.stage("validate"):
+                self.elf = check_elf(self.filename)
+        except (OSError, ValueError) as e:
             print(f"Error parsing ELF file: {e}")
             sys.exit(1)
-        self.encryptions = [encrypt_xor, encrypt_rsa, encrypt_aes]
-
-    def obfuscate(self, option, output_path=None):
+        self.cache = get_cache()
+
+    @property
+    def binary(self):
+        """The LIEF parse of the input, done on first use.
+
+        Only sections mode rewrites the binary; stub and source builds never
+        import lief.
+        """
+        if self._binary is None:
+            import lief
+
+            with self.progress.stage("parse") as report:
+                self._binary = lief.ELF.parse(self.filename)
+                report["bytes_done"] = self.elf.size
+            if self._binary is None:
+                raise ValueError(f"LIEF could not parse {self.filename}")
+        return self._binary
+
+    def obfuscate(self, cipher, output_path=None, *, mode='stub', exec_mode='memfd',
+                  key_seed=None, use_cache=True, compression='none', level=None,
+                  sections=None, lazy=False, threads=0, loader_profile='glibc', on_progress=None,
+                  manifest=None):
+        """Build the protected binary; `on_progress` receives progress event dicts.
+
+        `cipher` is a name from encryptor.CIPHER_MODULES, or its option number.
+        Everything after `output_path` is keyword-only.
+        `loader_profile` picks how the loader is linked (loader.LOADER_PROFILES).
+        `manifest` is the chunk manifest of incremental mode, read to reuse the
+        previous build and rewritten (default: <output>.manifest.json).
+        """
         print(f"[+] Starting obfuscation for '{self.filename}'")
+        progress = self.progress
+        progress.emit = on_progress
         
         # Set default output path if not provided
         if output_path is None:
@@ -102,137 +195,129 @@ class Obfuscator:
                 os.path.dirname(self.filename),
                 self.output_filename
             )
+        # gcc runs inside its scratch directory, so relative paths would land there
+        output_path = os.path.abspath(output_path)
+        if isinstance(cipher, int):
+            cipher = symbols[cipher-1]
+        if cipher not in CIPHER_MODULES:
+            raise ValueError(f"Unknown cipher: {cipher}")
+        key_cipher = cipher
+        level = check_compression(compression, level)
+        if not 0 <= threads <= LOADER_MAX_THREADS:
+            raise ValueError(f"Loader threads must be 0 (auto) to {LOADER_MAX_THREADS}")
+        if mode == 'sections':
+            if cipher != 'xor':
+                raise ValueError("Section mode encrypts in place with a rolling XOR key; use -t xor")
+            # The sections are rewritten in place, so there is no payload to compress
+            compression, level = 'none', 0
+            sections = list(sections or DEFAULT_SECTIONS)
+            key_cipher = 'sections'
+        else:
+            if mode == 'incremental':
+                if key_seed is None:
+                    raise ValueError("Incremental mode derives chunk keys from a persistent "
+                                     "project key; pass a key seed")
+                if cipher == 'rsa':
+                    raise ValueError("Incremental mode needs a key per chunk, and RSA key "
+                                     "generation is too slow for that; use another cipher")
+                if compression != 'none':
+                    raise ValueError("Incremental mode does not compress: compression spreads "
+                                     "a small change over the whole payload")
+            check_profile(loader_profile, compression)
+
+        # A key seed makes the keys (and therefore the whole output) a pure
+        # function of the input, so finished artifacts can be reused
+        key = None
+        output_key = None
+        # Incremental builds key every chunk on its own and reuse the
+        # previous build through their manifest instead
+        if key_seed is not None and mode != 'incremental':
+            input_hash = file_digest(self.filename)
+            key = derive_key(key_cipher, key_seed.encode(), input_hash.encode())
+            if use_cache:
+                # Sections mode has no loader stub; its decryptor is keyed by
+                # the sections module itself
+                decryptor = (stub_digest(cipher, exec_mode, compression=compression,
+                                         profile=loader_profile)
+                             if mode != 'sections' else None)
+                output_key = cache_key(input_hash, key_cipher, mode, exec_mode, STUB_VERSION,
+                                       decryptor, compression, level, sections, lazy, threads,
+                                       cache_key(key_seed))
+                cached = self._reuse_output(output_key, output_path)
+                if cached:
+                    return cached
+        cache_info = {"output": "miss" if output_key else "disabled"}
         
-        raw = open(self.filename, 'rb').read()
-        enc, key = self.encryptions[option-1](raw) 
-
-        # Generate function signature based on encryption type
-        if option == 1:  # XOR
-            func_sign = f'decrypt_xor(elf_bytes, elf_len, {key[0]})'
-        elif option == 2:  # RSA
-            func_sign = f'decrypt_rsa(elf_bytes, elf_len, {key[0]}, {key[1]}, {key[2]})'
-        else:  # AES
-            func_sign = f'decrypt_aes(elf_bytes, elf_len, aes_key, aes_iv)'
-        
-        # For RSA and AES, the decrypted length should be the original length
-        # For XOR, encrypted and decrypted lengths are the same
-        decrypted_len = len(raw) if option in [2, 3] else len(enc)
-        
-        # Generate AES key and IV arrays if AES is selected
-        aes_key_array = ""
-        aes_iv_array = ""
-        if option == 3:
-            aes_key_array = f"static unsigned char aes_key[] = {bytes_to_c_array(key[0])};"
-            aes_iv_array = f"static unsigned char aes_iv[] = {bytes_to_c_array(key[1])};"
-        
-        c_code = f'''#define _POSIX_C_SOURCE 200809L
-#include <stdio.h>
-#include <stdlib.h>
-#include <unistd.h>
-#include <fcntl.h>
-#include <sys/stat.h>
-#include <sys/wait.h>
-#include <string.h>
-#include <errno.h>
-#include <stdint.h>
-#include <stddef.h>
-
-{xor_dec_func}
-{rsa_dec_func}
-{aes_dec_func}
-
-size_t elf_len = {len(enc)};
-size_t decrypted_len = {decrypted_len};
-
-{aes_key_array}
-{aes_iv_array}
-
-static unsigned char elf_bytes[] = {bytes_to_c_array(enc)};
-
-int main() {{
-    {func_sign};
-
-    char tmpl[] = "/tmp/genelfXXXXXX";
-    int fd = mkstemp(tmpl);
-    if (fd < 0) {{
-        perror("mkstemp");
-        return 4;
-    }}
-    size_t written = 0;
-    while (written < decrypted_len) {{
-        ssize_t w = write(fd, elf_bytes + written, decrypted_len - written);
-        if (w < 0) {{
-            if (errno == EINTR) continue;
-            perror("write");
-            close(fd);
-            unlink(tmpl);
-            return 5;
-        }}
-        written += (size_t)w;
-    }}
-
-    /* flush & close */
-    if (fsync(fd) == -1) {{
-        /* not fatal, but warn */
-        perror("fsync");
-    }}
-    if (close(fd) == -1) {{
-        perror("close");
-        unlink(tmpl);
-        return 6;
-    }}
-
-    /* make executable for owner only */
-    if (chmod(tmpl, S_IRWXU) == -1) {{
-        perror("chmod");
-        unlink(tmpl);
-        return 7;
-    }}
-
-    /* fork and exec */
-    pid_t pid = fork();
-    if (pid < 0) {{
-        perror("fork");
-        unlink(tmpl);
-        return 8;
-    }}
-
-    if (pid == 0) {{
-        /* Child: exec the newly created file.
-           Use absolute path in argv[0] to be safe. */
-        char *const argv[] = {{ tmpl, NULL }};
-        execv(tmpl, argv);
-        /* If execv returns, it failed */
-        perror("execv");
-        _exit(127);
-    }} else {{
-        /* Parent: wait for child */
-        int status = 0;
-        if (waitpid(pid, &status, 0) == -1) {{
-            perror("waitpid");
-            /* attempt cleanup */
-            if (unlink(tmpl) == -1) perror("unlink");
-            return 9;
-        }}
-    
-
-        /* remove the file */
-        if (unlink(tmpl) == -1) {{
-            perror("unlink");
-            return 10;
-        }} else {{
-    
-        }}
-    }}
-    return 0;
-}}
-'''
-        success, stdout, stderr, compiled_path = compile_c_string(
-            c_code, 
-            output_path,  # Use the specified output path
-            'gcc', 
-            ['-O3', '-s']
-        )
+        if mode == 'stub':
+            # Stream from an mmap of the input straight into the output
+            # artifact; nothing proportional to the input is held in memory
+            entry, stage = self.stub_entry(cipher, key, compression, level, threads)
+            key, original_size = entry['key'], entry['plain_size']
+            success, stdout, stderr, compiled_path, stub_cached = self._build_stub(
+                cipher, [entry], output_path, exec_mode, compression, loader_profile)
+            encrypted_size = entry.get('size', 0)
+            cache_info["stub"] = "hit" if stub_cached else "miss"
+        elif mode == 'incremental':
+            manifest = manifest or output_path + ".manifest.json"
+            project_key = key_seed.encode()
+            previous = PreviousBuild(manifest, cipher, project_key)
+            entry = chunked_entry(self.filename, cipher, project_key, previous, progress, threads)
+            # The previous artifact may be the file being replaced; it is
+            # read until the new one is complete
+            build_path = f"{output_path}.{os.getpid()}.tmp"
+            try:
+                success, stdout, stderr, compiled_path, stub_cached = self._build_stub(
+                    cipher, [entry], build_path, exec_mode, 'none', loader_profile)
+                if success:
+                    os.replace(build_path, output_path)
+                    compiled_path = output_path
+                    write_manifest(manifest, entry, self.filename, output_path, cipher,
+                                   project_key)
+            finally:
+                previous.close()
+                if os.path.exists(build_path):
+                    os.remove(build_path)
+            if entry['manifest']:
+                # Reported as the key of the first chunk
+                first = bytes.fromhex(entry['manifest'][0]["digest"])
+                key = derive_key(cipher, project_key, b"chunk" + first)
+            original_size, encrypted_size = entry['plain_size'], entry.get('size', 0)
+            stage = None
+            cache_info["stub"] = "hit" if stub_cached else "miss"
+        elif mode == 'sections':
+            # Only the chosen sections are encrypted, inside the original file
+            key = key[0] if key else os.urandom(SECTION_KEY_SIZE)
+            original_size = os.path.getsize(self.filename)
+            with progress.stage("encrypt", sections=sections) as report:
+                success, stdout, stderr, compiled_path, encrypted_sections = self._build_sections(
+                    sections, key, output_path, lazy)
+                report["bytes_done"] = sum(s["size"] for s in encrypted_sections)
+            encrypted_size = os.path.getsize(compiled_path) if success else 0
+            stub_cached, stage = False, None
+        else:
+            with progress.stage("read") as report:
+                raw = open(self.filename, 'rb').read()
+                report["bytes_done"] = len(raw)
+            packed, stage = raw, None
+            if compression != 'none':
+                with progress.stage("compress", method=compression) as report:
+                    packed, stage = compress_bytes(raw, compression, level)
+                    report["bytes_done"] = len(packed)
+            with progress.stage("encrypt", bytes_total=len(packed)) as report:
+                if key is None:
+                    enc, key = encrypt(cipher, packed)
+                else:
+                    stream = new_stream(cipher, key)
+                    enc = stream.update(packed) + stream.finalize()
+                report.update(bytes_done=len(packed), bytes_out=len(enc))
+
+            # Block ciphers pad the ciphertext; the loader runs the original
+            # length of the (decompressed) image
+            success, stdout, stderr, compiled_path = self._build_source(
+                cipher, enc, key, len(raw), output_path, exec_mode,
+                compression, len(packed), threads, loader_profile)
+            stub_cached = False
+            original_size, encrypted_size = len(raw), len(enc)
         
         print("--- Compilation Result ---")
         print(f"Success: {success}")
@@ -250,92 +335,575 @@ int main() {{
             import json
             
             # Calculate size changes
-            size_diff = len(enc) - len(raw)
-            size_ratio = (len(enc) / len(raw)) * 100 if len(raw) > 0 else 0
+            size_diff = encrypted_size - original_size
+            size_ratio = (encrypted_size / original_size) * 100 if original_size > 0 else 0
             
             # Encryption-specific details
-            if option == 1:  # XOR
-                encryption_details = {
-                    "algorithm": "XOR Cipher",
-                    "key_size": "8-bit",
-                    "key_value": f"0x{key[0]:02x}",
-                    "rounds": 1,
-                    "mode": "Stream Cipher",
-                    "block_size": "1 byte"
-                }
-                key_info = f"Key: 0x{key[0]:02x}"
-            elif option == 2:  # RSA
-                block_size = key[2] if len(key) > 2 else 1
-                n_bits = key[1].bit_length()
-                encryption_details = {
-                    "algorithm": "RSA (Block-based)",
-                    "key_size": f"{n_bits}-bit modulus",
-                    "public_exponent": "65537",
-                    "private_exponent": str(key[0])[:50] + "..." if len(str(key[0])) > 50 else str(key[0]),
-                    "modulus": str(key[1])[:50] + "..." if len(str(key[1])) > 50 else str(key[1]),
-                    "block_size": f"{block_size} bytes",
-                    "rounds": 1,
-                    "mode": f"Block encryption ({block_size * 8}-bit blocks)"
-                }
-                key_info = f"d={str(key[0])[:20]}..., n={str(key[1])[:20]}..., block_size={block_size}"
-            else:  # AES
-                encryption_details = {
-                    "algorithm": "AES-128",
-                    "key_size": "128-bit",
-                    "mode": "CBC (Cipher Block Chaining)",
-                    "block_size": "16 bytes",
-                    "rounds": 10,
-                    "key_value": key[0].hex()[:32] + "...",
-                    "iv_value": key[1].hex()[:32] + "...",
-                    "padding": "PKCS7"
-                }
-                key_info = f"Key: {key[0].hex()[:32]}..., IV: {key[1].hex()[:32]}..."
+            encryption_details, key_info = describe(cipher, key)
             
             result = {
                 "success": True,
                 "output_path": compiled_path,
-                "encryption_type": ["XOR", "RSA", "AES"][option-1],
-                "original_size": len(raw),
-                "encrypted_size": len(enc),
+                "encryption_type": cipher_module(cipher).LABEL,
+                "original_size": original_size,
+                "encrypted_size": encrypted_size,
                 "size_difference": size_diff,
                 "size_ratio": f"{size_ratio:.2f}%",
                 "key_info": key_info,
                 "encryption_details": encryption_details,
                 "loader_type": "Self-extracting ELF",
-                "loader_method": "tmpfs + execv",
-                "bytes_encrypted": len(raw),  # Original bytes encrypted
-                "ciphertext_size": len(enc),  # Actual encrypted output size
+                "loader_method": EXEC_MODES[exec_mode],
+                "loader_profile": loader_profile,
+                "build_mode": mode,
+                "stub_cached": stub_cached,
+                "deterministic_key": key_seed is not None,
+                "cache": cache_info,
+                "compression": stage.info() if stage else {"method": "none"},
+                "compressed_size": stage.compressed_size if stage else original_size,
+                "loader_threads": threads or "auto",
+                "stages": progress.stages,
+                "total_ms": progress.total_ms(),
+                "disk_write_bytes": progress.disk_write_bytes(),
+                "bytes_encrypted": original_size,  # Original bytes encrypted
+                "ciphertext_size": encrypted_size,  # Actual encrypted output size
                 "entropy_increased": True,
                 "platform": "Linux ELF (x86_64)",
                 "compiler": "GCC",
                 "optimization": "O3 + strip"
             }
+            if mode == 'sections':
+                encryption_details.update({
+                    "key_size": "64-bit",
+                    "key_value": key.hex(),
+                    "mode": ("In-place section encryption, decrypted per page on first access"
+                             if lazy else "In-place section encryption (rolling key)"),
+                    "block_size": "8 bytes",
+                })
+                result.update({
+                    "key_info": f"Key: {key.hex()}",
+                    "loader_type": "In-place section decryptor",
+                    "loader_profile": None,
+                    "loader_method": ("entry-point decryptor + SIGSEGV page handler" if lazy
+                                      else "entry-point decryptor segment"),
+                    "sections": [{k: v for k, v in s.items() if k != "key"}
+                                 for s in encrypted_sections],
+                    "bytes_encrypted": sum(s["size"] for s in encrypted_sections),
+                    "ciphertext_size": sum(s["size"] for s in encrypted_sections),
+                })
+            if mode == 'incremental':
+                encryption_details["key_derivation"] = "per chunk: HMAC-SHA256(project key, chunk)"
+                result.update({
+                    "key_info": "Per-chunk keys derived from the project key",
+                    "incremental": {
+                        "manifest": manifest,
+                        "chunks": len(entry['manifest']),
+                        "reused_chunks": entry['reused']["chunks"],
+                        "reused_bytes": entry['reused']["bytes"],
+                        "encrypted_bytes": original_size - entry['reused']["bytes"],
+                    },
+                })
+            if output_key:
+                self.cache.put("outputs", output_key, compiled_path)
+                self.cache.put_json("outputs", output_key, result)
+            progress.done(output_size=os.path.getsize(compiled_path))
             print(json.dumps(result))
+            return result
         else:
             print(f"[-] Compilation failed!")
             sys.exit(1)
+
+    def _reuse_output(self, output_key, output_path):
+        """Copy a cached artifact to output_path; returns its result or None."""
+        import json
+
+        cached = self.cache.get("outputs", output_key)
+        result = cached and self.cache.get_json("outputs", output_key)
+        if not result:
+            return None
+        try:
+            shutil.copyfile(cached, output_path)
+        except FileNotFoundError:
+            # Evicted between lookup and copy
+            return None
+        os.chmod(output_path, 0o755)
+        print(f"[+] Reused cached output for '{self.filename}'")
+        self.progress.done(output_size=os.path.getsize(output_path), cache="hit")
+        result = dict(result, output_path=output_path,
+                      cache={"output": "hit", "stub": result.get("cache", {}).get("stub")},
+                      stages=self.progress.stages, total_ms=self.progress.total_ms(),
+                      disk_write_bytes=self.progress.disk_write_bytes())
+        print(json.dumps(result))
+        return result
+
+    def _encrypt_chunks(self, stream, chunks):
+        for chunk in chunks:
+            yield stream.update(chunk)
+        yield stream.finalize()
+
+    def stub_entry(self, cipher, key=None, compression='none', level=None, threads=0, name=None):
+        """Index entry for write_stub_binary whose payload streams this input.
+
+        The input is read from an mmap, compressed if asked and encrypted as
+        the entry is written; nothing proportional to its size is held in
+        memory. `key` is None for a fresh random key. Returns the entry and
+        its CompressionStage (None without compression).
+        """
+        stream = new_stream(cipher, key)
+        plain_size = os.path.getsize(self.filename)
+        chunks = self.progress.track("encrypt", iter_file_chunks(self.filename), plain_size)
+        stage = None
+        if compression != 'none':
+            stage = CompressionStage(compression, level)
+            chunks = stage.process(chunks)
+        payload = self._encrypt_chunks(stream, chunks)
+        entry = {
+            'name': name or os.path.basename(self.filename),
+            'cipher': cipher,
+            'payload': payload,
+            'plain_size': plain_size,
+            'key': stream.key,
+            'compression': compression,
+            'threads': threads,
+        }
+        if stage:
+            def payload_then_size():
+                yield from payload
+                # The compressed length is only known once the stream is drained
+                entry['packed_size'] = stage.compressed_size
+            entry['payload'] = payload_then_size()
+        return entry, stage
+
+    def _build_stub(self, cipher, entries, output_path, exec_mode, compression='none',
+                    loader_profile='glibc'):
+        """Append the entries' payloads to a cached, precompiled decryptor stub.
+
+        The stub is opened before anything is written, so the cache evicting
+        it afterwards (another worker's put) cannot break the copy; if it is
+        evicted between the lookup and the open, it is built again once.
+        """
+        stub = None
+        try:
+            with self.progress.stage("compile", stub=cipher) as report:
+                for attempt in range(2):
+                    stub_path, stub_cached = get_stub(cipher, compile_c_string, self.cache,
+                                                      exec_mode, compression=compression,
+                                                      profile=loader_profile)
+                    try:
+                        stub = open(stub_path, "rb")
+                        break
+                    except FileNotFoundError:
+                        continue
+                report["cached"] = stub_cached
+        except RuntimeError as e:
+            return False, "", str(e), None, False
+        if stub is None:
+            return False, "", f"The {cipher} loader stub was evicted while in use", None, False
+        with stub:
+            write_stub_binary(stub, output_path, entries)
+        return True, "", "", output_path, stub_cached
+
+    def _build_sections(self, names, key, output_path, lazy=False):
+        """Encrypt `names` inside the parsed binary and add the decryptor segment.
+
+        Sections that cannot be encrypted raise ValueError with the reason;
+        only a failed decryptor build is reported as a failed compilation.
+        """
+        try:
+            decryptor = get_section_decryptor(compile_c_string, self.cache, lazy)
+            report = encrypt_sections(self.binary, names, output_path, decryptor, key, lazy)
+        except RuntimeError as e:
+            print(f"[-] {e}")
+            return False, "", str(e), None, []
+        return True, "", "", output_path, report
+
+    def _build_source(self, cipher, enc, key, decrypted_len, output_path, exec_mode,
+                      compression='none', packed_len=0, threads=0, loader_profile='glibc'):
+        """Render the payload into C source and compile a dedicated loader."""
+        self.progress.start("generate")
+        c_code = f'''{loader_prelude(exec_mode, loader_profile)}
+{decompress_funcs[compression]}
+{parallel_func}
+{decryptor_source(cipher)}
+{decrypt_payload_func(cipher)}
+{exec_func}
+
+size_t elf_len = {len(enc)};
+size_t decrypted_len = {decrypted_len};
+size_t packed_len = {packed_len};
+
+static unsigned char payload_key[64] = {bytes_to_c_array(pack_key(cipher, key))};
+
+{incbin_array("elf_bytes", PAYLOAD_FILENAME)}
+
+int main(int argc, char **argv) {{
+    (void)argc;
+    decrypt_payload(elf_bytes, elf_len, payload_key, {threads});
+#if LOADER_COMPRESSED
+    int memfd;
+    unsigned char *image = image_alloc(decrypted_len, &memfd);
+    if (!image || decompress_image(elf_bytes, packed_len, image, decrypted_len) != 0) {{
+        fprintf(stderr, "loader: corrupt compressed payload\\n");
+        return 3;
+    }}
+    return run_image(image, decrypted_len, memfd, argv);
+#else
+    (void)packed_len;
+    return run_image(elf_bytes, decrypted_len, -1, argv);
+#endif
+}}
+'''
+        self.progress.end("generate", bytes_done=len(c_code))
+        with self.progress.stage("compile", compiler="gcc") as report:
+            built = compile_c_string(
+                c_code, 
+                output_path,  # Use the specified output path
+                'gcc', 
+                stub_flags(compression, loader_profile),
+                extra_files={PAYLOAD_FILENAME: enc},
+            )
+            report.update(ok=built[0], bytes_done=len(enc))
+        return built
         
         
 
+def obfuscate_bundle(inputs, cipher, output_path, names=None, exec_mode='memfd', key_seed=None,
+                     compression='none', level=None, threads=0, loader_profile='glibc',
+                     on_progress=None):
+    """Pack several ELFs into one loader, busybox-style.
+
+    The bundle is one stub followed by one encrypted entry per program, each
+    with its own key. At runtime the stub runs the program named by argv[0]
+    (a symlink to the bundle) or by its first argument, and reads and
+    decrypts only that program. `names` defaults to the inputs' base names;
+    they must be unique and at most 31 bytes. The whole set costs at most one
+    gcc run, for the shared stub.
+    """
+    import json
+
+    print(f"[+] Bundling {len(inputs)} programs into '{output_path}'")
+    if isinstance(cipher, int):
+        cipher = symbols[cipher-1]
+    if cipher not in CIPHER_MODULES:
+        raise ValueError(f"Unknown cipher: {cipher}")
+    if not inputs:
+        raise ValueError("A bundle needs at least one program")
+    level = check_compression(compression, level)
+    check_profile(loader_profile, compression)
+    if not 0 <= threads <= LOADER_MAX_THREADS:
+        raise ValueError(f"Loader threads must be 0 (auto) to {LOADER_MAX_THREADS}")
+    names = list(names or [os.path.basename(path) for path in inputs])
+    if len(names) != len(inputs):
+        raise ValueError("Pass one name per bundled program")
+    for name in names:
+        if not name or "/" in name or len(name.encode()) > 31:
+            raise ValueError(f"Invalid program name {name!r}: 1-31 bytes, no '/'")
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate program names in bundle: {', '.join(duplicates)}")
+    output_path = os.path.abspath(output_path)
+
+    progress = Progress(on_progress)
+    obfuscators = [Obfuscator(path, progress) for path in inputs]
+    entries = []
+    for obfuscator, name in zip(obfuscators, names):
+        key = None
+        if key_seed is not None:
+            key = derive_key(cipher, key_seed.encode(), file_digest(obfuscator.filename).encode())
+        entries.append(obfuscator.stub_entry(cipher, key, compression, level, threads, name)[0])
+
+    success, _, stderr, compiled_path, stub_cached = obfuscators[0]._build_stub(
+        cipher, entries, output_path, exec_mode, compression, loader_profile)
+    if not success:
+        print(f"[-] Bundle build failed: {stderr}")
+        sys.exit(1)
+
+    result = {
+        "success": True,
+        "output_path": compiled_path,
+        "encryption_type": cipher_module(cipher).LABEL,
+        "loader_type": "Self-extracting ELF bundle",
+        "loader_method": EXEC_MODES[exec_mode],
+        "loader_profile": loader_profile,
+        "build_mode": "bundle",
+        "stub_cached": stub_cached,
+        "deterministic_key": key_seed is not None,
+        "compression": {"method": compression},
+        "loader_threads": threads or "auto",
+        "programs": [{"name": entry['name'],
+                      "input": obfuscator.filename,
+                      "original_size": entry['plain_size'],
+                      "encrypted_size": entry['size']}
+                     for obfuscator, entry in zip(obfuscators, entries)],
+        "bundle_size": os.path.getsize(compiled_path),
+        "stages": progress.stages,
+        "total_ms": progress.total_ms(),
+        "disk_write_bytes": progress.disk_write_bytes(),
+    }
+    progress.done(output_size=result["bundle_size"])
+    print(f"[+] Bundle created at: {compiled_path}")
+    print(json.dumps(result))
+    return result
+
+
+def run_worker(stdin=None, stdout=None):
+    """Serve obfuscation jobs as JSON lines until stdin closes.
+
+    Keeps the interpreter and the crypto modules (and lief, once a sections
+    job has needed it) warm between jobs so
+    the Node server can dispatch uploads to a pool of long-lived workers.
+    Each request line looks like
+
+        {"id": "42", "input": "/path/in", "type": "xor", "output": "/path/out"}
+
+    and is answered with exactly one line on stdout:
+
+        {"id": "42", "ok": true, "result": {...}}
+        {"id": "42", "ok": false, "error": "...", "log": "..."}
+
+    preceded by any number of progress events for that job (see progress.py):
+
+        {"id": "42", "event": "progress", "stage": "encrypt", "status": "update", ...}
+
+    Everything the obfuscator prints while handling a job goes to stderr, so
+    stdout only ever carries protocol messages. When SIMPFUSCATOR_METRICS_DIR
+    is set, per-stage metrics are written there after every job (metrics.py).
+    """
+    import json
+    import io
+    import contextlib
+    from metrics import METRICS_DIR_ENV, WorkerMetrics
+
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    metrics_dir = os.environ.get(METRICS_DIR_ENV)
+    metrics = WorkerMetrics(workspace=get_workspace())
+
+    def reply(message):
+        stdout.write(json.dumps(message) + "\n")
+        stdout.flush()
+
+    if metrics_dir:
+        metrics.write(metrics_dir)
+    reply({"event": "ready", "pid": os.getpid()})
+
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        job_id = None
+        obfuscator = None
+        status = "failed"
+        log = io.StringIO()
+        try:
+            job = json.loads(line)
+            job_id = job.get("id")
+            with contextlib.redirect_stdout(log):
+                obfuscator = Obfuscator(job["input"])
+                result = obfuscator.obfuscate(
+                    job["type"].lower(), job["output"],
+                    mode=job.get("mode", "stub"),
+                    exec_mode=job.get("exec_mode", "memfd"),
+                    key_seed=job.get("key_seed", os.environ.get("SIMPFUSCATOR_KEY_SEED")),
+                    use_cache=job.get("cache", True),
+                    compression=job.get("compression", "none"),
+                    level=job.get("compression_level"),
+                    sections=job.get("sections"),
+                    lazy=job.get("lazy", False),
+                    threads=job.get("threads", 0),
+                    loader_profile=job.get("loader_profile", "glibc"),
+                    on_progress=lambda event: reply(dict(event, id=job_id)),
+                    manifest=job.get("manifest"))
+            status = "ok"
+            reply({"id": job_id, "ok": True, "result": result})
+        except SystemExit:
+            reply({"id": job_id, "ok": False, "error": "Obfuscation failed",
+                   "log": log.getvalue()})
+        except Exception as e:
+            reply({"id": job_id, "ok": False, "error": f"{type(e).__name__}: {e}",
+                   "log": log.getvalue()})
+        finally:
+            sys.stderr.write(log.getvalue())
+            sys.stderr.flush()
+            metrics.observe(status, obfuscator.progress.stages if obfuscator else None)
+            if metrics_dir:
+                metrics.write(metrics_dir)
+
+
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description='Binary Obfuscator')
-    parser.add_argument('input_file', help='Input binary file to obfuscate')
-    parser.add_argument('-t', '--type', required=True, choices=['xor', 'rsa', 'aes'], 
-                        help='Encryption type (xor, rsa, or aes)')
-    parser.add_argument('-o', '--output', required=True, 
+    parser.add_argument('input_file', nargs='?', help='Input binary file to obfuscate')
+    parser.add_argument('-t', '--type', choices=symbols,
+                        help='Encryption type (%(choices)s); aes-ctr and chacha20 are stream '
+                             'modes without padding that loaders decrypt in parallel')
+    parser.add_argument('-o', '--output', 
                         help='Output path for obfuscated binary')
+    parser.add_argument('-m', '--mode', default='stub',
+                        choices=['stub', 'source', 'sections', 'incremental'],
+                        help='Build mode: append payload to a cached precompiled stub '
+                             '(stub, default), compile a dedicated loader per job (source), '
+                             'encrypt chosen sections in place (sections, xor only), or a stub '
+                             'build encrypted per content-defined chunk so unchanged regions '
+                             'keep their ciphertext (incremental, needs --key-seed)')
+    parser.add_argument('--manifest', default=None,
+                        help='Incremental mode: chunk manifest of the previous build, whose '
+                             'unchanged chunks are copied instead of encrypted; rewritten for '
+                             'this build (default: <output>.manifest.json)')
+    parser.add_argument('--sections', default=','.join(DEFAULT_SECTIONS),
+                        help='Comma-separated sections to encrypt in sections mode '
+                             '(default: %(default)s)')
+    parser.add_argument('--lazy', action='store_true',
+                        help='Sections mode: decrypt each page on first access instead of '
+                             'all at startup')
+    parser.add_argument('--exec', dest='exec_mode', default='memfd', choices=sorted(EXEC_MODES),
+                        help='How the loader starts the program: in-memory memfd + fexecve '
+                             '(default, falls back to tmpfile) or a /tmp file + fork/execv')
     
-    args = parser.parse_args()
+    parser.add_argument('--loader-profile', default='glibc', choices=list(LOADER_PROFILES),
+                        help='How the loader is linked: dynamically against glibc (default) or '
+                             'static and libc-free with raw syscalls (nolibc, x86_64, no -z), '
+                             'which starts faster and needs no shared libraries')
+    parser.add_argument('-z', '--compress', dest='compression', default='none',
+                        choices=list(COMPRESSION_IDS),
+                        help='Compress the ELF before encryption (default: none)')
+    parser.add_argument('--level', type=int, default=None,
+                        help='Compression level 0-9 (default: 6)')
+    parser.add_argument('--verify-compression', action='store_true',
+                        help='Decompress the payload again at build time to check it round-trips '
+                             '(same as SIMPFUSCATOR_VERIFY_COMPRESSION=1)')
+    parser.add_argument('--threads', type=int, default=0,
+                        help='Loader decryption threads; 0 (default) uses one per CPU, '
+                             'capped for small payloads')
+    parser.add_argument('--key-seed', default=os.environ.get('SIMPFUSCATOR_KEY_SEED'),
+                        help='Secret seed for deterministic keys; identical inputs then produce '
+                             'identical outputs, which are served from the cache')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not read or write cached outputs')
+    parser.add_argument('--list-ciphers', action='store_true',
+                        help='Print the available encryption types as JSON and exit')
+    parser.add_argument('--cache-stats', action='store_true',
+                        help='Print cache hit/miss/eviction counters as JSON and exit')
+    parser.add_argument('--workspace-stats', action='store_true',
+                        help='Collect build directories of dead processes, then print build '
+                             'workspace usage as JSON and exit')
+    parser.add_argument('--batch', action='store_true',
+                        help='Treat input_file as a directory, glob or manifest and -o as an '
+                             'output directory; print one JSON line per artifact plus a summary')
+    parser.add_argument('--bundle', action='store_true',
+                        help='Pack every ELF from input_file (a directory, glob or manifest, as '
+                             'with --batch) into one loader at -o that runs the program named by '
+                             'argv[0] (symlink) or by its first argument; manifest lines may set '
+                             '"name"')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Parallel batch jobs (default: number of CPUs)')
+    parser.add_argument('--progress', action='store_true',
+                        help='Write JSON-lines progress events to stderr')
+    parser.add_argument('--worker', action='store_true',
+                        help='Serve JSON-lines jobs on stdin/stdout (used by server.js)')
     
-    # Map encryption type to option number
-    encryption_map = {'xor': 1, 'rsa': 2, 'aes': 3}
-    option = encryption_map[args.type.lower()]
+    args = parser.parse_args()
+
+    if args.level is not None and not 0 <= args.level <= 9:
+        parser.error('--level must be between 0 and 9')
+    if args.verify_compression:
+        # Through the environment, so batch and bundle builds pick it up too
+        os.environ[VERIFY_ENV] = "1"
+    if args.mode == 'sections' and args.type and args.type != 'xor':
+        parser.error('sections mode encrypts in place with XOR; use -t xor')
+    if not 0 <= args.threads <= LOADER_MAX_THREADS:
+        parser.error(f'--threads must be between 0 and {LOADER_MAX_THREADS}')
+    if args.mode == 'incremental':
+        if not args.key_seed:
+            parser.error('-m incremental needs a persistent project key: pass --key-seed or set '
+                         'SIMPFUSCATOR_KEY_SEED')
+        if args.type == 'rsa' or args.compression != 'none':
+            parser.error('-m incremental works with xor, aes, aes-ctr and chacha20, '
+                         'without compression')
+    if args.lazy and args.mode != 'sections':
+        parser.error('--lazy requires -m sections')
+    if args.loader_profile != 'glibc' and args.mode != 'sections':
+        try:
+            check_profile(args.loader_profile, args.compression)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.list_ciphers:
+        import json
+        print(json.dumps(symbols))
+        sys.exit(0)
+    if args.cache_stats:
+        import json
+        print(json.dumps(get_cache().stats()))
+        sys.exit(0)
+    if args.workspace_stats:
+        import json
+        workspace = get_workspace()
+        workspace.gc()
+        print(json.dumps(workspace.stats()))
+        sys.exit(0)
+    if args.worker:
+        run_worker()
+        sys.exit(0)
+    if args.batch:
+        from batch import collect_jobs, run_batch
+        if not (args.input_file and args.output):
+            parser.error('--batch requires an input source and -o/--output directory')
+        defaults = {'type': args.type, 'mode': args.mode, 'exec_mode': args.exec_mode,
+                    'compression': args.compression, 'compression_level': args.level,
+                    'key_seed': args.key_seed, 'cache': not args.no_cache,
+                    'sections': args.sections.split(','), 'lazy': args.lazy,
+                    'threads': args.threads, 'loader_profile': args.loader_profile}
+        try:
+            jobs = collect_jobs(args.input_file, args.output, defaults)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        summary = run_batch(jobs, args.jobs)
+        sys.exit(1 if summary['failed'] else 0)
+    if args.bundle:
+        from batch import collect_jobs
+        if not (args.input_file and args.output):
+            parser.error('--bundle requires an input source and -o/--output')
+        if args.mode != 'stub':
+            parser.error('--bundle builds on the precompiled stub; use -m stub')
+        try:
+            jobs = collect_jobs(args.input_file, os.path.dirname(os.path.abspath(args.output)),
+                                {'type': args.type})
+            if not jobs:
+                raise ValueError(f'No ELF files in {args.input_file}')
+            ciphers = {job['type'].lower() for job in jobs}
+            if len(ciphers) > 1:
+                raise ValueError('All programs in a bundle share one cipher')
+            obfuscate_bundle([job['input'] for job in jobs], ciphers.pop(), args.output,
+                             [job.get('name') or os.path.basename(job['input']) for job in jobs],
+                             args.exec_mode, args.key_seed, args.compression, args.level,
+                             args.threads, args.loader_profile)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        sys.exit(0)
+    if not (args.input_file and args.type and args.output):
+        parser.error('input_file, -t/--type and -o/--output are required')
     
     print(f"[+] Input file: {args.input_file}")
-    print(f"[+] Encryption type: {args.type.upper()} (option {option})")
+    print(f"[+] Encryption type: {args.type.upper()} (option {symbols.index(args.type) + 1})")
     print(f"[+] Output path: {args.output}")
+    print(f"[+] Build mode: {args.mode}")
     
+    on_progress = None
+    if args.progress:
+        import json
+
+        def on_progress(event):
+            sys.stderr.write(json.dumps(event) + "\n")
+            sys.stderr.flush()
+
     obfuscator = Obfuscator(args.input_file)
-    obfuscator.obfuscate(option, args.output)
\ No newline at end of file
+    try:
+        obfuscator.obfuscate(args.type, args.output, mode=args.mode, exec_mode=args.exec_mode,
+                             key_seed=args.key_seed, use_cache=not args.no_cache,
+                             compression=args.compression, level=args.level,
+                             sections=args.sections.split(','), lazy=args.lazy,
+                             threads=args.threads, loader_profile=args.loader_profile,
+                             on_progress=on_progress, manifest=args.manifest)
+    except ValueError as e:
+        print(f"[-] {e}")
+        sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,134 @@
+import time
+import resource
+import contextlib
+from typing import Callable, Iterable, Optional
+
+# Structured progress events for an obfuscation job.
+#
+# The pipeline reports its stages (read, compress, encrypt, compile, done) to
+# a callback as plain dicts, which the worker protocol forwards to server.js
+# as JSON lines:
+#
+#   {"event": "progress", "stage": "encrypt", "status": "start", "bytes_total": 1048576}
+#   {"event": "progress", "stage": "encrypt", "status": "update", "bytes_done": 524288, ...}
+#   {"event": "progress", "stage": "encrypt", "status": "end", "ms": 12.5, ...}
+#
+# Every event also carries "elapsed_ms" since the job started.
+#
+# Each stage is also measured: wall time, CPU time of this process and of the
+# children it waited for (gcc), peak RSS and bytes processed. The totals per
+# stage end up in the result JSON under "stages" and in the worker's metrics
+# (metrics.py). A measurement is two getrusage() calls, so it stays on in
+# production. The job as a whole also reports disk_write_bytes: bytes its
+# process and gcc caused to be written to disk, which stays 0 for files kept
+# on tmpfs (the build workspace, spooled uploads).
+
+# Minimum seconds between two "update" events of the same stage
+UPDATE_INTERVAL = 0.2
+
+
+def _usage():
+    """Wall, own and children's CPU seconds, then own and children's peak RSS (KB)."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (time.perf_counter(), own.ru_utime + own.ru_stime,
+            children.ru_utime + children.ru_stime, own.ru_maxrss, children.ru_maxrss)
+
+
+def _disk_writes() -> int:
+    """Bytes written to block devices by this process and its waited-for children."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Block output operations are counted in 512-byte units
+    return (own.ru_oublock + children.ru_oublock) * 512
+
+
+class Progress:
+    """Reports pipeline stages to `emit`; a no-op when `emit` is None.
+
+    `stages` accumulates the measurements of every finished stage by name.
+    """
+
+    def __init__(self, emit: Optional[Callable[[dict], None]] = None):
+        self.emit = emit
+        self.started = time.perf_counter()
+        self._disk_writes_started = _disk_writes()
+        self.stages = {}
+        self._stage_started = {}
+        self._last_update = {}
+
+    def _send(self, stage: str, status: str, fields: dict):
+        if self.emit is None:
+            return
+        event = {"event": "progress", "stage": stage, "status": status}
+        event.update(fields)
+        event["elapsed_ms"] = round((time.perf_counter() - self.started) * 1000, 2)
+        self.emit(event)
+
+    def start(self, stage: str, **fields):
+        self._stage_started[stage] = _usage()
+        self._send(stage, "start", fields)
+
+    def update(self, stage: str, bytes_done: int, bytes_total: Optional[int] = None):
+        """Report bytes processed so far, at most every UPDATE_INTERVAL seconds."""
+        now = time.perf_counter()
+        if now - self._last_update.get(stage, 0.0) < UPDATE_INTERVAL:
+            return
+        self._last_update[stage] = now
+        fields = {"bytes_done": bytes_done}
+        if bytes_total:
+            fields["bytes_total"] = bytes_total
+            fields["percent"] = round(100.0 * bytes_done / bytes_total, 1)
+        self._send(stage, "update", fields)
+
+    def end(self, stage: str, **fields):
+        started = self._stage_started.pop(stage, None)
+        if started is not None:
+            fields["ms"] = self._record(stage, started, fields.get("bytes_done", 0))
+        self._send(stage, "end", fields)
+
+    def _record(self, stage: str, started: tuple, nbytes: int) -> float:
+        """Add one run of `stage` to self.stages; returns its wall time in ms."""
+        wall, cpu, child_cpu, rss, child_rss = _usage()
+        wall_ms = (wall - started[0]) * 1000
+        stats = self.stages.setdefault(stage, {
+            "wall_ms": 0.0, "cpu_ms": 0.0, "child_cpu_ms": 0.0,
+            "peak_rss_kb": 0, "child_peak_rss_kb": 0, "bytes": 0, "runs": 0,
+        })
+        stats["wall_ms"] = round(stats["wall_ms"] + wall_ms, 3)
+        stats["cpu_ms"] = round(stats["cpu_ms"] + (cpu - started[1]) * 1000, 3)
+        stats["child_cpu_ms"] = round(stats["child_cpu_ms"] + (child_cpu - started[2]) * 1000, 3)
+        # ru_maxrss is a high-water mark for the whole process lifetime
+        stats["peak_rss_kb"] = max(stats["peak_rss_kb"], rss)
+        stats["child_peak_rss_kb"] = max(stats["child_peak_rss_kb"], child_rss)
+        stats["bytes"] += nbytes or 0
+        stats["runs"] += 1
+        return round(wall_ms, 2)
+
+    @contextlib.contextmanager
+    def stage(self, stage: str, **fields):
+        """Bracket a block with start/end events; the block may add end fields."""
+        self.start(stage, **fields)
+        result = {}
+        yield result
+        self.end(stage, **result)
+
+    def track(self, stage: str, chunks: Iterable[bytes], bytes_total: Optional[int] = None):
+        """Pass `chunks` through, reporting the stage as they are consumed."""
+        self.start(stage, bytes_total=bytes_total)
+        done = 0
+        for chunk in chunks:
+            done += len(chunk)
+            self.update(stage, done, bytes_total)
+            yield chunk
+        self.end(stage, bytes_done=done)
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def disk_write_bytes(self) -> int:
+        return _disk_writes() - self._disk_writes_started
+
+    def done(self, **fields):
+        fields["total_ms"] = self.total_ms()
+        self._send("done", "end", fields)
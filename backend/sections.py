@@ -0,0 +1,584 @@
+import os
+import struct
+import subprocess
+from typing import Callable, Iterable, List, Optional
+
+from cache import ObfuscationCache, cache_key
+from cipher_xor import xor_bytes
+
+# In-place selective section encryption.
+#
+# Instead of wrapping the whole file in a loader, the chosen sections of the
+# parsed binary are XOR-encrypted where they are, and a small decryptor is
+# added as a new PT_LOAD segment that becomes the entry point. At startup
+# it decrypts each region in its original mapping and jumps to the original
+# entry, so the program runs from its own pages: no second image, memfd or
+# exec. Headers, .rodata, debug info and everything else stay untouched.
+#
+# `binary` is a parsed lief.ELF.Binary; lief itself is imported inside the
+# functions that need it, so importing this module stays cheap.
+#
+# The decryptor is position independent: it finds its regions through a
+# table of offsets relative to its own load address, which it appends after
+# its code, so PIE binaries work at any base.
+#
+#     [ code ][ count | entry delta | { delta, length, prot, key } * count ]
+
+# Regions are XORed with a rolling 8-byte key (one qword per step)
+SECTION_KEY_SIZE = 8
+
+DEFAULT_SECTIONS = ['.text']
+
+PAGE_SIZE = 0x1000
+
+TABLE_HEADER_FORMAT = "<Qq"     # region count, entry point - decryptor address
+TABLE_ENTRY_FORMAT = "<qQQ8s"   # region - decryptor address, length, prot after decryption
+
+# Lazy mode adds the offset of a small RW state segment (spinlock + one bit
+# per page) to the header and each region's first bit in that bitmap.
+LAZY_TABLE_HEADER_FORMAT = "<Qqq"
+LAZY_TABLE_ENTRY_FORMAT = "<qQQ8sQ"
+
+# Per-page keys: page j of a region (counted from the region's first page)
+# is XORed with key ^ ((j + 1) * PAGE_KEY_MULTIPLIER mod 2**64), and byte
+# address a uses byte (a % 8) of its page key. Pages can therefore be
+# decrypted independently, in any order, and equal plaintext pages do not
+# produce equal ciphertext.
+PAGE_KEY_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# Lazy mode only works while its SIGSEGV handler stays installed and SIGSEGV
+# stays unblocked in every thread that touches an encrypted page: a fault
+# with SIGSEGV blocked or ignored is fatal, since the kernel then forces the
+# default action. Programs that import any of these functions can block
+# signals (e.g. a worker thread that blocks everything and then runs code
+# from an untouched page) or replace the handler, so they are refused.
+LAZY_SIGNAL_FUNCTIONS = frozenset({
+    'sigaction', 'signal', 'bsd_signal', 'sysv_signal', '__sysv_signal', 'sigset', 'sigvec',
+    'sigignore', 'sigprocmask', 'pthread_sigmask', 'sigblock', 'sigsetmask', 'sighold',
+    'setcontext', 'swapcontext',
+})
+
+# Runtimes that install their own SIGSEGV handler from a shared library
+LAZY_SIGNAL_RUNTIMES = ('libjvm', 'libjli', 'libasan', 'libtsan', 'libmsan', 'liblsan',
+                        'libhwasan', 'libgo.')
+
+# Runs before the program's own entry point, after ld.so has relocated it.
+# rdx (the rtld fini pointer) and rsp (argc/argv/envp/auxv) are handed to
+# the original entry unchanged. Any failure exits with status 127.
+section_decryptor_src = r"""
+__asm__(
+    ".intel_syntax noprefix\n"
+    ".text\n"
+    "section_decryptor:\n"
+    "    push rdx\n"
+    "    push rbx\n"
+    "    push r12\n"
+    "    push r13\n"
+    "    push r14\n"
+    "    push r15\n"
+    "    lea rbx, [rip + section_decryptor]\n"
+    "    lea r12, [rip + region_table]\n"
+    "    mov r13, [r12]\n"
+    "    add r12, 16\n"
+    "next_region:\n"
+    "    test r13, r13\n"
+    "    jz regions_done\n"
+    "    mov r14, [r12]\n"
+    "    add r14, rbx\n"
+    "    mov r15, [r12 + 8]\n"
+    /* mprotect(page_start, page_end - page_start, PROT_READ | PROT_WRITE) */
+    "    mov rdi, r14\n"
+    "    and rdi, -4096\n"
+    "    lea rsi, [r14 + r15 + 4095]\n"
+    "    and rsi, -4096\n"
+    "    sub rsi, rdi\n"
+    "    mov edx, 3\n"
+    "    mov eax, 10\n"
+    "    syscall\n"
+    "    test rax, rax\n"
+    "    jnz decrypt_failed\n"
+    /* XOR whole qwords, then the tail byte by byte */
+    "    mov rax, [r12 + 24]\n"
+    "    mov rdi, r14\n"
+    "    mov rcx, r15\n"
+    "    shr rcx, 3\n"
+    "xor_qwords:\n"
+    "    jrcxz xor_tail\n"
+    "    xor [rdi], rax\n"
+    "    add rdi, 8\n"
+    "    dec rcx\n"
+    "    jmp xor_qwords\n"
+    "xor_tail:\n"
+    "    mov rcx, r15\n"
+    "    and rcx, 7\n"
+    "xor_bytes:\n"
+    "    jrcxz restore_prot\n"
+    "    xor [rdi], al\n"
+    "    ror rax, 8\n"
+    "    inc rdi\n"
+    "    dec rcx\n"
+    "    jmp xor_bytes\n"
+    "restore_prot:\n"
+    "    mov rdi, r14\n"
+    "    and rdi, -4096\n"
+    "    lea rsi, [r14 + r15 + 4095]\n"
+    "    and rsi, -4096\n"
+    "    sub rsi, rdi\n"
+    "    mov rdx, [r12 + 16]\n"
+    "    mov eax, 10\n"
+    "    syscall\n"
+    "    test rax, rax\n"
+    "    jnz decrypt_failed\n"
+    "    add r12, 32\n"
+    "    dec r13\n"
+    "    jmp next_region\n"
+    "regions_done:\n"
+    "    lea r12, [rip + region_table]\n"
+    "    mov rax, [r12 + 8]\n"
+    "    add rax, rbx\n"
+    "    pop r15\n"
+    "    pop r14\n"
+    "    pop r13\n"
+    "    pop r12\n"
+    "    pop rbx\n"
+    "    pop rdx\n"
+    "    jmp rax\n"
+    "decrypt_failed:\n"
+    "    mov edi, 127\n"
+    "    mov eax, 231\n"
+    "    syscall\n"
+    "    .balign 8\n"
+    "region_table:\n"
+    ".att_syntax prefix\n"
+);
+"""
+
+
+# Lazy variant: instead of decrypting at startup, the regions' pages are made
+# PROT_NONE and a SIGSEGV handler is installed. The first access to a page
+# faults; the handler decrypts just that page with its page key, restores the
+# segment's protection and returns, so the access is retried. Startup cost no
+# longer depends on the size of the encrypted sections.
+#
+# A spinlock and a per-page bitmap in the state segment make concurrent
+# faults on the same page from several threads decrypt it exactly once.
+# Faults outside the regions, or genuine protection violations on pages
+# that are already decrypted, restore the default action and re-fault.
+lazy_section_decryptor_src = r"""
+__asm__(
+    ".intel_syntax noprefix\n"
+    ".text\n"
+    "lazy_decryptor:\n"
+    "    push rdx\n"
+    "    push rbx\n"
+    "    push r12\n"
+    "    push r13\n"
+    "    push r14\n"
+    "    push r15\n"
+    "    lea rbx, [rip + lazy_decryptor]\n"
+    "    lea r12, [rip + region_table]\n"
+    "    mov r13, [r12]\n"
+    "    add r12, 24\n"
+    "protect_region:\n"
+    "    test r13, r13\n"
+    "    jz install_handler\n"
+    "    mov r14, [r12]\n"
+    "    add r14, rbx\n"
+    "    mov r15, [r12 + 8]\n"
+    /* mprotect(page_start, page_end - page_start, PROT_NONE) */
+    "    mov rdi, r14\n"
+    "    and rdi, -4096\n"
+    "    lea rsi, [r14 + r15 + 4095]\n"
+    "    and rsi, -4096\n"
+    "    sub rsi, rdi\n"
+    "    xor edx, edx\n"
+    "    mov eax, 10\n"
+    "    syscall\n"
+    "    test rax, rax\n"
+    "    jnz lazy_failed\n"
+    "    add r12, 40\n"
+    "    dec r13\n"
+    "    jmp protect_region\n"
+    "install_handler:\n"
+    /* rt_sigaction(SIGSEGV, {lazy_fault, SA_SIGINFO | SA_RESTORER, lazy_restorer, 0}, NULL, 8) */
+    "    sub rsp, 32\n"
+    "    lea rax, [rip + lazy_fault]\n"
+    "    mov [rsp], rax\n"
+    "    mov qword ptr [rsp + 8], 0x04000004\n"
+    "    lea rax, [rip + lazy_restorer]\n"
+    "    mov [rsp + 16], rax\n"
+    "    mov qword ptr [rsp + 24], 0\n"
+    "    mov edi, 11\n"
+    "    mov rsi, rsp\n"
+    "    xor edx, edx\n"
+    "    mov r10d, 8\n"
+    "    mov eax, 13\n"
+    "    syscall\n"
+    "    add rsp, 32\n"
+    "    test rax, rax\n"
+    "    jnz lazy_failed\n"
+    "    lea r12, [rip + region_table]\n"
+    "    mov rax, [r12 + 8]\n"
+    "    add rax, rbx\n"
+    "    pop r15\n"
+    "    pop r14\n"
+    "    pop r13\n"
+    "    pop r12\n"
+    "    pop rbx\n"
+    "    pop rdx\n"
+    "    jmp rax\n"
+    "lazy_restorer:\n"
+    "    mov eax, 15\n"
+    "    syscall\n"
+    /* void lazy_fault(int sig, siginfo_t *info, ucontext_t *uc). Registers
+       are restored by rt_sigreturn, so none need saving. */
+    "lazy_fault:\n"
+    "    mov r8, [rsi + 16]\n"
+    "    and r8, -4096\n"
+    "    mov rcx, [rdx + 192]\n"
+    "    lea rbx, [rip + lazy_decryptor]\n"
+    "    lea r12, [rip + region_table]\n"
+    "    mov r13, [r12]\n"
+    "    mov r9, [r12 + 16]\n"
+    "    add r9, rbx\n"
+    "    add r12, 24\n"
+    "find_region:\n"
+    "    test r13, r13\n"
+    "    jz not_ours\n"
+    "    mov r14, [r12]\n"
+    "    add r14, rbx\n"
+    "    mov r15, [r12 + 8]\n"
+    "    mov r10, r14\n"
+    "    and r10, -4096\n"
+    "    lea r11, [r14 + r15 + 4095]\n"
+    "    and r11, -4096\n"
+    "    cmp r8, r10\n"
+    "    jb next_fault_region\n"
+    "    cmp r8, r11\n"
+    "    jb found_region\n"
+    "next_fault_region:\n"
+    "    add r12, 40\n"
+    "    dec r13\n"
+    "    jmp find_region\n"
+    "found_region:\n"
+    /* r13 = page index in the region, rbp = its bit, r11 = error code */
+    "    mov r11, rcx\n"
+    "    mov r13, r8\n"
+    "    sub r13, r10\n"
+    "    shr r13, 12\n"
+    "    mov rbp, r13\n"
+    "    add rbp, [r12 + 32]\n"
+    "lock_spin:\n"
+    "    mov eax, 1\n"
+    "    xchg [r9], eax\n"
+    "    test eax, eax\n"
+    "    jz page_locked\n"
+    "    pause\n"
+    "    jmp lock_spin\n"
+    "page_locked:\n"
+    "    bt [r9 + 8], rbp\n"
+    "    jnc decrypt_page\n"
+    /* Already decrypted: another thread won the race, unless the access
+       is one the page's protection forbids (write or fetch bits of the
+       page fault error code) */
+    "    mov dword ptr [r9], 0\n"
+    "    mov rdx, [r12 + 16]\n"
+    "    test r11, 2\n"
+    "    jz check_fetch\n"
+    "    test rdx, 2\n"
+    "    jz not_ours\n"
+    "check_fetch:\n"
+    "    test r11, 16\n"
+    "    jz fault_done\n"
+    "    test rdx, 4\n"
+    "    jz not_ours\n"
+    "fault_done:\n"
+    "    ret\n"
+    "decrypt_page:\n"
+    "    mov rdi, r8\n"
+    "    mov esi, 4096\n"
+    "    mov edx, 3\n"
+    "    mov eax, 10\n"
+    "    syscall\n"
+    "    test rax, rax\n"
+    "    jnz lazy_failed\n"
+    /* bytes [max(page, start), min(page + 4096, start + len)) */
+    "    mov rdi, r8\n"
+    "    cmp rdi, r14\n"
+    "    cmovb rdi, r14\n"
+    "    lea rsi, [r8 + 4096]\n"
+    "    lea rax, [r14 + r15]\n"
+    "    cmp rsi, rax\n"
+    "    cmova rsi, rax\n"
+    "    lea rax, [r13 + 1]\n"
+    "    movabs rdx, 0x9E3779B97F4A7C15\n"
+    "    imul rax, rdx\n"
+    "    xor rax, [r12 + 24]\n"
+    "    mov rcx, rdi\n"
+    "    and ecx, 7\n"
+    "    shl ecx, 3\n"
+    "    ror rax, cl\n"
+    "xor_page:\n"
+    "    cmp rdi, rsi\n"
+    "    jae page_decrypted\n"
+    "    xor [rdi], al\n"
+    "    ror rax, 8\n"
+    "    inc rdi\n"
+    "    jmp xor_page\n"
+    "page_decrypted:\n"
+    "    mov rdi, r8\n"
+    "    mov esi, 4096\n"
+    "    mov rdx, [r12 + 16]\n"
+    "    mov eax, 10\n"
+    "    syscall\n"
+    "    test rax, rax\n"
+    "    jnz lazy_failed\n"
+    "    bts [r9 + 8], rbp\n"
+    "    mov dword ptr [r9], 0\n"
+    "    ret\n"
+    "not_ours:\n"
+    /* Restore SIG_DFL; returning retries the access, which now kills the
+       process with the usual SIGSEGV */
+    "    sub rsp, 32\n"
+    "    xor eax, eax\n"
+    "    mov [rsp], rax\n"
+    "    mov [rsp + 8], rax\n"
+    "    mov [rsp + 16], rax\n"
+    "    mov [rsp + 24], rax\n"
+    "    mov edi, 11\n"
+    "    mov rsi, rsp\n"
+    "    xor edx, edx\n"
+    "    mov r10d, 8\n"
+    "    mov eax, 13\n"
+    "    syscall\n"
+    "    add rsp, 32\n"
+    "    ret\n"
+    "lazy_failed:\n"
+    "    mov edi, 127\n"
+    "    mov eax, 231\n"
+    "    syscall\n"
+    "    .balign 8\n"
+    "region_table:\n"
+    ".att_syntax prefix\n"
+);
+"""
+
+
+def get_section_decryptor(compile_fn: Callable, cache: ObfuscationCache,
+                          lazy: bool = False) -> bytes:
+    """Machine code of the decryptor (without its table), assembled once."""
+    source = lazy_section_decryptor_src if lazy else section_decryptor_src
+    key = "section-decryptor-" + cache_key(source)[:16]
+    path = cache.get("stubs", key, ".bin")
+    if path is None:
+        build_dir = os.path.join(cache.root, "stubs")
+        os.makedirs(build_dir, exist_ok=True)
+        obj_path = os.path.join(build_dir, f"{key}.{os.getpid()}.o.tmp")
+        bin_path = os.path.join(build_dir, f"{key}.{os.getpid()}.build.tmp")
+        try:
+            success, _, stderr, _ = compile_fn(source, obj_path, "gcc", ["-c"])
+            if not success:
+                raise RuntimeError(f"Failed to assemble section decryptor:\n{stderr}")
+            subprocess.run(["objcopy", "-O", "binary", "--only-section=.text", obj_path, bin_path],
+                           check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        finally:
+            if os.path.exists(obj_path):
+                os.remove(obj_path)
+        path = cache.put("stubs", key, bin_path, ".bin", move=True)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def page_key(key: bytes, page_index: int) -> bytes:
+    k = int.from_bytes(key, "little") ^ (((page_index + 1) * PAGE_KEY_MULTIPLIER) & (2**64 - 1))
+    return k.to_bytes(SECTION_KEY_SIZE, "little")
+
+
+def xor_pages(data: bytes, address: int, key: bytes) -> bytes:
+    """Apply the per-page keystream to `data` loaded at `address`."""
+    first_page = address & ~(PAGE_SIZE - 1)
+    out = []
+    pos = 0
+    while pos < len(data):
+        a = address + pos
+        page_index = (a - first_page) // PAGE_SIZE
+        n = min(len(data) - pos, first_page + (page_index + 1) * PAGE_SIZE - a)
+        out.append(xor_bytes(data[pos:pos + n], page_key(key, page_index), a % SECTION_KEY_SIZE))
+        pos += n
+    return b"".join(out)
+
+
+def _segment_prot(segment) -> int:
+    import lief
+
+    flags = segment.flags
+    F = lief.ELF.Segment.FLAGS
+    return ((1 if flags & F.R else 0) |
+            (2 if flags & F.W else 0) |
+            (4 if flags & F.X else 0))
+
+
+def _check_section(binary, section):
+    """Raise ValueError unless `section` can be encrypted in place."""
+    import lief
+
+    name = section.name
+    if section.type == lief.ELF.Section.TYPE.NOBITS or section.size == 0:
+        raise ValueError(f"Section {name} has no file contents")
+    start, end = section.virtual_address, section.virtual_address + section.size
+    if start == 0:
+        raise ValueError(f"Section {name} is not loaded at runtime")
+    # ld.so writes relocations before our entry point runs; encrypting a
+    # relocated range would XOR the relocated values
+    for reloc in binary.dynamic_relocations:
+        if start <= reloc.address < end:
+            raise ValueError(f"Section {name} has dynamic relocations")
+        # IFUNC resolvers are called by ld.so while relocating
+        if reloc.type == lief.ELF.Relocation.TYPE.X86_64_IRELATIVE and start <= reloc.addend < end:
+            raise ValueError(f"Section {name} contains IFUNC resolvers")
+    if binary.has(lief.ELF.Segment.TYPE.GNU_RELRO):
+        relro = binary.get(lief.ELF.Segment.TYPE.GNU_RELRO)
+        if start < relro.virtual_address + relro.virtual_size and relro.virtual_address < end:
+            raise ValueError(f"Section {name} lies in the RELRO region")
+    # ld.so runs the executable's preinit array before the entry point
+    if binary.has(lief.ELF.DynamicEntry.TAG.PREINIT_ARRAY):
+        raise ValueError("Binaries with a preinit array are not supported")
+
+
+def _page_span(section) -> int:
+    start = section.virtual_address & ~(PAGE_SIZE - 1)
+    end = (section.virtual_address + section.size + PAGE_SIZE - 1) & ~(PAGE_SIZE - 1)
+    return (end - start) // PAGE_SIZE
+
+
+def _check_lazy_section(binary, section, chosen):
+    """Lazy mode constraints on top of _check_section.
+
+    While a page is PROT_NONE, a system call reading it fails with EFAULT
+    instead of faulting into the handler, so every section sharing its
+    pages must be code. Regions may not share pages with each other, since
+    a page is decrypted for one region at a time.
+    """
+    import lief
+
+    start = section.virtual_address & ~(PAGE_SIZE - 1)
+    end = start + _page_span(section) * PAGE_SIZE
+    for other in binary.sections:
+        if other.virtual_address == 0 or other.size == 0:
+            continue
+        if not (start < other.virtual_address + other.size and other.virtual_address < end):
+            continue
+        if not other.has(lief.ELF.Section.FLAGS.EXECINSTR):
+            raise ValueError(f"Lazy mode needs code pages; {section.name} shares pages "
+                             f"with {other.name}")
+        if any(c.name == other.name for c in chosen):
+            raise ValueError(f"Sections {other.name} and {section.name} share a page")
+
+
+def _check_lazy_program(binary):
+    """Refuse lazy mode for programs that can block or replace its SIGSEGV handler.
+
+    Only the executable's own imports and the libraries it links are seen;
+    a library that blocks SIGSEGV and then calls back into the program
+    cannot be detected.
+    """
+    advice = "; use sections mode without --lazy"
+    if not binary.libraries:
+        raise ValueError("Lazy mode needs a dynamically linked program: the signal code "
+                         "linked into a static one cannot be checked" + advice)
+    for library in binary.libraries:
+        if library.startswith(LAZY_SIGNAL_RUNTIMES):
+            raise ValueError(f"Lazy mode cannot run programs linking {library}, which "
+                             "installs its own SIGSEGV handler" + advice)
+    for function in binary.imported_functions:
+        name = function.name.split("@")[0]
+        if name in LAZY_SIGNAL_FUNCTIONS:
+            raise ValueError(f"Lazy mode cannot run programs that call {name}(), which can "
+                             "block or replace the SIGSEGV handler it decrypts from" + advice)
+
+
+def encrypt_sections(binary, names: Iterable[str], output_path: str, decryptor: bytes,
+                     key: Optional[bytes] = None, lazy: bool = False) -> List[dict]:
+    """Encrypt `names` in `binary` in place and write the result to output_path.
+
+    `decryptor` must match `lazy` (see get_section_decryptor). Returns one
+    dict per encrypted section (name, address, size, key).
+    """
+    import lief
+
+    if binary.header.machine_type != lief.ELF.ARCH.X86_64:
+        raise ValueError("Section encryption supports x86-64 ELF only")
+    if binary.header.file_type not in (lief.ELF.Header.FILE_TYPE.EXEC, lief.ELF.Header.FILE_TYPE.DYN) \
+            or binary.entrypoint == 0:
+        raise ValueError("Section encryption needs an executable with an entry point")
+    if lazy:
+        _check_lazy_program(binary)
+
+    sections = []
+    for name in names:
+        section = binary.get_section(name)
+        if section is None:
+            raise ValueError(f"Section {name} not found")
+        _check_section(binary, section)
+        segment = next((s for s in binary.segments
+                        if s.type == lief.ELF.Segment.TYPE.LOAD and
+                        s.virtual_address <= section.virtual_address < s.virtual_address + s.virtual_size),
+                       None)
+        if segment is None:
+            raise ValueError(f"Section {name} is not in a loadable segment")
+        if lazy:
+            _check_lazy_section(binary, section, [s for s, _ in sections])
+        sections.append((section, _segment_prot(segment)))
+
+    if lazy:
+        header_format, entry_format = LAZY_TABLE_HEADER_FORMAT, LAZY_TABLE_ENTRY_FORMAT
+        pages = [_page_span(s) for s, _ in sections]
+        state = lief.ELF.Segment()
+        state.type = lief.ELF.Segment.TYPE.LOAD
+        state.flags = lief.ELF.Segment.FLAGS.R | lief.ELF.Segment.FLAGS.W
+        state.alignment = PAGE_SIZE
+        # spinlock word, then the page bitmap in whole qwords
+        state.content = memoryview(bytes(8 + (sum(pages) + 63) // 64 * 8))
+        state = binary.add(state)
+    else:
+        header_format, entry_format = TABLE_HEADER_FORMAT, TABLE_ENTRY_FORMAT
+
+    table_size = struct.calcsize(header_format) + struct.calcsize(entry_format) * len(sections)
+    segment = lief.ELF.Segment()
+    segment.type = lief.ELF.Segment.TYPE.LOAD
+    segment.flags = lief.ELF.Segment.FLAGS.R | lief.ELF.Segment.FLAGS.X
+    segment.alignment = PAGE_SIZE
+    segment.content = memoryview(bytes(len(decryptor) + table_size))
+    segment = binary.add(segment)
+    # Adding a segment can shift a PIE's layout to make room for the program
+    # headers, so addresses are only read from here on
+    base = segment.virtual_address
+    original_entry = binary.entrypoint
+
+    if lazy:
+        table = [struct.pack(header_format, len(sections), original_entry - base,
+                             state.virtual_address - base)]
+    else:
+        table = [struct.pack(header_format, len(sections), original_entry - base)]
+    report = []
+    first_bit = 0
+    for section, prot in sections:
+        section_key = key or os.urandom(SECTION_KEY_SIZE)
+        address = section.virtual_address
+        if lazy:
+            section.content = memoryview(xor_pages(bytes(section.content), address, section_key))
+            table.append(struct.pack(entry_format, address - base, section.size, prot,
+                                     section_key, first_bit))
+            first_bit += _page_span(section)
+        else:
+            section.content = memoryview(xor_bytes(bytes(section.content), section_key))
+            table.append(struct.pack(entry_format, address - base, section.size, prot,
+                                     section_key))
+        report.append({"name": section.name, "address": address,
+                       "size": section.size, "key": section_key})
+    segment.content = memoryview(decryptor + b"".join(table))
+    binary.header.entrypoint = base
+
+    binary.write(output_path)
+    os.chmod(output_path, 0o755)
+    return report
@@ -4,7 +4,10 @@ const cors = require('cors');
 const path = require('path');
 const fs = require('fs');
 const crypto = require('crypto');
-const { spawn } = require('child_process');
+const { spawn, execFile } = require('child_process');
+const { ObfuscatorPool } = require('./workerPool');
+const { JobStore } = require('./jobStore');
+const { SpoolStorage } = require('./uploadStorage');
 
 const app = express();
 const PORT = process.env.PORT || 5000;
@@ -24,21 +27,16 @@ app.use(cors());
 app.use(express.json());
 app.use(express.urlencoded({ extended: true }));
 
-// Configure multer for file uploads
-const storage = multer.diskStorage({
-  destination: (req, file, cb) => {
-    cb(null, UPLOAD_DIR);
-  },
-  filename: (req, file, cb) => {
-    const uniqueSuffix = Date.now() + '-' + Math.round(Math.random() * 1E9);
-    cb(null, uniqueSuffix + '-' + file.originalname);
-  }
-});
+// Configure multer for file uploads. Uploads are hashed and their header
+// kept while they stream in, and spooled to tmpfs when possible (see
+// uploadStorage.js), so validation never reads them back.
+const MAX_UPLOAD_BYTES = 100 * 1024 * 1024; // 100MB limit
+const storage = new SpoolStorage({ fallbackDir: UPLOAD_DIR, maxFileSize: MAX_UPLOAD_BYTES });
 
 const upload = multer({
   storage: storage,
   limits: {
-    fileSize: 100 * 1024 * 1024 // 100MB limit
+    fileSize: MAX_UPLOAD_BYTES
   },
   fileFilter: (req, file, cb) => {
     // Accept all files - we'll validate ELF magic number after upload
@@ -47,15 +45,11 @@ const upload = multer({
   }
 });
 
-// Function to verify digital signature
-function verifySignature(publicKeyPem, signature, fileBuffer) {
+// Function to verify digital signature. hash is the SHA-256 digest of the
+// upload, computed while it was received.
+function verifySignature(publicKeyPem, signature, hash) {
   try {
-    console.log('  → Creating SHA-256 hash of file...');
-    console.log('  → File buffer size:', fileBuffer.length, 'bytes');
-    
-    // Create a hash of the file
-    const hash = crypto.createHash('sha256').update(fileBuffer).digest();
-    console.log('  → Hash created (length:', hash.length, 'bytes)');
+    console.log('  → File SHA-256:', hash.toString('hex'));
     
     // Convert signature from base64 to buffer
     const signatureBuffer = Buffer.from(signature, 'base64');
@@ -92,108 +86,64 @@ function verifySignature(publicKeyPem, signature, fileBuffer) {
   }
 }
 
-// POST /api/obfuscate - Main obfuscation endpoint
-app.post('/api/obfuscate', upload.single('file'), async (req, res) => {
-  const startTime = Date.now();
-  
-  try {
-    if (!req.file) {
-      return res.status(400).json({ error: 'No file uploaded' });
-    }
+// Obfuscator execution
+//
+// By default jobs go to a bounded pool of warm `obfuscator.py --worker`
+// processes (see workerPool.js). Set OBFUSCATOR_POOL=0 to fall back to
+// spawning a fresh Python process per request.
+const USE_POOL = process.env.OBFUSCATOR_POOL !== '0';
+const obfuscatorPool = USE_POOL ? new ObfuscatorPool({
+  size: parseInt(process.env.OBFUSCATOR_WORKERS, 10) || undefined,
+  maxQueue: process.env.OBFUSCATOR_QUEUE_LIMIT !== undefined
+    ? parseInt(process.env.OBFUSCATOR_QUEUE_LIMIT, 10)
+    : undefined,
+  jobTimeoutMs: parseInt(process.env.OBFUSCATOR_JOB_TIMEOUT_MS, 10) || undefined
+}) : null;
 
-    const { encryptionType, signature, publicKey } = req.body;
-    
-    if (!encryptionType) {
-      return res.status(400).json({ error: 'Encryption type is required' });
+// Encryption types accepted by the obfuscator, read once from its cipher
+// registry (encryptor.CIPHER_MODULES) so a new cipher needs no change here.
+// Until the list has arrived, unknown types are left to the obfuscator.
+let encryptionTypes = null;
+execFile(process.platform === 'win32' ? 'python' : 'python3',
+  [path.join(__dirname, 'obfuscator.py'), '--list-ciphers'], (error, stdout) => {
+    try {
+      if (error) throw error;
+      encryptionTypes = JSON.parse(stdout);
+    } catch (e) {
+      console.error(`Could not list encryption types: ${e.message}`);
     }
+  });
 
-    // Read file to validate ELF format and for signature verification
-    const fileBuffer = fs.readFileSync(req.file.path);
-    
-    // Validate ELF magic number (0x7F 'E' 'L' 'F')
-    if (fileBuffer.length < 4 || 
-        fileBuffer[0] !== 0x7F || 
-        fileBuffer[1] !== 0x45 || 
-        fileBuffer[2] !== 0x4C || 
-        fileBuffer[3] !== 0x46) {
-      
-      // Show what we got for debugging
-      const magicBytes = fileBuffer.slice(0, 4);
-      const magicHex = Array.from(magicBytes).map(b => '0x' + b.toString(16).padStart(2, '0')).join(' ');
-      
-      console.error('❌ Invalid file format - not an ELF binary');
-      console.error(`   Expected: 0x7f 0x45 0x4c 0x46 (ELF magic number)`);
-      console.error(`   Got: ${magicHex}`);
-      
-      fs.unlinkSync(req.file.path);
-      return res.status(400).json({ 
-        error: 'Invalid file format',
-        message: 'Only ELF binary files are supported. File must start with ELF magic number (0x7F454C46).',
-        details: `File starts with: ${magicHex}, expected: 0x7f 0x45 0x4c 0x46`,
-        hint: 'Make sure you are uploading a Linux ELF executable or shared library, not a Windows PE file (.exe/.dll) or other format.'
-      });
-    }
-    
-    console.log('✓ Valid ELF binary detected');
-
-    // Verify digital signature if provided
-    if (signature && publicKey) {
-      console.log('Verifying digital signature...');
-      console.log('Public Key length:', publicKey.length);
-      console.log('Signature length:', signature.length);
-      console.log('File size:', req.file.size);
-      
-      const isValid = verifySignature(publicKey, signature, fileBuffer);
-      
-      if (!isValid) {
-        console.error('❌ Digital signature verification failed!');
-        
-        // Clean up uploaded file
-        fs.unlinkSync(req.file.path);
-        
-        return res.status(403).json({ 
-          error: 'Invalid digital signature',
-          message: 'File signature verification failed. Upload rejected for security reasons.'
-        });
+// Resolves to { code, stdout, stderr, debugInfo }. Rejects only when the job
+// could not be started (including QUEUE_FULL and WORKERS_UNAVAILABLE from
+// the pool). onProgress, if
+// given, receives the obfuscator's progress events (see progress.py).
+function runObfuscator(job, onProgress) {
+  if (obfuscatorPool) {
+    return obfuscatorPool.run(job, { onProgress }).then(
+      (result) => ({ code: 0, stdout: '', stderr: '', debugInfo: result }),
+      (error) => {
+        if (error.code === 'QUEUE_FULL' || error.code === 'WORKERS_UNAVAILABLE') throw error;
+        return { code: 1, stdout: error.log || '', stderr: error.stderr || error.message, debugInfo: {} };
       }
-      
-      console.log('✓ Digital signature verified successfully');
-    } else {
-      console.log('⚠ Warning: No digital signature provided');
-      if (!signature) console.log('  - Missing signature');
-      if (!publicKey) console.log('  - Missing public key');
-    }
-
-    const validEncryptionTypes = ['xor', 'rsa', 'aes'];
-    if (!validEncryptionTypes.includes(encryptionType.toLowerCase())) {
-      return res.status(400).json({ 
-        error: 'Invalid encryption type',
-        validTypes: validEncryptionTypes
-      });
-    }
-
-    const inputPath = req.file.path;
-    const outputFilename = `obfuscated_${req.file.originalname}`;
-    const outputPath = path.join(OUTPUT_DIR, outputFilename);
-
-    console.log(`Processing file: ${req.file.originalname}`);
-    console.log(`Encryption type: ${encryptionType}`);
-    console.log(`Input path: ${inputPath}`);
-    console.log(`Output path: ${outputPath}`);
+    );
+  }
 
-    // Call Python obfuscator script
+  return new Promise((resolve, reject) => {
     // On Windows, use 'python' instead of 'python3'
     const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
     
     const pythonProcess = spawn(pythonCommand, [
       path.join(__dirname, 'obfuscator.py'),
-      inputPath,
-      '-t', encryptionType,
-      '-o', outputPath
+      job.input,
+      '-t', job.type,
+      '-o', job.output,
+      ...(onProgress ? ['--progress'] : [])
     ]);
 
     let stdout = '';
     let stderr = '';
+    let pending = '';
 
     pythonProcess.stdout.on('data', (data) => {
       stdout += data.toString();
@@ -201,41 +151,27 @@ app.post('/api/obfuscate', upload.single('file'), async (req, res) => {
     });
 
     pythonProcess.stderr.on('data', (data) => {
-      stderr += data.toString();
-      console.error(`Python stderr: ${data}`);
-    });
-
-    pythonProcess.on('close', (code) => {
-      const processingTime = ((Date.now() - startTime) / 1000).toFixed(2);
-
-      if (code !== 0) {
-        console.error(`Python process exited with code ${code}`);
-        console.error(`stderr: ${stderr}`);
-        console.error(`stdout: ${stdout}`);
-        
-        // Clean up uploaded file
-        fs.unlinkSync(inputPath);
-        
-        // Check if it's a Windows environment error
-        let errorMessage = 'Obfuscation failed';
-        let errorDetails = stderr || stdout || 'Unknown error occurred';
-        
-        if (stdout.includes('ERROR: Simpfuscator cannot run natively on Windows')) {
-          errorMessage = 'Windows environment not supported';
-          errorDetails = 'Simpfuscator requires a Linux environment to generate ELF binaries. Please run the backend using Docker (recommended) or WSL. See DOCKER_SETUP.md or WINDOWS_SETUP.md for detailed instructions.';
-        } else if (stderr.includes('sys/wait.h: No such file or directory')) {
-          errorMessage = 'Windows environment detected';
-          errorDetails = 'Cannot compile Linux ELF binaries on Windows. Please use Docker (easiest) or WSL. See DOCKER_SETUP.md for setup instructions.';
+      if (!onProgress) {
+        stderr += data.toString();
+        console.error(`Python stderr: ${data}`);
+        return;
+      }
+      // Progress events arrive as JSON lines on stderr
+      pending += data.toString();
+      const lines = pending.split('\n');
+      pending = lines.pop();
+      for (const line of lines) {
+        if (line.startsWith('{"event": "progress"')) {
+          onProgress(JSON.parse(line));
+        } else {
+          stderr += line + '\n';
+          console.error(`Python stderr: ${line}`);
         }
-        
-        return res.status(500).json({
-          error: errorMessage,
-          details: errorDetails,
-          exitCode: code,
-          hint: 'Easiest solution: docker-compose up --build (see DOCKER_SETUP.md)'
-        });
       }
+    });
 
+    pythonProcess.on('close', (code) => {
+      stderr += pending;
       // Parse output for debug info (if your Python script outputs JSON)
       let debugInfo = {};
       try {
@@ -248,56 +184,246 @@ app.post('/api/obfuscate', upload.single('file'), async (req, res) => {
       } catch (e) {
         console.log('Could not parse debug info from Python output');
       }
+      resolve({ code, stdout, stderr, debugInfo });
+    });
 
-      // Success response
-      res.json({
-        success: true,
-        message: 'Obfuscation completed successfully',
-        fileUrl: `/api/download/${outputFilename}`,
-        downloadUrl: `/api/download/${outputFilename}`,
-        encryptionType: debugInfo.encryption_type || encryptionType.toUpperCase(),
-        encryptionKey: debugInfo.key_info || 'Generated dynamically',
-        sectionsEncrypted: 1, // Single binary encryption
-        processingTime: `${processingTime}s`,
-        originalFile: req.file.originalname,
-        obfuscatedFile: outputFilename,
-        fileSize: req.file.size,
-        originalSize: debugInfo.original_size || req.file.size,
-        encryptedSize: debugInfo.encrypted_size || req.file.size,
-        signatureVerified: !!(signature && publicKey), // Indicate if signature was verified
-        // Add any additional debug info from your Python script
-        ...debugInfo
-      });
+    pythonProcess.on('error', reject);
+  });
+}
 
-      // Clean up uploaded file after successful processing
-      setTimeout(() => {
-        if (fs.existsSync(inputPath)) {
-          fs.unlinkSync(inputPath);
-        }
-      }, 5000);
-    });
+function removeFile(filePath) {
+  if (filePath && fs.existsSync(filePath)) {
+    fs.unlinkSync(filePath);
+  }
+}
 
-    pythonProcess.on('error', (error) => {
-      console.error(`Failed to start Python process: ${error.message}`);
+// Checks an upload before it is queued: ELF magic, digital signature and
+// encryption type. Returns null when the upload is acceptable, otherwise
+// { status, body } for the error response; rejected uploads are deleted.
+function validateUpload(req) {
+  if (!req.file) {
+    return { status: 400, body: { error: 'No file uploaded' } };
+  }
+
+  const { encryptionType, signature, publicKey } = req.body;
+  
+  if (!encryptionType) {
+    removeFile(req.file.path);
+    return { status: 400, body: { error: 'Encryption type is required' } };
+  }
+
+  // The upload's first bytes, kept by the storage engine
+  const header = req.file.header;
+  
+  // Validate ELF magic number (0x7F 'E' 'L' 'F')
+  if (header.length < 4 || 
+      header[0] !== 0x7F || 
+      header[1] !== 0x45 || 
+      header[2] !== 0x4C || 
+      header[3] !== 0x46) {
+    
+    // Show what we got for debugging
+    const magicBytes = header.slice(0, 4);
+    const magicHex = Array.from(magicBytes).map(b => '0x' + b.toString(16).padStart(2, '0')).join(' ');
+    
+    console.error('❌ Invalid file format - not an ELF binary');
+    console.error(`   Expected: 0x7f 0x45 0x4c 0x46 (ELF magic number)`);
+    console.error(`   Got: ${magicHex}`);
+    
+    removeFile(req.file.path);
+    return { status: 400, body: { 
+      error: 'Invalid file format',
+      message: 'Only ELF binary files are supported. File must start with ELF magic number (0x7F454C46).',
+      details: `File starts with: ${magicHex}, expected: 0x7f 0x45 0x4c 0x46`,
+      hint: 'Make sure you are uploading a Linux ELF executable or shared library, not a Windows PE file (.exe/.dll) or other format.'
+    } };
+  }
+  
+  console.log('✓ Valid ELF binary detected');
+
+  // Verify digital signature if provided
+  if (signature && publicKey) {
+    console.log('Verifying digital signature...');
+    console.log('Public Key length:', publicKey.length);
+    console.log('Signature length:', signature.length);
+    console.log('File size:', req.file.size);
+    
+    const isValid = verifySignature(publicKey, signature, req.file.sha256);
+    
+    if (!isValid) {
+      console.error('❌ Digital signature verification failed!');
       
       // Clean up uploaded file
-      if (fs.existsSync(inputPath)) {
-        fs.unlinkSync(inputPath);
-      }
+      removeFile(req.file.path);
       
-      res.status(500).json({
+      return { status: 403, body: { 
+        error: 'Invalid digital signature',
+        message: 'File signature verification failed. Upload rejected for security reasons.'
+      } };
+    }
+    
+    console.log('✓ Digital signature verified successfully');
+  } else {
+    console.log('⚠ Warning: No digital signature provided');
+    if (!signature) console.log('  - Missing signature');
+    if (!publicKey) console.log('  - Missing public key');
+  }
+
+  if (encryptionTypes && !encryptionTypes.includes(encryptionType.toLowerCase())) {
+    removeFile(req.file.path);
+    return { status: 400, body: { 
+      error: 'Invalid encryption type',
+      validTypes: encryptionTypes
+    } };
+  }
+
+  return null;
+}
+
+// Error body for an obfuscator run that exited with a non-zero code
+function failureBody(outcome) {
+  const { code, stdout, stderr } = outcome;
+
+  console.error(`Python process exited with code ${code}`);
+  console.error(`stderr: ${stderr}`);
+  console.error(`stdout: ${stdout}`);
+  
+  // Check if it's a Windows environment error
+  let errorMessage = 'Obfuscation failed';
+  let errorDetails = stderr || stdout || 'Unknown error occurred';
+  
+  if (stdout.includes('ERROR: Simpfuscator cannot run natively on Windows')) {
+    errorMessage = 'Windows environment not supported';
+    errorDetails = 'Simpfuscator requires a Linux environment to generate ELF binaries. Please run the backend using Docker (recommended) or WSL. See DOCKER_SETUP.md or WINDOWS_SETUP.md for detailed instructions.';
+  } else if (stderr.includes('sys/wait.h: No such file or directory')) {
+    errorMessage = 'Windows environment detected';
+    errorDetails = 'Cannot compile Linux ELF binaries on Windows. Please use Docker (easiest) or WSL. See DOCKER_SETUP.md for setup instructions.';
+  }
+  
+  return {
+    error: errorMessage,
+    details: errorDetails,
+    exitCode: code,
+    hint: 'Easiest solution: docker-compose up --build (see DOCKER_SETUP.md)'
+  };
+}
+
+// Upload handoff accounting, per request and in total for /api/metrics.
+// The server copies an upload once, from the socket into the spool file,
+// and reads nothing back; bytes reach a disk when the spool is not on tmpfs
+// and when the obfuscator writes them (its own and gcc's block writes,
+// reported as disk_write_bytes; normally just the artifact in OUTPUT_DIR).
+const handoffTotals = { uploadBytes: 0, diskBytesWritten: 0 };
+
+function handoffReport(file, debugInfo) {
+  const report = {
+    spool: file.spool,
+    uploadBytes: file.size,
+    bytesCopied: file.size,
+    diskBytesWritten: (file.spool === 'disk' ? file.size : 0) + (debugInfo.disk_write_bytes || 0)
+  };
+  handoffTotals.uploadBytes += report.uploadBytes;
+  handoffTotals.diskBytesWritten += report.diskBytesWritten;
+  return report;
+}
+
+// Success body shared by the synchronous and asynchronous APIs
+function successBody(req, outcome, outputFilename, downloadUrl, startTime) {
+  const { encryptionType, signature, publicKey } = req.body;
+  const debugInfo = outcome.debugInfo;
+  const processingTime = ((Date.now() - startTime) / 1000).toFixed(2);
+
+  return {
+    success: true,
+    message: 'Obfuscation completed successfully',
+    fileUrl: downloadUrl,
+    downloadUrl,
+    encryptionType: debugInfo.encryption_type || encryptionType.toUpperCase(),
+    encryptionKey: debugInfo.key_info || 'Generated dynamically',
+    sectionsEncrypted: 1, // Single binary encryption
+    processingTime: `${processingTime}s`,
+    originalFile: req.file.originalname,
+    obfuscatedFile: outputFilename,
+    fileSize: req.file.size,
+    originalSize: debugInfo.original_size || req.file.size,
+    encryptedSize: debugInfo.encrypted_size || req.file.size,
+    signatureVerified: !!(signature && publicKey), // Indicate if signature was verified
+    handoff: handoffReport(req.file, debugInfo),
+    // Add any additional debug info from your Python script
+    ...debugInfo
+  };
+}
+
+function rejectQueueFull(res) {
+  res.set('Retry-After', '5');
+  return res.status(503).json({
+    error: 'Server busy',
+    message: 'Too many obfuscation jobs are queued. Please retry shortly.',
+    pool: obfuscatorPool.status()
+  });
+}
+
+// POST /api/obfuscate - Main obfuscation endpoint
+app.post('/api/obfuscate', upload.single('file'), async (req, res) => {
+  const startTime = Date.now();
+  
+  try {
+    const rejection = validateUpload(req);
+    if (rejection) {
+      return res.status(rejection.status).json(rejection.body);
+    }
+
+    const { encryptionType } = req.body;
+    const inputPath = req.file.path;
+    const outputFilename = `obfuscated_${req.file.originalname}`;
+    const outputPath = path.join(OUTPUT_DIR, outputFilename);
+
+    console.log(`Processing file: ${req.file.originalname}`);
+    console.log(`Encryption type: ${encryptionType}`);
+    console.log(`Input path: ${inputPath}`);
+    console.log(`Output path: ${outputPath}`);
+
+    let outcome;
+    try {
+      outcome = await runObfuscator({
+        input: inputPath,
+        type: encryptionType.toLowerCase(),
+        output: outputPath
+      });
+    } catch (error) {
+      // Clean up uploaded file
+      removeFile(inputPath);
+
+      if (error.code === 'QUEUE_FULL') {
+        console.error(`❌ ${error.message}`);
+        return rejectQueueFull(res);
+      }
+
+      console.error(`Failed to start Python process: ${error.message}`);
+      return res.status(500).json({
         error: 'Failed to start obfuscation process',
         details: error.message
       });
-    });
+    }
+
+    if (outcome.code !== 0) {
+      // Clean up uploaded file
+      removeFile(inputPath);
+      return res.status(500).json(failureBody(outcome));
+    }
+
+    // Success response
+    res.json(successBody(req, outcome, outputFilename,
+                         `/api/download/${outputFilename}`, startTime));
+
+    // Clean up uploaded file after successful processing
+    removeFile(inputPath);
 
   } catch (error) {
     console.error('Error in obfuscate endpoint:', error);
     
     // Clean up uploaded file if it exists
-    if (req.file && fs.existsSync(req.file.path)) {
-      fs.unlinkSync(req.file.path);
-    }
+    if (req.file) removeFile(req.file.path);
     
     res.status(500).json({
       error: 'Internal server error',
@@ -306,6 +432,141 @@ app.post('/api/obfuscate', upload.single('file'), async (req, res) => {
   }
 });
 
+// Asynchronous jobs
+//
+// POST /api/jobs accepts the same form as /api/obfuscate but answers 202 as
+// soon as the upload is validated. Progress is available by polling
+// GET /api/jobs/:id or as server-sent events from GET /api/jobs/:id/events;
+// the artifact is served by GET /api/jobs/:id/download once the job is done.
+// Jobs and their outputs are deleted JOB_TTL_MS after they finish.
+const jobStore = new JobStore({
+  ttlMs: parseInt(process.env.JOB_TTL_MS, 10) || undefined,
+  onExpire: (job) => removeFile(job.meta.outputPath)
+});
+
+// POST /api/jobs - Submit an obfuscation job
+app.post('/api/jobs', upload.single('file'), (req, res) => {
+  const startTime = Date.now();
+
+  try {
+    const rejection = validateUpload(req);
+    if (rejection) {
+      return res.status(rejection.status).json(rejection.body);
+    }
+    if (obfuscatorPool && obfuscatorPool.isFull()) {
+      removeFile(req.file.path);
+      console.error('❌ Obfuscation queue is full, rejecting job');
+      return rejectQueueFull(res);
+    }
+
+    const inputPath = req.file.path;
+    const outputFilename = `obfuscated_${req.file.originalname}`;
+    const job = jobStore.create({ originalFile: req.file.originalname });
+    // The job id keeps concurrent uploads of the same name apart
+    const outputPath = path.join(OUTPUT_DIR, `${job.id}-${outputFilename}`);
+    job.meta.outputPath = outputPath;
+    job.meta.outputFilename = outputFilename;
+    const links = {
+      statusUrl: `/api/jobs/${job.id}`,
+      eventsUrl: `/api/jobs/${job.id}/events`,
+      downloadUrl: `/api/jobs/${job.id}/download`
+    };
+
+    console.log(`Queued job ${job.id} for ${req.file.originalname} (${req.body.encryptionType})`);
+
+    runObfuscator({
+      input: inputPath,
+      type: req.body.encryptionType.toLowerCase(),
+      output: outputPath
+    }, (event) => jobStore.progress(job.id, event)).then((outcome) => {
+      if (outcome.code !== 0) {
+        jobStore.fail(job.id, failureBody(outcome));
+      } else {
+        jobStore.finish(job.id, successBody(req, outcome, outputFilename,
+                                            links.downloadUrl, startTime));
+      }
+    }, (error) => {
+      console.error(`Job ${job.id} could not start: ${error.message}`);
+      jobStore.fail(job.id, {
+        error: error.code === 'QUEUE_FULL' ? 'Server busy' : 'Failed to start obfuscation process',
+        details: error.message
+      });
+    }).finally(() => removeFile(inputPath));
+
+    res.status(202).json({ jobId: job.id, status: job.status, ...links });
+  } catch (error) {
+    console.error('Error in jobs endpoint:', error);
+    if (req.file) removeFile(req.file.path);
+    res.status(500).json({
+      error: 'Internal server error',
+      details: error.message
+    });
+  }
+});
+
+// GET /api/jobs/:id - Job status, latest progress event and result
+app.get('/api/jobs/:id', (req, res) => {
+  const job = jobStore.get(req.params.id);
+  if (!job) {
+    return res.status(404).json({ error: 'Job not found' });
+  }
+  res.json(jobStore.toJSON(job));
+});
+
+// GET /api/jobs/:id/events - Server-sent events: replay, then live updates
+app.get('/api/jobs/:id/events', (req, res) => {
+  const job = jobStore.get(req.params.id);
+  if (!job) {
+    return res.status(404).json({ error: 'Job not found' });
+  }
+
+  res.set({
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    Connection: 'keep-alive'
+  });
+  res.flushHeaders();
+
+  // Reconnecting EventSource clients resume after the last id they saw
+  const lastSeq = parseInt(req.get('Last-Event-ID'), 10);
+  let unsubscribe = () => {};
+  let closed = false;
+  const heartbeat = setInterval(() => res.write(': keep-alive\n\n'), 15000);
+  const close = () => {
+    if (closed) return;
+    closed = true;
+    clearInterval(heartbeat);
+    unsubscribe();
+    res.end();
+  };
+
+  unsubscribe = jobStore.subscribe(job.id, (entry) => {
+    const { seq, ...data } = entry;
+    res.write(`id: ${seq}\nevent: ${data.event}\ndata: ${JSON.stringify(data)}\n\n`);
+    if (data.event === 'status' && jobStore.isFinished(job.id)) {
+      setImmediate(close);
+    }
+  }, Number.isNaN(lastSeq) ? -1 : lastSeq);
+  req.on('close', close);
+});
+
+// GET /api/jobs/:id/download - Download a finished job's artifact
+app.get('/api/jobs/:id/download', (req, res) => {
+  const job = jobStore.get(req.params.id);
+  if (!job) {
+    return res.status(404).json({ error: 'Job not found' });
+  }
+  if (job.status !== 'done') {
+    return res.status(409).json({ error: `Job is ${job.status}`, status: job.status });
+  }
+  if (!fs.existsSync(job.meta.outputPath)) {
+    return res.status(404).json({ error: 'File not found' });
+  }
+  res.download(job.meta.outputPath, job.meta.outputFilename, (err) => {
+    if (err) console.error('Error downloading file:', err);
+  });
+});
+
 // GET /api/download/:filename - Download obfuscated file
 app.get('/api/download/:filename', (req, res) => {
   const filename = req.params.filename;
@@ -335,10 +596,47 @@ app.get('/api/health', (req, res) => {
   res.json({
     status: 'OK',
     timestamp: new Date().toISOString(),
-    uptime: process.uptime()
+    uptime: process.uptime(),
+    obfuscatorPool: obfuscatorPool ? obfuscatorPool.status() : null,
+    jobs: jobStore.status()
   });
 });
 
+// GET /api/metrics - Prometheus metrics: pool state plus per-stage worker metrics
+app.get('/api/metrics', (req, res) => {
+  const lines = [];
+  if (obfuscatorPool) {
+    const pool = obfuscatorPool.status();
+    for (const [name, help, value] of [
+      ['simpfuscator_pool_workers', 'Obfuscator worker processes.', pool.size],
+      ['simpfuscator_pool_busy_workers', 'Workers running a job.', pool.busy],
+      ['simpfuscator_pool_queued_jobs', 'Jobs waiting for a worker.', pool.queued],
+      ['simpfuscator_pool_rejected_jobs', 'Jobs rejected because the queue was full.', pool.rejected],
+      ['simpfuscator_pool_worker_restarts', 'Workers replaced after exiting.', pool.restarts],
+      ['simpfuscator_pool_worker_start_failures', 'Workers that exited before becoming ready.',
+       pool.startFailures]
+    ]) {
+      lines.push(`# HELP ${name} ${help}`, `# TYPE ${name} gauge`, `${name} ${value}`);
+    }
+  }
+  for (const [name, help, value] of [
+    ['simpfuscator_upload_bytes_total', 'Bytes of uploads obfuscated successfully.',
+     handoffTotals.uploadBytes],
+    ['simpfuscator_handoff_disk_write_bytes_total',
+     'Bytes written to disk while handing uploads to the obfuscator and back.',
+     handoffTotals.diskBytesWritten]
+  ]) {
+    lines.push(`# HELP ${name} ${help}`, `# TYPE ${name} counter`, `${name} ${value}`);
+  }
+  lines.push('# HELP simpfuscator_async_jobs Asynchronous jobs by status.',
+             '# TYPE simpfuscator_async_jobs gauge');
+  for (const [status, count] of Object.entries(jobStore.status())) {
+    lines.push(`simpfuscator_async_jobs{status="${status}"} ${count}`);
+  }
+  res.type('text/plain; version=0.0.4');
+  res.send(lines.join('\n') + '\n' + (obfuscatorPool ? obfuscatorPool.metrics() : ''));
+});
+
 // Error handling middleware
 app.use((err, req, res, next) => {
   if (err instanceof multer.MulterError) {
@@ -355,7 +653,7 @@ app.use((err, req, res, next) => {
 // Start server
 app.listen(PORT, () => {
   console.log(`🚀 Simpfuscator Backend Server running on port ${PORT}`);
-  console.log(`📁 Upload directory: ${UPLOAD_DIR}`);
+  console.log(`📁 Upload directory: ${storage.tmpfsDir || storage.fallbackDir}`);
   console.log(`📁 Output directory: ${OUTPUT_DIR}`);
   console.log(`🔗 Health check: http://localhost:${PORT}/api/health`);
 });
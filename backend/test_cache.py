@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for the artifact cache and the stub builds that rely on it
+"""
+
+import io
+import os
+import time
+import tempfile
+import contextlib
+import pytest
+import obfuscator
+from cache import ObfuscationCache
+from conftest import run
+from obfuscator import Obfuscator
+
+def test_lru_eviction():
+    print("Testing least-recently-used eviction...")
+    with tempfile.TemporaryDirectory(prefix="test_cache_") as workdir:
+        cache = ObfuscationCache(os.path.join(workdir, "cache"), max_bytes=1 << 20)
+        src = os.path.join(workdir, "artifact")
+        with open(src, "wb") as f:
+            f.write(os.urandom(400 << 10))
+
+        assert cache.get("outputs", "a") is None
+        paths = {key: cache.put("outputs", key, src) for key in "ab"}
+        for age, key in ((300, "a"), (200, "b")):
+            os.utime(paths[key], (time.time() - age,) * 2)
+
+        # Reading "a" makes "b" the least recently used
+        assert cache.get("outputs", "a") == paths["a"]
+        cache.put("outputs", "c", src)
+        assert not os.path.exists(paths["b"]), "The least recently used entry should go"
+        assert os.path.exists(paths["a"]), "A recently read entry should stay"
+        with open(paths["a"], "rb") as a, open(src, "rb") as b:
+            assert a.read() == b.read(), "Cached copy differs from the artifact"
+
+        stats = cache.stats()
+        assert stats["outputs"]["hits"] == 1 and stats["outputs"]["misses"] == 1
+        assert stats["all"]["evictions"] == 1
+        assert stats["entries"] == 2 and stats["bytes"] <= cache.max_bytes
+    print("  ✓ Reads refresh entries and the least recently used one goes first!")
+    print()
+
+def test_stub_evicted_while_building(monkeypatch, hello_elf):
+    print("Testing a stub build whose stub is evicted by another worker...")
+    with tempfile.TemporaryDirectory(prefix="test_cache_") as workdir:
+        # Room for the filler alone, so storing it evicts the stub
+        cache = ObfuscationCache(os.path.join(workdir, "cache"), max_bytes=1 << 20)
+        filler = os.path.join(workdir, "filler")
+        with open(filler, "wb") as f:
+            f.write(os.urandom(1 << 20))
+
+        real_get_stub = obfuscator.get_stub
+        lookups = []
+
+        def get_stub_then_evict(*args, **kwargs):
+            path, cached = real_get_stub(*args, **kwargs)
+            lookups.append(path)
+            if len(lookups) == 1:
+                cache.put("outputs", "other-worker", filler)
+                assert not os.path.exists(path), "The filler should have evicted the stub"
+            return path, cached
+
+        monkeypatch.setattr(obfuscator, "get_stub", get_stub_then_evict)
+        job = Obfuscator(hello_elf)
+        job.cache = cache
+        output = os.path.join(workdir, "hello.out")
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = job.obfuscate("xor", output, use_cache=False)
+
+        assert result["success"], "The build should rebuild the evicted stub"
+        assert len(lookups) == 2, "The stub should be looked up again after eviction"
+        assert run(output) == (7, b"hello\n"), "The protected program misbehaves"
+    print("  ✓ The evicted stub was rebuilt and the output runs!")
+    print()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for the header-only ELF validation done before every build
+"""
+
+import os
+import struct
+import tempfile
+import subprocess
+import pytest
+from conftest import HELLO_SOURCE, build_c
+from elfcheck import check_elf
+
+def write(workdir, name, data):
+    path = os.path.join(workdir, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+def test_check_elf_accepts_executables():
+    print("Testing ELF validation of real executables...")
+    with tempfile.TemporaryDirectory(prefix="test_elfcheck_") as workdir:
+        pie = check_elf(build_c(workdir, "pie", HELLO_SOURCE, ["-pie", "-fPIE"]))
+        assert (pie.elf_class, pie.little_endian, pie.file_type) == (64, True, "DYN")
+        assert pie.load_segments > 0 and pie.interpreter, "A dynamic PIE has PT_INTERP"
+        assert pie.size == os.path.getsize(os.path.join(workdir, "pie"))
+
+        no_pie = check_elf(build_c(workdir, "no-pie", HELLO_SOURCE, ["-no-pie"]))
+        assert no_pie.file_type == "EXEC" and no_pie.entry > 0
+
+        try:
+            static = check_elf(build_c(workdir, "static", HELLO_SOURCE, ["-static"]))
+        except subprocess.CalledProcessError:
+            static = None
+        if static is not None:
+            assert not static.interpreter, "A static program has no PT_INTERP"
+    print("  ✓ PIE, non-PIE and static executables pass!")
+    print()
+
+def test_check_elf_rejects_broken_files(hello_elf):
+    print("Testing ELF validation of broken files...")
+    with tempfile.TemporaryDirectory(prefix="test_elfcheck_") as workdir:
+        with open(hello_elf, "rb") as f:
+            data = f.read()
+        relocatable = build_c(workdir, "hello.o", HELLO_SOURCE, ["-c"])
+
+        # ELF64 header: e_phoff at 32, e_phnum at 56; program headers are 56 bytes
+        phoff = struct.unpack_from("<Q", data, 32)[0]
+        no_phdrs = bytearray(data)
+        struct.pack_into("<H", no_phdrs, 56, 0)
+        cases = [
+            (write(workdir, "script", b"#!/bin/sh\necho hello\n"), "Not an ELF file"),
+            (write(workdir, "tiny", data[:8]), "too small"),
+            (write(workdir, "header", data[:40]), "Truncated ELF header"),
+            (relocatable, "not an executable"),
+            (write(workdir, "no-phdrs", bytes(no_phdrs)), "no program headers"),
+            (write(workdir, "phdrs", data[:phoff + 56]),
+             "Program headers extend past"),
+            (write(workdir, "truncated", data[:len(data) // 2]), "Loadable segment"),
+        ]
+        for path, message in cases:
+            with pytest.raises(ValueError, match=message):
+                check_elf(path)
+        with pytest.raises(OSError):
+            check_elf(os.path.join(workdir, "missing"))
+    print(f"  ✓ All {len(cases)} broken files rejected with a reason!")
+    print()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
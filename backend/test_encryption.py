@@ -3,9 +3,98 @@
 Test script to verify encryption/decryption logic
 """
 
-from encryptor import encrypt_xor, encrypt_rsa, encrypt_aes
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import pytest
+from encryptor import (cipher_module, encrypt_xor, encrypt_rsa, encrypt_aes, encrypt_aes_ctr,
+                       encrypt_chacha20, new_stream, xor_bytes)
+from cipher_rsa import (RSA_BLOCK_SIZE, RSA_PUBLIC_EXPONENT, generate_rsa_key,
+                        rsa_block_table, rsa_encrypt_blocks)
+from loader import loader_headers, pack_key, parallel_func
 from Crypto.Util.Padding import unpad
-from Crypto.Cipher import AES
+from Crypto.Cipher import AES, ChaCha20
+
+# NIST SP 800-38A, F.5.1 (CTR-AES128.Encrypt)
+AES_CTR_KEY = bytes.fromhex("2b7e151628aed2a6abf7158809cf4f3c")
+AES_CTR_IV = bytes.fromhex("f0f1f2f3f4f5f6f7f8f9fafbfcfdfeff")
+AES_CTR_PLAINTEXT = bytes.fromhex(
+    "6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51"
+    "30c81c46a35ce411e5fbc1191a0a52eff69f2445df4f9b17ad2b417be66c3710")
+AES_CTR_CIPHERTEXT = bytes.fromhex(
+    "874d6191b620e3261bef6864990db6ce9806f66b7970fdff8617187bb9fffdff"
+    "5ae4df3edbd5d35e5b4f09020db03eab1e031dda2fbe03d1792170a0f3009cee")
+
+# RFC 8439, 2.4.2. Its 96-bit nonce 00:00:00:00:00:00:00:4a:00:00:00:00 with
+# block counter 1 is this cipher's 64-bit nonce (the last 8 bytes) with the
+# 64-bit block counter at 1
+CHACHA20_KEY = bytes(range(32))
+CHACHA20_NONCE = bytes.fromhex("0000004a00000000")
+CHACHA20_PLAINTEXT = (b"Ladies and Gentlemen of the class of '99: If I could offer you only "
+                      b"one tip for the future, sunscreen would be it.")
+CHACHA20_CIPHERTEXT = bytes.fromhex(
+    "6e2e359a2568f98041ba0728dd0d6981e97e7aec1d4360c20a27afccfd9fae0b"
+    "f91b65c5524733ab8f593dabcd62b3571639d624e65152ab8f530c359f0861d8"
+    "07ca0dbf500d6a6156a38e088a22b65e52bc514d16ccf806818ce91ab7793736"
+    "5af90bbf74a35be6b40b8eedf2785e42874d")
+
+# NIST SP 800-38A, F.2.2 (CBC-AES128.Decrypt); same key and plaintext as
+# the CTR vector
+AES_CBC_IV = bytes(range(16))
+AES_CBC_CIPHERTEXT = bytes.fromhex(
+    "7649abac8119b246cee98e9b12e9197d5086cb9b507219ee95db113a917678b2"
+    "73bed6b8e3c1743b7116e69e222295163ff1caa1681fac09120eca307586e1a7")
+
+# Builds the loader as if the CPU had no AES-NI, so AES-CBC takes its
+# T-table path in every thread
+NO_AESNI_FLAGS = ["-D__builtin_cpu_supports(feature)=0"]
+
+# The AES-CTR T-table path, which the loader only takes without AES-NI
+AES_CTR_TTABLE_CALL = """
+    unsigned char round_keys[176];
+    uint32_t rk[44];
+    aes_key_expansion(key, round_keys);
+    for (int i = 0; i < 44; i++) rk[i] = aes_load32(round_keys + i * 4);
+    aes_ctr_tables_init();
+    decrypt_aes_ctr_ttable(data, len, rk, aes_ctr_at(key + 16, 0));"""
+
+def loader_decrypt(cipher, key, data, threads=1, call=None, cflags=()):
+    """Decrypt `data` with the loader's C decryptor for `cipher`.
+
+    Compiles the decryptor into a small harness that reads the packed key
+    and the ciphertext from stdin, so the SIMD and threaded paths are checked
+    against the Python ciphers, not just against themselves.
+    """
+    if shutil.which("gcc") is None:
+        pytest.skip("gcc is needed to build the loader decryptors")
+    module = cipher_module(cipher)
+    source = f"""{loader_headers}
+{parallel_func}
+{module.DECRYPTOR}
+
+int main(int argc, char **argv) {{
+    static unsigned char key[64];
+    size_t cap = 16u << 20;
+    unsigned char *data = malloc(cap);
+    int threads = argc > 1 ? atoi(argv[1]) : 1;
+    if (!data || fread(key, 1, sizeof(key), stdin) != sizeof(key)) return 1;
+    size_t len = fread(data, 1, cap, stdin);
+    {call or module.DECRYPT_CALL}
+    fwrite(data, 1, len, stdout);
+    return 0;
+}}
+"""
+    with tempfile.TemporaryDirectory(prefix="test_decryptor_") as workdir:
+        src = os.path.join(workdir, "harness.c")
+        exe = os.path.join(workdir, "harness")
+        with open(src, "w") as f:
+            f.write(source)
+        subprocess.run(["gcc", "-O2", "-pthread", *cflags, src, "-o", exe], check=True)
+        run = subprocess.run([exe, str(threads)], input=pack_key(cipher, key) + data,
+                             stdout=subprocess.PIPE, check=True)
+    return run.stdout
 
 def test_xor():
     print("Testing XOR Encryption...")
@@ -29,6 +118,34 @@ def test_xor():
         print(f"    Got: {decrypted}")
     print()
 
+def test_xor_rolling_key():
+    print("Testing bulk XOR with a multi-byte rolling key...")
+    original = b"Hello, World! This is a test." * 1000
+    key = b"\x13\x37\xc0\xde\xba\xad\xf0\x0d"
+    
+    # Encrypt in two pieces; the second continues at the right key position
+    split = 12345
+    encrypted = xor_bytes(original[:split], key) + xor_bytes(original[split:], key, split)
+    print(f"  Original length: {len(original)}")
+    print(f"  Key: {key.hex()}")
+    
+    # Decrypt in one go with the reference per-byte implementation
+    decrypted = bytes(a ^ key[i % len(key)] for i, a in enumerate(encrypted))
+    
+    # Verify
+    assert decrypted == original, "Rolling-key XOR decryption failed"
+    print("  ✓ Rolling-key XOR encryption/decryption works correctly!")
+
+    # Buffers past XOR_BLOCK_SIZE take the word-wide path (with numpy),
+    # including a tail that is not a whole block
+    original = os.urandom((200 << 10) + 5)
+    for key in (b"\x5a", key, os.urandom(13)):
+        encrypted = xor_bytes(original, key, 3)
+        expected = bytes(a ^ key[(i + 3) % len(key)] for i, a in enumerate(original))
+        assert encrypted == expected, f"{len(key)}-byte XOR key gave wrong ciphertext"
+    print("  ✓ Large-buffer XOR matches the per-byte reference!")
+    print()
+
 def test_rsa():
     print("Testing RSA Block Encryption...")
     original = b"Hello, World! This is a test."
@@ -67,14 +184,42 @@ def test_rsa():
     decrypted = b''.join(decrypted_blocks)[:len(original)]
     
     # Verify
-    if decrypted == original:
-        print("  ✓ RSA encryption/decryption works correctly!")
-    else:
-        print("  ✗ RSA decryption failed!")
-        print(f"    Expected: {original}")
-        print(f"    Got: {decrypted}")
-        print(f"    Expected length: {len(original)}")
-        print(f"    Got length: {len(decrypted)}")
+    assert decrypted == original, "RSA decryption failed"
+    print("  ✓ RSA encryption/decryption works correctly!")
+    print()
+
+def rsa_reference(data, e, n):
+    """Per-block pow(m, e, n) over zero-padded 2-byte blocks."""
+    if len(data) % RSA_BLOCK_SIZE:
+        data += bytes(RSA_BLOCK_SIZE - len(data) % RSA_BLOCK_SIZE)
+    return b''.join(pow(int.from_bytes(data[i:i + 2], 'big'), e, n).to_bytes(4, 'big')
+                    for i in range(0, len(data), 2))
+
+def test_rsa_table(monkeypatch):
+    print("Testing RSA table encryption against per-block pow()...")
+    d, n, _ = generate_rsa_key()
+    table = rsa_block_table(RSA_PUBLIC_EXPONENT, n)
+    # Every possible block once, then odd lengths and a single byte
+    every_block = b''.join(m.to_bytes(2, 'big') for m in range(1 << 16))
+    inputs = [every_block, os.urandom(10001), os.urandom(4096), b'\xa5', b'']
+    expected = [rsa_reference(data, RSA_PUBLIC_EXPONENT, n) for data in inputs]
+
+    pytest.importorskip("numpy")
+    for data, want in zip(inputs, expected):
+        assert rsa_encrypt_blocks(data, table) == want, \
+            f"numpy gather differs from pow() on {len(data)} bytes"
+    # Without numpy the gather goes through array
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    for data, want in zip(inputs, expected):
+        assert rsa_encrypt_blocks(data, table) == want, \
+            f"array gather differs from pow() on {len(data)} bytes"
+
+    # Streams keep an odd byte for the next chunk
+    stream = new_stream('rsa', (d, n, RSA_BLOCK_SIZE))
+    data = inputs[1]
+    encrypted = b''.join(stream.update(data[i:i + 333]) for i in range(0, len(data), 333))
+    assert encrypted + stream.finalize() == expected[1], "Chunked RSA stream differs"
+    print("  ✓ Table encryption matches pow() with and without numpy!")
     print()
 
 def test_aes():
@@ -99,17 +244,145 @@ def test_aes():
     decrypted = unpad(decrypted_padded, AES.block_size)
     
     # Verify
-    if decrypted == original:
-        print("  ✓ AES encryption/decryption works correctly!")
-    else:
-        print("  ✗ AES decryption failed!")
-        print(f"    Expected: {original}")
-        print(f"    Got: {decrypted}")
-        print(f"    Expected length: {len(original)}")
-        print(f"    Got length: {len(decrypted)}")
+    assert decrypted == original, "AES decryption failed"
+    assert original_len == len(original), "AES key records the wrong length"
+    print("  ✓ AES encryption/decryption works correctly!")
+    print()
+
+def test_aes_loader():
+    print("Testing the loader's AES-CBC decryptor...")
+    key = (AES_CTR_KEY, AES_CBC_IV, len(AES_CTR_PLAINTEXT))
+    assert AES.new(AES_CTR_KEY, AES.MODE_CBC, AES_CBC_IV).encrypt(AES_CTR_PLAINTEXT) \
+        == AES_CBC_CIPHERTEXT
+    # Known answer through the AES-NI path (when the CPU has it) and the
+    # T-table path
+    for cflags in ((), NO_AESNI_FLAGS):
+        decrypted = loader_decrypt('aes', key, AES_CBC_CIPHERTEXT, cflags=cflags)
+        assert decrypted == AES_CTR_PLAINTEXT, "Loader AES-CBC does not match the SP 800-38A vector"
+
+    # Four-block batches plus single blocks; then 262,149 blocks, which four
+    # threads cannot split evenly, each chaining from the block before its range
+    for size, threads in ((16 * 4 * 3 + 16 * 3 - 5, 1), ((4 << 20) + 16 * 5 - 5, 4)):
+        original = os.urandom(size)
+        encrypted, key = encrypt_aes(original)
+        for cflags in ((), NO_AESNI_FLAGS):
+            decrypted = loader_decrypt('aes', key, encrypted, threads, cflags=cflags)
+            assert unpad(decrypted, AES.block_size) == original, \
+                f"Loader AES-CBC failed on {size} bytes with {threads} threads"
+    print("  ✓ Loader AES-CBC matches the test vector on both paths and with threads!")
+    print()
+
+def test_aes_ctr():
+    print("Testing AES-128 CTR Encryption...")
+    original = b"Hello, World! This is a test for AES-CTR encryption." * 3
+    
+    # Encrypt
+    encrypted, key = encrypt_aes_ctr(original)
+    aes_key, iv = key
+    
+    print(f"  Original length: {len(original)} bytes")
+    print(f"  Encrypted length: {len(encrypted)} bytes")
+    print(f"  Key: {aes_key.hex()[:32]}...")
+    print(f"  IV: {iv.hex()[:32]}...")
+    
+    # Decrypt from block 3 on its own, as a loader thread does: the counter
+    # block is just the IV plus the block index
+    start = 3
+    counter = (int.from_bytes(iv, 'big') + start) % (1 << 128)
+    cipher = AES.new(aes_key, AES.MODE_CTR, nonce=b'', initial_value=counter.to_bytes(16, 'big'))
+    tail = cipher.decrypt(encrypted[start * 16:])
+    
+    # Verify
+    assert len(encrypted) == len(original), "AES-CTR changed the payload length"
+    assert tail == original[start * 16:], "AES-CTR random-access decryption failed"
+    print("  ✓ AES-CTR encryption and random-access decryption work correctly!")
+
+    # Known answer
+    stream = new_stream('aes-ctr', (AES_CTR_KEY, AES_CTR_IV))
+    assert stream.update(AES_CTR_PLAINTEXT) + stream.finalize() == AES_CTR_CIPHERTEXT, \
+        "AES-CTR does not match the SP 800-38A vector"
+    print("  ✓ AES-CTR matches the SP 800-38A test vector!")
+    print()
+
+def test_aes_ctr_loader():
+    print("Testing the loader's AES-CTR decryptor...")
+    key = (AES_CTR_KEY, AES_CTR_IV)
+    # Known answer through the runtime-selected path (AES-NI when present)
+    # and through the T-table fallback
+    for call in (None, AES_CTR_TTABLE_CALL):
+        assert loader_decrypt('aes-ctr', key, AES_CTR_CIPHERTEXT, call=call) == AES_CTR_PLAINTEXT, \
+            "Loader AES-CTR does not match the SP 800-38A vector"
+
+    # Eight-block batches plus a partial block, and four threads that each
+    # start mid-stream
+    for size, threads in ((16 * 8 * 3 + 16 * 5 + 7, 1), ((4 << 20) + 100, 4)):
+        original = os.urandom(size)
+        encrypted, key = encrypt_aes_ctr(original)
+        for call in (None, AES_CTR_TTABLE_CALL):
+            decrypted = loader_decrypt('aes-ctr', key, encrypted, threads, call)
+            assert decrypted == original, f"Loader AES-CTR failed on {size} bytes"
+    print("  ✓ Loader AES-CTR matches the test vector and the Python cipher!")
+    print()
+
+def test_rsa_loader():
+    print("Testing the loader's RSA decryptor...")
+    # pow_mod per block below RSA_TABLE_MIN_BLOCKS (32,768 blocks) and the
+    # inverse table above it, with two threads compacting their ranges
+    for size, threads in ((1001, 1), (3 * 32768 * 2 + 7, 1), (3 * 32768 * 2 + 7, 2)):
+        original = os.urandom(size)
+        encrypted, key = encrypt_rsa(original)
+        decrypted = loader_decrypt('rsa', key, encrypted, threads)
+        assert decrypted[:size] == original, \
+            f"Loader RSA failed on {size} bytes with {threads} threads"
+    print("  ✓ Loader RSA round-trips with and without its inverse table!")
+    print()
+
+def test_chacha20():
+    print("Testing ChaCha20 Encryption...")
+    original = b"Hello, World! This is a test for ChaCha20 encryption." * 5
+    
+    # Encrypt
+    encrypted, key = encrypt_chacha20(original)
+    chacha_key, nonce = key
+    
+    print(f"  Original length: {len(original)} bytes")
+    print(f"  Encrypted length: {len(encrypted)} bytes")
+    print(f"  Key: {chacha_key.hex()[:32]}...")
+    print(f"  Nonce: {nonce.hex()}")
+    
+    # Decrypt from the second 64-byte block on its own
+    cipher = ChaCha20.new(key=chacha_key, nonce=nonce)
+    cipher.seek(64)
+    tail = cipher.decrypt(encrypted[64:])
+    
+    # Verify
+    assert len(encrypted) == len(original), "ChaCha20 changed the payload length"
+    assert tail == original[64:], "ChaCha20 random-access decryption failed"
+    print("  ✓ ChaCha20 encryption and random-access decryption work correctly!")
+
+    # Known answer; the vector starts at block 1
+    stream = new_stream('chacha20', (CHACHA20_KEY, CHACHA20_NONCE))
+    encrypted = stream.update(bytes(64) + CHACHA20_PLAINTEXT) + stream.finalize()
+    assert encrypted[64:] == CHACHA20_CIPHERTEXT, "ChaCha20 does not match the RFC 8439 vector"
+    print("  ✓ ChaCha20 matches the RFC 8439 test vector!")
+    print()
+
+def test_chacha20_loader():
+    print("Testing the loader's ChaCha20 decryptor...")
+    key = (CHACHA20_KEY, CHACHA20_NONCE)
+    decrypted = loader_decrypt('chacha20', key, bytes(64) + CHACHA20_CIPHERTEXT)
+    assert decrypted[64:] == CHACHA20_PLAINTEXT, "Loader ChaCha20 does not match the RFC 8439 vector"
+
+    # 512 bytes go through the AVX2 8-block path (when the CPU has it), the
+    # next 256 through the SSE2 4-block path and the rest block by block;
+    # with four threads each one starts mid-stream
+    for size, threads in ((512 + 256 + 100, 1), (256 + 100, 1), ((4 << 20) + 100, 4)):
+        original = os.urandom(size)
+        encrypted, key = encrypt_chacha20(original)
+        decrypted = loader_decrypt('chacha20', key, encrypted, threads)
+        assert decrypted == original, f"Loader ChaCha20 failed on {size} bytes"
+    print("  ✓ Loader ChaCha20 matches the test vector and the Python cipher!")
     print()
 
 if __name__ == "__main__":
-    test_xor()
-    test_rsa()
-    test_aes()
+    pytest.main([__file__, "-q", "-s"])
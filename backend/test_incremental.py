@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for incremental builds: chunking, manifests and rebuilds
+"""
+
+import os
+import sys
+import json
+import random
+import tempfile
+import pytest
+import conftest
+import incremental
+from conftest import build_c, run
+from incremental import CHUNK_MAX, CHUNK_MIN, PreviousBuild, chunk_boundaries
+
+PROJECT_KEY = "test-incremental-project-key"
+
+def chunks_of(data, ends):
+    starts = [0] + ends[:-1]
+    return [data[s:e] for s, e in zip(starts, ends)]
+
+def program_source(factor):
+    """A program with a 256 KB table, so it spans dozens of chunks."""
+    table = ",".join(str((i * 2654435761) & 0xffffffff) for i in range(64 << 10))
+    return (f"#include <stdio.h>\nstatic const unsigned table[] = {{{table}}};\n"
+            f"int main(int argc, char **argv) {{\n"
+            f"    unsigned x = table[(unsigned)argc * 977u % {64 << 10}] * {factor}u;\n"
+            f"    (void)argv;\n    printf(\"%u\\n\", x & 0xffff);\n    return 0;\n}}\n")
+
+def build_program(workdir, name, factor):
+    return build_c(workdir, name, program_source(factor))
+
+def protect(path, output, manifest):
+    return conftest.protect(path, output, "chacha20", mode="incremental",
+                            key_seed=PROJECT_KEY, manifest=manifest)
+
+def test_chunk_boundaries_numpy_matches_python(monkeypatch):
+    print("Testing the numpy and pure-Python boundary scans...")
+    pytest.importorskip("numpy")
+    rng = random.Random(1)
+    # Random bytes, long zero runs (no boundaries, so CHUNK_MAX cuts) and
+    # repeated text; small scan windows put window seams everywhere
+    data = (rng.randbytes(300 << 10) + bytes(200 << 10)
+            + b"incremental builds " * (10 << 10) + rng.randbytes(12345))
+    monkeypatch.setattr(incremental, "SCAN_BLOCK", 64 << 10)
+    with_numpy = chunk_boundaries(data)
+
+    def no_numpy(*args):
+        raise AssertionError("numpy must not be used")
+    monkeypatch.setattr(incremental, "_candidates_numpy", no_numpy)
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    without_numpy = chunk_boundaries(data)
+    assert with_numpy == without_numpy, "numpy and Python scans disagree"
+
+    sizes = [b - a for a, b in zip([0] + with_numpy[:-1], with_numpy)]
+    assert with_numpy[-1] == len(data)
+    assert all(CHUNK_MIN <= size <= CHUNK_MAX for size in sizes[:-1])
+    assert max(sizes) == CHUNK_MAX, "The zero run should be cut at CHUNK_MAX"
+    print(f"  ✓ Both scans cut {len(data)} bytes into the same {len(sizes)} chunks!")
+    print()
+
+def test_chunk_boundaries_survive_insertion():
+    print("Testing chunk boundaries after an insertion...")
+    data = random.Random(2).randbytes(1 << 20)
+    edited = data[:500000] + b"inserted bytes" + data[500000:]
+    before = chunks_of(data, chunk_boundaries(data))
+    after = chunks_of(edited, chunk_boundaries(edited))
+    unchanged = set(before)
+    changed = [chunk for chunk in after if chunk not in unchanged]
+    # Only the chunk holding the insertion (and at most its neighbour) differ
+    assert 1 <= len(changed) <= 2, f"{len(changed)} chunks changed"
+    assert b"".join(after) == edited
+    print(f"  ✓ {len(after) - len(changed)} of {len(after)} chunks unchanged!")
+    print()
+
+def test_rebuild_matches_clean_build():
+    print("Testing an incremental rebuild against a clean build...")
+    with tempfile.TemporaryDirectory(prefix="test_incremental_") as workdir:
+        v1 = build_program(workdir, "v1", 3)
+        v2 = build_program(workdir, "v2", 5)
+        output = os.path.join(workdir, "app")
+        manifest = os.path.join(workdir, "app.manifest.json")
+        protect(v1, output, manifest)
+        assert run(output) == run(v1)
+
+        result = protect(v2, output, manifest)
+        info = result["incremental"]
+        assert 0 < info["reused_chunks"] < info["chunks"], "The rebuild should reuse chunks"
+        assert run(output) == run(v2), "The rebuilt program misbehaves"
+
+        clean = os.path.join(workdir, "clean")
+        protect(v2, clean, os.path.join(workdir, "clean.manifest.json"))
+        with open(output, "rb") as a, open(clean, "rb") as b:
+            assert a.read() == b.read(), "Reused chunks differ from freshly encrypted ones"
+    print(f"  ✓ Reused {info['reused_chunks']} of {info['chunks']} chunks, "
+          "output identical to a clean build!")
+    print()
+
+def test_stale_manifest_is_ignored():
+    print("Testing a manifest whose artifact changed...")
+    with tempfile.TemporaryDirectory(prefix="test_incremental_") as workdir:
+        v1 = build_program(workdir, "v1", 3)
+        output = os.path.join(workdir, "app")
+        manifest = os.path.join(workdir, "app.manifest.json")
+        protect(v1, output, manifest)
+        with open(manifest) as f:
+            chunks = json.load(f)["chunks"]
+        digest = bytes.fromhex(chunks[0]["digest"])
+        project_key = PROJECT_KEY.encode()
+
+        previous = PreviousBuild(manifest, "chacha20", project_key)
+        assert previous.read(digest) is not None, "A fresh manifest should be used"
+        previous.close()
+        assert PreviousBuild(manifest, "aes-ctr", project_key).read(digest) is None
+        assert PreviousBuild(manifest, "chacha20", b"another key").read(digest) is None
+
+        # Same size, different mtime
+        st = os.stat(output)
+        os.utime(output, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert PreviousBuild(manifest, "chacha20", project_key).read(digest) is None
+        # Different size, manifest's mtime
+        with open(output, "ab") as f:
+            f.write(b"\0")
+        os.utime(output, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert PreviousBuild(manifest, "chacha20", project_key).read(digest) is None
+
+        # A rebuild over the stale manifest encrypts everything and still runs
+        result = protect(v1, output, manifest)
+        assert result["incremental"]["reused_chunks"] == 0
+        assert run(output) == run(v1)
+    print("  ✓ Manifests of changed artifacts, other ciphers and other keys are ignored!")
+    print()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
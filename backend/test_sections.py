@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for in-place section encryption (-m sections) and its lazy mode
+"""
+
+import os
+import signal
+import tempfile
+import subprocess
+import pytest
+import sections
+import conftest
+from conftest import run
+
+# A worker thread started with every signal blocked calls a function on a
+# page of its own, which nothing has executed before
+BLOCKED_SIGNALS_SOURCE = r'''
+#include <pthread.h>
+#include <signal.h>
+#include <stdio.h>
+
+__attribute__((noinline, aligned(4096))) int far_away(int x) { return x * 3 + 1; }
+
+static void *worker(void *arg) { return (void *)(long)far_away((int)(long)arg); }
+
+int main(void) {
+    sigset_t all;
+    pthread_t thread;
+    void *result;
+    sigfillset(&all);
+    pthread_sigmask(SIG_BLOCK, &all, NULL);
+    pthread_create(&thread, NULL, worker, (void *)13L);
+    pthread_join(thread, &result);
+    printf("%ld\n", (long)result);
+    return 0;
+}
+'''
+
+PLAIN_SOURCE = r'''
+#include <stdio.h>
+
+__attribute__((noinline, aligned(4096))) int far_away(int x) { return x * 3 + 1; }
+
+int main(int argc, char **argv) {
+    (void)argv;
+    printf("%d\n", far_away(argc + 12));
+    return 0;
+}
+'''
+
+def build(workdir, name, source, flags=()):
+    pytest.importorskip("lief")
+    return conftest.build_c(workdir, name, source, ["-pthread", *flags])
+
+def protect(path, output, lazy):
+    return conftest.protect(path, output, "xor", mode="sections", lazy=lazy, use_cache=False)
+
+def test_lazy_sections():
+    print("Testing lazy section decryption...")
+    with tempfile.TemporaryDirectory(prefix="test_sections_") as workdir:
+        program = build(workdir, "plain", PLAIN_SOURCE)
+        output = os.path.join(workdir, "plain.lazy")
+        protect(program, output, lazy=True)
+        assert run(output) == run(program) == (0, b"40\n"), "Lazy build changed the output"
+    print("  ✓ Lazy build runs like the original!")
+    print()
+
+def test_lazy_refuses_blocked_signals(monkeypatch):
+    print("Testing lazy mode with a thread that blocks every signal...")
+    with tempfile.TemporaryDirectory(prefix="test_sections_") as workdir:
+        program = build(workdir, "blocked", BLOCKED_SIGNALS_SOURCE)
+        assert run(program) == (0, b"40\n")
+
+        # Eager section decryption does not depend on signals
+        eager = os.path.join(workdir, "blocked.eager")
+        protect(program, eager, lazy=False)
+        assert run(eager) == (0, b"40\n"), "Eager build changed the output"
+
+        lazy = os.path.join(workdir, "blocked.lazy")
+        with pytest.raises(ValueError, match="pthread_sigmask"):
+            protect(program, lazy, lazy=True)
+
+        # What the check prevents: the fault on the untouched page arrives
+        # with SIGSEGV blocked, so the kernel kills the process
+        monkeypatch.setattr(sections, "_check_lazy_program", lambda binary: None)
+        protect(program, lazy, lazy=True)
+        assert run(lazy)[0] == -signal.SIGSEGV
+    print("  ✓ Lazy mode refuses a program that blocks SIGSEGV!")
+    print()
+
+def test_lazy_refuses_static_programs():
+    print("Testing lazy mode with a statically linked program...")
+    with tempfile.TemporaryDirectory(prefix="test_sections_") as workdir:
+        try:
+            program = build(workdir, "static", PLAIN_SOURCE, ["-static"])
+        except subprocess.CalledProcessError:
+            pytest.skip("static libc is not installed")
+        with pytest.raises(ValueError, match="dynamically linked"):
+            protect(program, os.path.join(workdir, "static.lazy"), lazy=True)
+    print("  ✓ Lazy mode refuses a static program!")
+    print()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the build workspace: per-build cleanup, quota and gc
+"""
+
+import os
+import time
+import fcntl
+import tempfile
+import pytest
+import workspace
+from workspace import LOCK_NAME, BuildWorkspace, WorkspaceFull
+
+def make_dir(root, name, size, locked=False):
+    """A worker directory holding `size` bytes, its lock held if `locked`."""
+    path = os.path.join(root, name)
+    os.makedirs(path)
+    with open(os.path.join(path, "payload.bin"), "wb") as f:
+        f.write(bytes(size))
+    lock = open(os.path.join(path, LOCK_NAME), "w")
+    if locked:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return path, lock
+    lock.close()
+    return path, None
+
+def test_build_dir_is_emptied():
+    print("Testing that each build gets an empty directory...")
+    with tempfile.TemporaryDirectory(prefix="test_workspace_") as root:
+        ws = BuildWorkspace(root, max_bytes=1 << 20)
+        with ws.build_dir() as path:
+            with open(os.path.join(path, "gen.c"), "wb") as f:
+                f.write(bytes(1000))
+            # A build started inside another one gets its own subdirectory
+            with ws.build_dir() as nested:
+                assert nested != path and nested.startswith(path)
+                assert os.listdir(nested) == []
+        assert os.listdir(path) == [LOCK_NAME], "Build files should be removed"
+        assert not os.path.exists(nested)
+
+        with pytest.raises(RuntimeError):
+            with ws.build_dir() as again:
+                open(os.path.join(again, "gen.c"), "w").close()
+                raise RuntimeError("gcc failed")
+        assert again == path and os.listdir(path) == [LOCK_NAME], \
+            "A failed build should be cleaned up too"
+        assert ws.counters["builds"] == 3 and ws.counters["peak_build_bytes"] == 1000
+        ws.close()
+        assert not os.path.exists(path)
+    print("  ✓ Build directories are reused and emptied after every build!")
+    print()
+
+def test_quota_and_gc():
+    print("Testing the workspace quota and stale directory collection...")
+    with tempfile.TemporaryDirectory(prefix="test_workspace_") as root:
+        ws = BuildWorkspace(root, max_bytes=1 << 20)
+        stale, _ = make_dir(root, "worker-1-crashed", 600 << 10)
+        alive, lock = make_dir(root, "worker-2-alive", 300 << 10, locked=True)
+        fresh_init, _ = make_dir(root, ".init-fresh", 10)
+        old_init, _ = make_dir(root, ".init-old", 10)
+        old = time.time() - workspace.INIT_GRACE_SECONDS - 1
+        os.utime(old_init, (old, old))
+
+        # 900 KB in use: this build only fits after the crashed worker's
+        # directory is collected
+        with ws.build_dir(reserve=400 << 10) as path:
+            assert os.path.basename(path).startswith(f"worker-{os.getpid()}-")
+        assert not os.path.exists(stale) and not os.path.exists(old_init)
+        assert os.path.exists(alive) and os.path.exists(fresh_init), \
+            "Directories of live processes must be kept"
+        assert ws.counters["stale_dirs_reclaimed"] == 2
+        assert ws.counters["stale_bytes_reclaimed"] >= 600 << 10
+
+        # The live worker's 300 KB cannot be reclaimed
+        with pytest.raises(WorkspaceFull, match="quota"):
+            with ws.build_dir(reserve=800 << 10):
+                pass
+        assert ws.counters["quota_rejections"] == 1
+        assert os.path.exists(path), "gc() must not remove our own directory"
+
+        lock.close()
+        ws.gc()
+        assert not os.path.exists(alive), "An exited worker's directory should be collected"
+        with ws.build_dir(reserve=800 << 10):
+            pass
+        ws.close()
+    print("  ✓ Stale directories are collected and the quota is enforced!")
+    print()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
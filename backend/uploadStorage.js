@@ -0,0 +1,114 @@
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const crypto = require('crypto');
+
+// Multer storage engine for obfuscation uploads.
+//
+// With multer.diskStorage every upload was written to backend/uploads and
+// then read back whole into memory, once to check the ELF magic and once more
+// (by hashing that buffer) for the signature check. SpoolStorage does both
+// while the upload streams in: each chunk is hashed and written once, and the
+// first HEADER_BYTES are kept, so validation reads nothing back. The spool
+// file is what the obfuscator mmaps, so it is the only copy of the upload.
+//
+// Uploads are spooled to tmpfs (/dev/shm) when it is mounted and has room for
+// a maximum-size upload, so they never reach a disk; otherwise, or when
+// UPLOAD_DIR is set, they go to that directory. Besides multer's usual
+// fields, the stored file carries:
+//
+//   file.sha256  SHA-256 digest of the upload (Buffer)
+//   file.header  its first HEADER_BYTES bytes (Buffer)
+//   file.spool   'tmpfs' or 'disk'
+
+const HEADER_BYTES = 64;
+
+const TMPFS_DIR = '/dev/shm';
+const TMPFS_MAGIC = 0x01021994;
+
+function isTmpfs(dir) {
+  try {
+    return fs.statfsSync(dir).type === TMPFS_MAGIC;
+  } catch (e) {
+    return false;
+  }
+}
+
+// Free bytes on the file system holding `dir`
+function freeBytes(dir) {
+  try {
+    const st = fs.statfsSync(dir);
+    return st.bavail * st.bsize;
+  } catch (e) {
+    return 0;
+  }
+}
+
+class SpoolStorage {
+  // fallbackDir: used when tmpfs is missing or full; maxFileSize: the upload
+  // limit, which tmpfs must have room for before an upload is spooled there
+  constructor(options) {
+    this.maxFileSize = options.maxFileSize;
+    this.fallbackDir = options.fallbackDir;
+    this.tmpfsDir = null;
+    if (process.env.UPLOAD_DIR) {
+      this.fallbackDir = process.env.UPLOAD_DIR;
+    } else if (process.platform === 'linux' && isTmpfs(TMPFS_DIR)) {
+      this.tmpfsDir = path.join(TMPFS_DIR, `simpfuscator-uploads-${os.userInfo().uid}`);
+      fs.mkdirSync(this.tmpfsDir, { recursive: true, mode: 0o700 });
+    }
+    fs.mkdirSync(this.fallbackDir, { recursive: true });
+  }
+
+  // Directory for the next upload and whether it is on tmpfs
+  _destination() {
+    if (this.tmpfsDir && freeBytes(this.tmpfsDir) >= this.maxFileSize) {
+      return [this.tmpfsDir, 'tmpfs'];
+    }
+    return [this.fallbackDir, 'disk'];
+  }
+
+  _handleFile(req, file, cb) {
+    const [destination, spool] = this._destination();
+    const uniqueSuffix = Date.now() + '-' + Math.round(Math.random() * 1E9);
+    const filename = uniqueSuffix + '-' + path.basename(file.originalname);
+    const filePath = path.join(destination, filename);
+
+    const hash = crypto.createHash('sha256');
+    const header = [];
+    let headerLength = 0;
+    let size = 0;
+    const out = fs.createWriteStream(filePath, { mode: 0o600 });
+
+    file.stream.on('data', (chunk) => {
+      hash.update(chunk);
+      size += chunk.length;
+      if (headerLength < HEADER_BYTES) {
+        const part = chunk.subarray(0, HEADER_BYTES - headerLength);
+        header.push(Buffer.from(part));
+        headerLength += part.length;
+      }
+    });
+    file.stream.pipe(out);
+    out.on('error', (error) => {
+      fs.unlink(filePath, () => cb(error));
+    });
+    out.on('finish', () => {
+      cb(null, {
+        destination,
+        filename,
+        path: filePath,
+        size,
+        sha256: hash.digest(),
+        header: Buffer.concat(header),
+        spool
+      });
+    });
+  }
+
+  _removeFile(req, file, cb) {
+    fs.unlink(file.path, cb);
+  }
+}
+
+module.exports = { SpoolStorage, HEADER_BYTES };
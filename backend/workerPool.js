@@ -0,0 +1,304 @@
+const path = require('path');
+const os = require('os');
+const fs = require('fs');
+const readline = require('readline');
+const { spawn } = require('child_process');
+
+// Bounded pool of long-lived `obfuscator.py --worker` processes.
+//
+// Each worker keeps Python, lief and pycryptodome loaded and handles one job
+// at a time over a JSON-lines protocol on stdin/stdout. Jobs beyond the pool
+// size wait in a FIFO queue; once the queue is full, run() rejects with
+// code QUEUE_FULL so the HTTP layer can apply backpressure (503). Progress
+// events a worker sends while a job runs are passed to that job's
+// onProgress callback.
+//
+// A worker that exits before reporting ready (a broken import, a missing
+// lief, python3 not on PATH) is restarted with exponential backoff. After
+// maxStartFailures such exits in a row its slot is given up; once every
+// slot has given up, queued and new jobs are rejected with code
+// WORKERS_UNAVAILABLE instead of waiting for their timeout.
+//
+// Workers write Prometheus metrics to metricsDir after every job
+// (metrics.py); metrics() merges them into one exposition for /api/metrics.
+
+class QueueFullError extends Error {
+  constructor(limit) {
+    super(`Obfuscation queue is full (${limit} jobs waiting)`);
+    this.code = 'QUEUE_FULL';
+  }
+}
+
+class WorkersUnavailableError extends Error {
+  constructor(reason) {
+    super(`Obfuscator workers could not be started: ${reason}`);
+    this.code = 'WORKERS_UNAVAILABLE';
+  }
+}
+
+class ObfuscatorPool {
+  constructor(options = {}) {
+    this.size = options.size || Math.max(1, os.cpus().length);
+    this.maxQueue = options.maxQueue !== undefined ? options.maxQueue : this.size * 4;
+    this.jobTimeoutMs = options.jobTimeoutMs || 10 * 60 * 1000;
+    this.python = options.python || (process.platform === 'win32' ? 'python' : 'python3');
+    this.script = options.script || path.join(__dirname, 'obfuscator.py');
+    this.metricsDir = options.metricsDir ||
+      path.join(os.tmpdir(), `simpfuscator-metrics-${process.pid}`);
+    this.restartDelayMs = options.restartDelayMs !== undefined ? options.restartDelayMs : 100;
+    this.maxRestartDelayMs = options.maxRestartDelayMs || 30 * 1000;
+    this.maxStartFailures = options.maxStartFailures || 6;
+
+    this.workers = [];
+    this.queue = [];
+    this.nextJobId = 1;
+    this.closed = false;
+    // Set once every worker slot has given up restarting
+    this.unavailable = null;
+    this.stats = { completed: 0, failed: 0, rejected: 0, restarts: 0, startFailures: 0 };
+
+    for (let i = 0; i < this.size; i++) {
+      this.workers.push(this._spawnWorker(0));
+    }
+  }
+
+  // startFailures: exits before `ready` in a row for this slot so far
+  _spawnWorker(startFailures) {
+    const proc = spawn(this.python, [this.script, '--worker'], {
+      stdio: ['pipe', 'pipe', 'pipe'],
+      env: { ...process.env, SIMPFUSCATOR_METRICS_DIR: this.metricsDir }
+    });
+    const worker = { proc, ready: false, job: null, stderr: '', startFailures, gone: false };
+
+    readline.createInterface({ input: proc.stdout }).on('line', (line) => {
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (e) {
+        console.error(`Worker ${proc.pid} sent invalid line: ${line}`);
+        return;
+      }
+      if (message.event === 'ready') {
+        worker.ready = true;
+        worker.startFailures = 0;
+        this._dispatch();
+        return;
+      }
+      if (message.event === 'progress') {
+        const job = worker.job;
+        if (job && job.onProgress && message.id === job.id) job.onProgress(message);
+        return;
+      }
+      this._finish(worker, message);
+    });
+
+    proc.stderr.on('data', (data) => {
+      // Kept while starting too, to explain a worker that never gets ready
+      if (worker.job || !worker.ready) worker.stderr = (worker.stderr + data.toString()).slice(-4096);
+    });
+
+    // A failed spawn emits 'error' and may not emit 'exit'
+    proc.on('error', (error) => {
+      console.error(`Failed to start obfuscator worker: ${error.message}`);
+      this._workerGone(worker, error.message);
+    });
+
+    proc.on('exit', (code, signal) => {
+      this._workerGone(worker, `exited (${signal || code})`);
+    });
+
+    return worker;
+  }
+
+  _workerGone(worker, reason) {
+    if (worker.gone) return;
+    worker.gone = true;
+    const proc = worker.proc;
+    if (proc.pid) {
+      // A replacement worker starts its counters from zero
+      fs.rm(path.join(this.metricsDir, `worker-${proc.pid}.prom`), { force: true }, () => {});
+    }
+    const job = worker.job;
+    worker.job = null;
+    if (job) {
+      clearTimeout(job.timer);
+      this.stats.failed++;
+      job.reject(Object.assign(
+        new Error(`Obfuscator worker ${reason} during job`),
+        { stderr: worker.stderr }
+      ));
+    }
+    const index = this.workers.indexOf(worker);
+    if (index === -1 || this.closed) return;
+
+    if (worker.ready) {
+      // Crashed while serving: it started fine once, so replace it at once
+      this.stats.restarts++;
+      this.workers[index] = this._spawnWorker(0);
+      return;
+    }
+
+    this.stats.startFailures++;
+    const failures = worker.startFailures + 1;
+    const stderr = worker.stderr.trim();
+    worker.failure = stderr ? `${reason}: ${stderr.split('\n').pop()}` : reason;
+    if (failures >= this.maxStartFailures) {
+      console.error(`Obfuscator worker failed to start ${failures} times in a row, giving up ` +
+                    `on it (${worker.failure})`);
+      worker.failed = true;
+      if (this.workers.every(w => w.failed)) this._giveUp(worker.failure);
+      return;
+    }
+    const delay = Math.min(this.restartDelayMs * 2 ** (failures - 1), this.maxRestartDelayMs);
+    worker.restartTimer = setTimeout(() => {
+      if (this.closed || this.workers[index] !== worker) return;
+      this.stats.restarts++;
+      this.workers[index] = this._spawnWorker(failures);
+    }, delay);
+  }
+
+  _giveUp(reason) {
+    this.unavailable = reason;
+    for (const job of this.queue.splice(0)) {
+      this.stats.failed++;
+      job.reject(new WorkersUnavailableError(reason));
+    }
+  }
+
+  // job: { input, type, output, mode? } -> Promise<result>
+  // options: { onProgress?(event) }
+  run(job, options = {}) {
+    if (this.closed) {
+      return Promise.reject(new Error('Obfuscator pool is closed'));
+    }
+    if (this.unavailable) {
+      return Promise.reject(new WorkersUnavailableError(this.unavailable));
+    }
+    if (this.queue.length >= this.maxQueue) {
+      this.stats.rejected++;
+      return Promise.reject(new QueueFullError(this.maxQueue));
+    }
+    return new Promise((resolve, reject) => {
+      this.queue.push({
+        id: String(this.nextJobId++),
+        payload: job,
+        onProgress: options.onProgress,
+        resolve,
+        reject,
+        enqueuedAt: Date.now()
+      });
+      this._dispatch();
+    });
+  }
+
+  _dispatch() {
+    for (const worker of this.workers) {
+      if (this.queue.length === 0) return;
+      if (!worker.ready || worker.job) continue;
+
+      const job = this.queue.shift();
+      worker.job = job;
+      worker.stderr = '';
+      job.startedAt = Date.now();
+      job.timer = setTimeout(() => {
+        console.error(`Obfuscation job ${job.id} timed out, killing worker ${worker.proc.pid}`);
+        worker.proc.kill('SIGKILL');
+      }, this.jobTimeoutMs);
+      worker.proc.stdin.write(JSON.stringify({ id: job.id, ...job.payload }) + '\n');
+    }
+  }
+
+  _finish(worker, message) {
+    const job = worker.job;
+    if (!job || message.id !== job.id) {
+      console.error(`Worker ${worker.proc.pid} answered unknown job ${message.id}`);
+      return;
+    }
+    clearTimeout(job.timer);
+    worker.job = null;
+
+    const timing = {
+      queuedMs: job.startedAt - job.enqueuedAt,
+      runMs: Date.now() - job.startedAt
+    };
+    if (message.ok) {
+      this.stats.completed++;
+      job.resolve({ ...message.result, poolTiming: timing });
+    } else {
+      this.stats.failed++;
+      job.reject(Object.assign(new Error(message.error), {
+        log: message.log || '',
+        stderr: worker.stderr
+      }));
+    }
+    this._dispatch();
+  }
+
+  // True when run() would reject with QUEUE_FULL
+  isFull() {
+    return this.queue.length >= this.maxQueue;
+  }
+
+  status() {
+    return {
+      size: this.size,
+      busy: this.workers.filter(w => w.job).length,
+      ready: this.workers.filter(w => w.ready).length,
+      unavailable: this.unavailable,
+      queued: this.queue.length,
+      maxQueue: this.maxQueue,
+      ...this.stats
+    };
+  }
+
+  // Prometheus text merged from every worker's metrics file
+  metrics() {
+    let files = [];
+    try {
+      files = fs.readdirSync(this.metricsDir).filter(name => name.endsWith('.prom'));
+    } catch (e) {
+      return '';
+    }
+    // Group samples under their family's HELP/TYPE header, which each
+    // worker file repeats
+    const families = new Map();
+    for (const name of files.sort()) {
+      let text;
+      try {
+        text = fs.readFileSync(path.join(this.metricsDir, name), 'utf8');
+      } catch (e) {
+        continue; // worker exited while we listed the directory
+      }
+      let current = null;
+      for (const line of text.split('\n')) {
+        if (!line) continue;
+        const header = line.match(/^# (HELP|TYPE) (\S+)/);
+        if (header) {
+          if (!families.has(header[2])) families.set(header[2], { header: [], samples: [] });
+          current = families.get(header[2]);
+          if (current.header.length < 2) current.header.push(line);
+        } else if (current) {
+          current.samples.push(line);
+        }
+      }
+    }
+    const lines = [];
+    for (const { header, samples } of families.values()) {
+      lines.push(...header, ...samples);
+    }
+    return lines.length ? lines.join('\n') + '\n' : '';
+  }
+
+  close() {
+    this.closed = true;
+    for (const job of this.queue.splice(0)) {
+      job.reject(new Error('Obfuscator pool is closed'));
+    }
+    for (const worker of this.workers) {
+      clearTimeout(worker.restartTimer);
+      worker.proc.stdin.end();
+    }
+  }
+}
+
+module.exports = { ObfuscatorPool, QueueFullError, WorkersUnavailableError };
@@ -0,0 +1,235 @@
+import os
+import time
+import errno
+import fcntl
+import atexit
+import shutil
+import tempfile
+import contextlib
+from typing import Optional
+
+# Managed scratch space for compiler runs.
+#
+# Every gcc invocation (stubs, source-mode loaders, section decryptors)
+# needs a directory for gen.c, pulled-in payload files and gcc's own
+# temporaries. Instead of a fresh mkdtemp per job, each process owns one
+# scratch directory under WORKSPACE_DIR, reuses it for all of its builds and
+# empties it after each one, whether the build succeeded or failed:
+#
+#     WORKSPACE_DIR/worker-<pid>-<random>/.lock
+#
+# The owner holds an flock on .lock for its whole lifetime, so a directory
+# whose lock can be taken belongs to a process that has exited or crashed,
+# and gc() removes it. WORKSPACE_DIR defaults to tmpfs (/dev/shm) when it is
+# mounted and large enough for the quota, since build files are short-lived
+# and never need to reach a disk. The quota is soft: it is checked against
+# the space already in use before each build, so concurrent builds may
+# overshoot it by at most their own size.
+
+WORKSPACE_MAX_BYTES = int(os.environ.get("SIMPFUSCATOR_WORKSPACE_MAX_MB", "2048")) << 20
+
+TMPFS_DIR = "/dev/shm"
+
+LOCK_NAME = ".lock"
+
+# Directories being set up are ".init-*" until their lock is held; ones left
+# behind by a crash during setup are removed once they are this old
+INIT_GRACE_SECONDS = 60
+
+
+class WorkspaceFull(OSError):
+    """A build would push the workspace over its quota."""
+
+    def __init__(self, message: str):
+        super().__init__(errno.ENOSPC, message)
+
+
+def is_tmpfs(path: str) -> bool:
+    """Whether `path` lies on a tmpfs mount, per /proc/self/mountinfo."""
+    path = os.path.realpath(path)
+    best, fstype = "", None
+    try:
+        with open("/proc/self/mountinfo") as f:
+            for line in f:
+                fields = line.split()
+                mount_point = fields[4]
+                kind = fields[fields.index("-") + 1]
+                inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+                if inside and len(mount_point) >= len(best):
+                    best, fstype = mount_point, kind
+    except (OSError, ValueError, IndexError):
+        return False
+    return fstype == "tmpfs"
+
+
+def default_root(max_bytes: int = WORKSPACE_MAX_BYTES) -> str:
+    """$SIMPFUSCATOR_WORKSPACE_DIR, else tmpfs if it can hold the quota, else the temp dir."""
+    configured = os.environ.get("SIMPFUSCATOR_WORKSPACE_DIR")
+    if configured:
+        return configured
+    name = f"simpfuscator-{os.getuid()}"
+    try:
+        st = os.statvfs(TMPFS_DIR)
+        if (is_tmpfs(TMPFS_DIR) and os.access(TMPFS_DIR, os.W_OK)
+                and st.f_blocks * st.f_frsize >= max_bytes):
+            return os.path.join(TMPFS_DIR, name)
+    except OSError:
+        pass
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+def tree_size(path: str) -> int:
+    """Bytes of the regular files below `path`."""
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            with contextlib.suppress(FileNotFoundError):
+                total += os.lstat(os.path.join(directory, name)).st_size
+    return total
+
+
+class BuildWorkspace:
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = WORKSPACE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.root = root or default_root(max_bytes)
+        os.makedirs(self.root, mode=0o700, exist_ok=True)
+        self.tmpfs = is_tmpfs(self.root)
+        self._dir = None
+        self._lock = None
+        self._pid = None
+        self._busy = False
+        self.counters = {
+            "builds": 0,
+            "quota_rejections": 0,
+            "peak_build_bytes": 0,
+            "reclaimed_bytes": 0,
+            "stale_dirs_reclaimed": 0,
+            "stale_bytes_reclaimed": 0,
+        }
+
+    def _own_dir(self) -> str:
+        """This process's scratch directory, created (and its lock taken) on first use."""
+        if self._dir and self._pid == os.getpid():
+            return self._dir
+        if self._lock:
+            # Forked: the parent keeps its directory; drop the inherited lock
+            # so the directory is collectable once the parent exits
+            self._lock.close()
+            self._busy = False
+        self.gc()
+        init_dir = tempfile.mkdtemp(prefix=".init-", dir=self.root)
+        lock = open(os.path.join(init_dir, LOCK_NAME), "w")
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        path = os.path.join(self.root, f"worker-{os.getpid()}-{os.path.basename(init_dir)[6:]}")
+        os.rename(init_dir, path)
+        self._dir, self._lock, self._pid = path, lock, os.getpid()
+        atexit.register(self.close)
+        return path
+
+    def _clear(self, path: str) -> int:
+        """Empty `path` except for the lock file; returns bytes freed."""
+        freed = 0
+        for entry in os.scandir(path):
+            if entry.name == LOCK_NAME:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                freed += tree_size(entry.path)
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                with contextlib.suppress(FileNotFoundError):
+                    freed += entry.stat(follow_symlinks=False).st_size
+                    os.remove(entry.path)
+        return freed
+
+    def usage(self) -> int:
+        return tree_size(self.root)
+
+    @contextlib.contextmanager
+    def build_dir(self, reserve: int = 0):
+        """Yield an empty scratch directory for one build and empty it afterwards.
+
+        `reserve` is the expected size of the build's files; raises
+        WorkspaceFull if that does not fit in the quota even after gc().
+        """
+        if self.usage() + reserve > self.max_bytes:
+            self.gc()
+        used = self.usage()
+        if used + reserve > self.max_bytes:
+            self.counters["quota_rejections"] += 1
+            raise WorkspaceFull(
+                f"A {reserve >> 20} MB build does not fit the {self.max_bytes >> 20} MB quota of "
+                f"build workspace {self.root} ({used >> 20} MB in use); "
+                "raise SIMPFUSCATOR_WORKSPACE_MAX_MB")
+
+        path = self._own_dir()
+        nested = self._busy
+        if nested:
+            # A build started while another is running gets its own subdirectory
+            path = tempfile.mkdtemp(prefix="nested-", dir=path)
+        self._busy = True
+        try:
+            yield path
+        finally:
+            if nested:
+                used = tree_size(path)
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                used = self._clear(path)
+                self._busy = False
+            self.counters["builds"] += 1
+            self.counters["reclaimed_bytes"] += used
+            self.counters["peak_build_bytes"] = max(self.counters["peak_build_bytes"], used)
+
+    def gc(self) -> int:
+        """Remove directories left by exited or crashed processes. Returns bytes reclaimed."""
+        reclaimed = 0
+        for entry in os.scandir(self.root):
+            if not entry.is_dir(follow_symlinks=False) or entry.path == self._dir:
+                continue
+            if entry.name.startswith(".init-"):
+                with contextlib.suppress(FileNotFoundError):
+                    if time.time() - entry.stat().st_mtime < INIT_GRACE_SECONDS:
+                        continue
+            elif not entry.name.startswith("worker-"):
+                continue
+            else:
+                try:
+                    lock = open(os.path.join(entry.path, LOCK_NAME), "a")
+                except FileNotFoundError:
+                    continue
+                with lock:
+                    try:
+                        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        # Owner is alive
+                        continue
+            size = tree_size(entry.path)
+            shutil.rmtree(entry.path, ignore_errors=True)
+            reclaimed += size
+            self.counters["stale_dirs_reclaimed"] += 1
+        self.counters["stale_bytes_reclaimed"] += reclaimed
+        return reclaimed
+
+    def close(self):
+        """Remove this process's directory (runs at exit)."""
+        if self._dir and self._pid == os.getpid():
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._lock.close()
+            self._dir = self._lock = None
+
+    def stats(self) -> dict:
+        dirs = [e.name for e in os.scandir(self.root) if e.is_dir(follow_symlinks=False)]
+        return dict(self.counters, root=self.root, tmpfs=self.tmpfs, bytes=self.usage(),
+                    max_bytes=self.max_bytes, dirs=len(dirs))
+
+
+_default_workspace = None
+
+
+def get_workspace() -> BuildWorkspace:
+    """Process-wide workspace at default_root()."""
+    global _default_workspace
+    if _default_workspace is None:
+        _default_workspace = BuildWorkspace()
+    return _default_workspace
@@ -10,7 +10,7 @@ import { RadioGroup, RadioGroupItem } from "@/components/ui/radio-group";
 import { useToast } from "@/hooks/use-toast";
 import { getOrCreateKeyPair, signFile, hashFile } from "@/utils/digitalSignature";
 
-type EncryptionType = "xor" | "rsa" | "aes" | "rc4" | "des";
+type EncryptionType = "xor" | "rsa" | "aes" | "aes-ctr" | "chacha20" | "rc4" | "des";
 
 const Dashboard = () => {
   const [selectedEncryption, setSelectedEncryption] = useState<EncryptionType | null>(null);
@@ -47,6 +47,8 @@ const Dashboard = () => {
     { value: "xor", label: "XOR Encryption", description: "Fast bitwise operation encryption" },
     { value: "rsa", label: "RSA Encryption", description: "Public-key cryptography algorithm" },
     { value: "aes", label: "AES Encryption", description: "Advanced Encryption Standard (AES-128 CBC)" },
+    { value: "aes-ctr", label: "AES-CTR Encryption", description: "AES-128 in counter mode: no padding, parallel decryption" },
+    { value: "chacha20", label: "ChaCha20 Encryption", description: "Fast stream cipher, no AES hardware needed" },
   ];
 
   const startObfuscation = async () => {
@@ -573,9 +575,9 @@ const Dashboard = () => {
           <CardContent className="space-y-2 text-sm text-muted-foreground">
             <p>• Supported format: ELF binaries (Linux executables)</p>
             <p>• Maximum file size: 100MB</p>
-            <p>• Encryption: XOR, RSA, or AES</p>
+            <p>• Encryption: XOR, RSA, AES, AES-CTR, or ChaCha20</p>
             <p>• Digital signature: RSA-PSS 2048-bit</p>
-            <p>• Loader: Self-extracting with tmpfs</p>
+            <p>• Loader: Decrypts in memory and runs from a memfd (fexecve), falling back to a temp file</p>
           </CardContent>
         </Card>
       </motion.div>